@@ -0,0 +1,269 @@
+'''
+Benchmarks for the card engine hot paths.
+
+Run from the src directory:
+
+	python -m benchmarks.engine --output results.json
+	python -m benchmarks.engine --baseline baseline.json
+
+Each benchmark reports operations per second (best of several repeats),
+allocations and peak traced memory (when tracemalloc is available) and
+the process's peak RSS. Comparing against a saved baseline exits with
+status 1 if any benchmark got slower than the tolerance allows.
+'''
+from common.common import CardContainer, CardPile
+from common.render import NULL_RENDERER
+from games.uno import UnoCardContainer, UnoBitsetCardContainer, UnoCardFactory, UnoGameLogic
+from games.oldmaid import OldMaidGameLogic, OldMaidPlayer, OldMaidCardFactory
+from timeit import default_timer
+import argparse
+import gc
+import itertools
+import json
+import platform
+import random
+import sys
+
+try:
+	import resource
+except ImportError:
+	resource = None
+
+try:
+	import tracemalloc
+except ImportError:
+	tracemalloc = None
+
+DEFAULT_TOLERANCE = 0.10
+UNO_PLAYER_COUNTS = [2, 4, 10]
+# Old Maid only seats up to 8
+OLD_MAID_PLAYER_COUNTS = [2, 4, 8]
+# seed of every benchmark's own Random
+SEED = 1
+
+class Benchmark:
+	'''
+	A named operation to time. setup() is called once per repeat and its
+	return value is passed to every call of func(), so only func() is
+	timed. With prepare, every call of func() is instead passed
+	prepare(setup's value), which isn't timed either, for operations that
+	need something fresh each time
+	'''
+	def __init__(self, name, func, setup = None, prepare = None):
+		self.name = name
+		self.func = func
+		self.setup = setup
+		self.prepare = prepare
+
+	def run(self, min_time, repeats):
+		'''
+		Returns a dict of results for this benchmark
+		'''
+		best_rate = 0.0
+		for _ in range(repeats):
+			state = self.setup() if self.setup is not None else None
+			calls = 0
+			elapsed = 0.0
+			if self.prepare is None:
+				start = default_timer()
+				while elapsed < min_time:
+					self.func(state)
+					calls += 1
+					elapsed = default_timer() - start
+			else:
+				while elapsed < min_time:
+					argument = self.prepare(state)
+					start = default_timer()
+					self.func(argument)
+					elapsed += default_timer() - start
+					calls += 1
+			best_rate = max(best_rate, calls / elapsed)
+		result = {"name": self.name, "ops_per_sec": best_rate}
+		result.update(self._measure_memory())
+		return result
+
+	def _measure_memory(self):
+		'''
+		Allocation counts for a single call
+		'''
+		state = self.setup() if self.setup is not None else None
+		if self.prepare is not None:
+			state = self.prepare(state)
+		gc.collect()
+		if tracemalloc is None:
+			objects_before = len(gc.get_objects())
+			self.func(state)
+			return {"net_objects": len(gc.get_objects()) - objects_before}
+		tracemalloc.start()
+		try:
+			self.func(state)
+			snapshot = tracemalloc.take_snapshot()
+			_, peak = tracemalloc.get_traced_memory()
+		finally:
+			tracemalloc.stop()
+		allocations = sum([stat.count for stat in snapshot.statistics("filename")])
+		return {"allocations": allocations, "peak_bytes": peak}
+
+def _names(num_players):
+	return ["p%d" % i for i in range(num_players)]
+
+def _random_uno_hand(container_class, rng, size):
+	hand = container_class()
+	cards = UnoCardFactory().get_cards()
+	rng.shuffle(cards)
+	for card in cards[:size]:
+		hand.add_card(card)
+	return hand
+
+def get_benchmarks():
+	'''
+	All of the engine benchmarks, in reporting order. Those that need
+	random choices get their own Random from setup(), seeded the same way
+	every repeat, so no benchmark's choices depend on which ran before it
+	'''
+	benchmarks = []
+	uno_cards = UnoCardFactory().get_cards()
+
+	def deck_setup():
+		return CardContainer(UnoCardFactory())
+	def shuffle_setup():
+		return (deck_setup(), random.Random(SEED))
+	def shuffle(state):
+		deck, rng = state
+		deck.shuffle(1, rng)
+	benchmarks.append(Benchmark("CardContainer.shuffle", shuffle, shuffle_setup))
+
+	def draw_and_return(deck):
+		deck.add_card(deck.top_card())
+	benchmarks.append(Benchmark("CardContainer.top_card", draw_and_return, deck_setup))
+	benchmarks.append(Benchmark("CardPile.top_card", draw_and_return, lambda: CardPile(UnoCardFactory())))
+
+	def recycle_setup():
+		return [CardPile(), CardPile(UnoCardFactory()), random.Random(SEED)]
+	def recycle(state):
+		# draw the whole pile onto the other, then shuffle it back
+		draw_pile, discard_pile, rng = state
+		while not draw_pile.empty():
+			discard_pile.add_card(draw_pile.top_card())
+		discard_pile.shuffle(1, rng)
+		state[:2] = [discard_pile, draw_pile]
+	benchmarks.append(Benchmark("CardPile.draw_and_recycle", recycle, recycle_setup))
+
+	def remove_and_return(deck):
+		card = deck.card_list[len(deck.card_list) // 2]
+		deck.remove_card(card)
+		deck.add_card(card)
+	benchmarks.append(Benchmark("CardContainer.remove_card", remove_and_return, deck_setup))
+
+	benchmarks.append(Benchmark("CardContainer._populate_deck", lambda _: CardContainer(UnoCardFactory())))
+	benchmarks.append(Benchmark("CardContainer._populate_deck[oldmaid]", lambda _: CardContainer(OldMaidCardFactory())))
+
+	for container_class in (UnoCardContainer, UnoBitsetCardContainer):
+		for size in (7, 20):
+			name = "%s.get_matches[%d]" % (container_class.__name__, size)
+			def matches_setup(container_class = container_class, size = size):
+				rng = random.Random(SEED)
+				return (_random_uno_hand(container_class, rng, size), rng)
+			def get_matches(state):
+				hand, rng = state
+				hand.get_matches(uno_cards[rng.randrange(len(uno_cards))], "r")
+			benchmarks.append(Benchmark(name, get_matches, matches_setup))
+		name = "%s.get_suit_most_owned" % container_class.__name__
+		def suit_setup(container_class = container_class):
+			rng = random.Random(SEED)
+			return (_random_uno_hand(container_class, rng, 7), rng)
+		def get_suit_most_owned(state):
+			hand, rng = state
+			hand.get_suit_most_owned(rng)
+		benchmarks.append(Benchmark(name, get_suit_most_owned, suit_setup))
+
+	def discard_pairs_setup():
+		cards = OldMaidCardFactory().get_cards()
+		random.Random(SEED).shuffle(cards)
+		return cards[:14]
+	def discard_pairs(cards):
+		player = OldMaidPlayer("p")
+		player.renderer = NULL_RENDERER
+		for card in cards:
+			player.draw_card(card)
+		player.discard_pairs()
+	benchmarks.append(Benchmark("OldMaidPlayer.discard_pairs", discard_pairs, discard_pairs_setup))
+
+	for logic_class, counts in ((UnoGameLogic, UNO_PLAYER_COUNTS), (OldMaidGameLogic, OLD_MAID_PLAYER_COUNTS)):
+		for num_players in counts:
+			# every repeat deals and plays the same sequence of seeded games;
+			# only the deal itself is timed, not building the game to deal
+			def deal_prepare(seeds, logic_class = logic_class, num_players = num_players):
+				logic = logic_class(next(seeds), True)
+				logic._init_players(_names(num_players))
+				return logic
+			benchmarks.append(Benchmark("%s.deal[%d]" % (logic_class.__name__, num_players),
+				lambda logic: logic._deal(), itertools.count, deal_prepare))
+
+			def play(seeds, logic_class = logic_class, num_players = num_players):
+				logic_class(next(seeds), True).simulate(_names(num_players))
+			benchmarks.append(Benchmark("%s.game[%d]" % (logic_class.__name__, num_players), play, itertools.count))
+	return benchmarks
+
+def run_benchmarks(names = None, min_time = 0.5, repeats = 3):
+	'''
+	Runs the benchmarks (optionally only those whose name contains one of
+	names) and returns the full machine readable report
+	'''
+	results = []
+	for benchmark in get_benchmarks():
+		if names and not [name for name in names if name in benchmark.name]:
+			continue
+		results.append(benchmark.run(min_time, repeats))
+	report = {
+		"python": platform.python_version(),
+		"platform": platform.platform(),
+		"results": results,
+	}
+	if resource is not None:
+		report["peak_rss_kb"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	return report
+
+def compare_to_baseline(report, baseline, tolerance = DEFAULT_TOLERANCE):
+	'''
+	Returns a list of (name, baseline ops/sec, current ops/sec) for every
+	benchmark that is more than tolerance slower than in the baseline
+	'''
+	baseline_rates = dict([(result["name"], result["ops_per_sec"]) for result in baseline["results"]])
+	regressions = []
+	for result in report["results"]:
+		baseline_rate = baseline_rates.get(result["name"])
+		if baseline_rate is not None and result["ops_per_sec"] < baseline_rate * (1 - tolerance):
+			regressions.append((result["name"], baseline_rate, result["ops_per_sec"]))
+	return regressions
+
+def main(argv = None):
+	parser = argparse.ArgumentParser(description = "Card engine benchmarks")
+	parser.add_argument("--output", help = "write the JSON report to this file")
+	parser.add_argument("--baseline", help = "JSON report to compare against")
+	parser.add_argument("--tolerance", type = float, default = DEFAULT_TOLERANCE,
+		help = "allowed slowdown against the baseline, as a fraction")
+	parser.add_argument("--min-time", type = float, default = 0.5, help = "seconds per repeat")
+	parser.add_argument("--repeats", type = int, default = 3)
+	parser.add_argument("names", nargs = "*", help = "only run benchmarks whose name contains one of these")
+	args = parser.parse_args(argv)
+
+	report = run_benchmarks(args.names, args.min_time, args.repeats)
+	for result in report["results"]:
+		print "%-50s %14.1f ops/sec" % (result["name"], result["ops_per_sec"])
+	if args.output:
+		with open(args.output, "w") as output:
+			json.dump(report, output, indent = 2, sort_keys = True)
+
+	if args.baseline:
+		with open(args.baseline) as baseline_file:
+			baseline = json.load(baseline_file)
+		regressions = compare_to_baseline(report, baseline, args.tolerance)
+		for name, baseline_rate, rate in regressions:
+			print "REGRESSION %s: %.1f -> %.1f ops/sec" % (name, baseline_rate, rate)
+		if regressions:
+			return 1
+	return 0
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,66 @@
+'''
+Bounded caches for bot decisions. A policy that takes a while to decide
+(searching, or asking a model) and always makes the same decision in the
+same situation can keep its decisions in a DecisionCache, keyed by an
+encoding of the situation, and only work out the ones it hasn't seen.
+'''
+from collections import OrderedDict
+
+DEFAULT_MAX_SIZE = 1 << 16
+
+class DecisionCache:
+	'''
+	Least recently used cache holding up to max_size decisions. Counts
+	its hits, misses and evictions; one cache can be shared by any number
+	of players using the same policy (within a process)
+	'''
+	def __init__(self, max_size = DEFAULT_MAX_SIZE):
+		if max_size < 1:
+			raise ValueError("A cache needs room for at least one decision")
+		self.max_size = max_size
+		self.entries = OrderedDict()
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+
+	def get(self, key, default = None):
+		'''
+		The decision stored for key, which becomes the most recently used,
+		or default if there isn't one
+		'''
+		entries = self.entries
+		if key in entries:
+			value = entries.pop(key)
+			entries[key] = value
+			self.hits += 1
+			return value
+		self.misses += 1
+		return default
+
+	def put(self, key, value):
+		entries = self.entries
+		if key in entries:
+			del entries[key]
+		elif len(entries) >= self.max_size:
+			entries.popitem(last = False)
+			self.evictions += 1
+		entries[key] = value
+
+	def clear(self):
+		'''
+		Forgets every decision, keeping the counts
+		'''
+		self.entries.clear()
+
+	def hit_rate(self):
+		lookups = self.hits + self.misses
+		if lookups == 0:
+			return 0.0
+		return float(self.hits) / lookups
+
+	def __len__(self):
+		return len(self.entries)
+
+	def __str__(self):
+		return "%d/%d decisions, %d hits, %d misses (%.1f%% hit rate), %d evicted" % (
+			len(self.entries), self.max_size, self.hits, self.misses, 100 * self.hit_rate(), self.evictions)
@@ -1,4 +1,9 @@
-from random import shuffle
+from events import EventDispatcher
+from events import CARD_DEALT, GAME_FINISHED, GAME_STARTED
+from pacing import RealTimePacer, VirtualClock
+from render import ConsoleRenderer, NULL_RENDERER
+import copy
+import random
 
 
 class CardContainer:
@@ -19,15 +24,19 @@ class CardContainer:
 			card_contents = EmptyCardFactory()
 		self._populate_deck(card_contents)
 	
-	def shuffle(self, num_times = 1):
+	def shuffle(self, num_times = 1, rng = None):
 		'''
 		Shuffles the deck num_times times. Default is 1, max
 		is 10 (if the deck is not fully shuffled after 10 
-		shuffles, then something is wrong)
+		shuffles, then something is wrong). Pass rng (anything
+		with a shuffle() method, e.g. random.Random) to make the
+		shuffle reproducible
 		'''
+		if rng is None:
+			rng = random
 		i = 0
 		while i < num_times and i < CardContainer.MAX_SHUFFLES:
-			shuffle(self.card_list)
+			rng.shuffle(self.card_list)
 			i += 1
 	
 	def num_cards(self):
@@ -48,7 +57,7 @@ class CardContainer:
 		has been drawn, removing it from the deck
 		'''
 		card = self.fetch_card(0, peek)
-		if not peek:
+		if not peek and card is not None:
 			self._remove_card_from_meta_lists(card)
 		return card
 	
@@ -58,7 +67,7 @@ class CardContainer:
 		card is removed from the deck
 		'''
 		card = self.fetch_card(-1, peek)
-		if not peek:
+		if not peek and card is not None:
 			self._remove_card_from_meta_lists(card)
 		return card
 
@@ -100,13 +109,37 @@ class CardContainer:
 		self.cards_by_suit = {}
 		self.cards_by_value = {}
 	
+	def reset(self, card_contents = None):
+		'''
+		Empties the container and refills it from card_contents (a card
+		factory) if given, reusing the container's own lists rather than
+		allocating new ones
+		'''
+		del self.card_list[:]
+		for cards in self.cards_by_suit.itervalues():
+			del cards[:]
+		for cards in self.cards_by_value.itervalues():
+			del cards[:]
+		if card_contents is not None:
+			self._populate_deck(card_contents)
+
 	def copy_from(self, src_card_container):
 		'''
-		Copies the entire state from the source CardContainer
+		Copies the entire state from the source CardContainer. The two
+		containers stay independent afterwards
+		'''
+		self.card_list = list(src_card_container.card_list)
+		self.cards_by_suit = _copy_card_lists(src_card_container.cards_by_suit)
+		self.cards_by_value = _copy_card_lists(src_card_container.cards_by_value)
+
+	def clone(self):
+		'''
+		Returns an independent copy of this container. Cards are shared,
+		immutable flyweights, so only lists of references get copied
 		'''
-		self.card_list = src_card_container.card_list
-		self.cards_by_suit = src_card_container.cards_by_suit
-		self.cards_by_value = src_card_container.cards_by_value
+		clone = copy.copy(self)
+		clone.copy_from(self)
+		return clone
 	
 	###################################
 	# PROTECTED METHODS ###############
@@ -136,7 +169,7 @@ class CardContainer:
 		'''
 		Adds all the involved cards to the deck
 		'''
-		for card in card_contents.get_cards():
+		for card in card_contents.get_shared_cards():
 			self.add_card(card)
 
 	###################################
@@ -151,40 +184,372 @@ class CardContainer:
 	def __len__(self):
 		return len(self.card_list)
 
-class AbstractCardFactory:
+class BitsetCardContainer(CardContainer):
+	'''
+	A CardContainer which tracks its cards as bits (indexed by card_id)
+	in integer masks rather than in lists, so adding and removing a card
+	takes constant time and "which of my cards are X" is a bitwise AND.
+	The number of cards of each suit is kept alongside the masks, as
+	counting a mask's bits costs more than the lists it replaces. Every
+	card must have a card_id, and the cards are kept in no particular
+	order
+	'''
+	def __init__(self, card_contents = None):
+		self.card_list = []
+		self.positions = {}
+		self.cards_by_id = {}
+		self.mask = 0
+		self.suit_masks = {}
+		self.suit_counts = {}
+		self.value_masks = {}
+		if card_contents is None:
+			card_contents = EmptyCardFactory()
+		self._populate_deck(card_contents)
+
+	def shuffle(self, num_times = 1, rng = None):
+		CardContainer.shuffle(self, num_times, rng)
+		self._reindex_positions()
+
+	def add_card(self, card):
+		'''
+		Adds a Card to the end of the list of cards in the container
+		'''
+		self.positions[card.card_id] = len(self.card_list)
+		self.card_list.append(card)
+		self._add_card_to_meta_lists(card)
+
+	def remove_card(self, card):
+		'''
+		Removes a card from the container in constant time; the last
+		card takes its place in card_list
+		'''
+		self._remove_card_from_card_list(card)
+		self._remove_card_from_meta_lists(card)
+
+	def fetch_card(self, index, peek=False):
+		'''
+		Fetches the Card at index. If peek=False, the card is
+		removed from the container. Swallows IndexError if index is
+		out of bounds
+		'''
+		try:
+			card = self.card_list[index]
+		except IndexError:
+			return None
+		if not peek:
+			self._remove_card_from_card_list(card)
+		return card
+
+	def contains(self, card):
+		return self.mask >> card.card_id & 1 == 1
+
+	def cards_in_mask(self, mask):
+		'''
+		Lists the cards of this container whose bits are set in mask,
+		in card_id order
+		'''
+		cards = []
+		mask &= self.mask
+		while mask:
+			low_bit = mask & -mask
+			cards.append(self.cards_by_id[low_bit.bit_length() - 1])
+			mask ^= low_bit
+		return cards
+
+	def count_suit(self, suit):
+		return self.suit_counts.get(suit, 0)
+
+	def count_value(self, value):
+		return count_bits(self.value_masks.get(value, 0))
+
+	@property
+	def cards_by_suit(self):
+		'''
+		Lists of cards keyed by suit, built on demand for code written
+		against CardContainer
+		'''
+		return self._cards_by_mask(self.suit_masks)
+
+	@property
+	def cards_by_value(self):
+		'''
+		Lists of cards keyed by value, built on demand for code written
+		against CardContainer
+		'''
+		return self._cards_by_mask(self.value_masks)
+
+	def clear(self):
+		'''
+		Removes all cards from this container
+		'''
+		self.card_list = []
+		self.positions = {}
+		self.cards_by_id = {}
+		self.mask = 0
+		self.suit_masks = {}
+		self.suit_counts = {}
+		self.value_masks = {}
+
+	def reset(self, card_contents = None):
+		del self.card_list[:]
+		self.positions.clear()
+		self.cards_by_id.clear()
+		self.mask = 0
+		for suit in self.suit_masks:
+			self.suit_masks[suit] = 0
+			self.suit_counts[suit] = 0
+		for value in self.value_masks:
+			self.value_masks[value] = 0
+		if card_contents is not None:
+			self._populate_deck(card_contents)
+
+	def copy_from(self, src_card_container):
+		'''
+		Copies the entire state from the source container. The two
+		containers stay independent afterwards
+		'''
+		if not isinstance(src_card_container, BitsetCardContainer):
+			self.clear()
+			for card in src_card_container.card_list:
+				self.add_card(card)
+			return
+		self.card_list = list(src_card_container.card_list)
+		self.positions = dict(src_card_container.positions)
+		self.cards_by_id = dict(src_card_container.cards_by_id)
+		self.mask = src_card_container.mask
+		self.suit_masks = dict(src_card_container.suit_masks)
+		self.suit_counts = dict(src_card_container.suit_counts)
+		self.value_masks = dict(src_card_container.value_masks)
+
+	###################################
+	# PROTECTED METHODS ###############
+	###################################
+	def _cards_by_mask(self, masks):
+		ret = {}
+		for key, mask in masks.iteritems():
+			if mask:
+				ret[key] = self.cards_in_mask(mask)
+		return ret
+
+	def _remove_card_from_card_list(self, card):
+		index = self.positions.pop(card.card_id)
+		last_card = self.card_list.pop()
+		if last_card is not card:
+			self.card_list[index] = last_card
+			self.positions[last_card.card_id] = index
+
+	def _reindex_positions(self):
+		self.positions = {}
+		for index, card in enumerate(self.card_list):
+			self.positions[card.card_id] = index
+
+	def _remove_card_from_meta_lists(self, card):
+		'''
+		Clears the card's bit from the masks
+		'''
+		bit = 1 << card.card_id
+		del self.cards_by_id[card.card_id]
+		self.mask &= ~bit
+		if card.suit is not None:
+			self.suit_masks[card.suit] &= ~bit
+			self.suit_counts[card.suit] -= 1
+		self.value_masks[card.value] &= ~bit
+
+	def _add_card_to_meta_lists(self, card):
+		'''
+		Sets the card's bit in the masks
+		'''
+		bit = 1 << card.card_id
+		self.cards_by_id[card.card_id] = card
+		self.mask |= bit
+		if card.suit is not None:
+			self.suit_masks[card.suit] = self.suit_masks.get(card.suit, 0) | bit
+			self.suit_counts[card.suit] = self.suit_counts.get(card.suit, 0) + 1
+		self.value_masks[card.value] = self.value_masks.get(card.value, 0) | bit
+
+class CardPile(CardContainer):
+	'''
+	A face down stack of cards such as a deck, draw pile or discard pile.
+	Cards are drawn off the top by moving a start index rather than by
+	shifting the list, and no suit or value indexes are kept, so drawing
+	and adding cards cost the same however big the pile is. Cards can
+	still be taken from anywhere, just not as cheaply
+	'''
+	# drawn slots are only dropped once there are this many of them
+	MIN_COMPACT = 32
+
+	def __init__(self, card_contents = None):
+		self.cards = []
+		self.start = 0
+		if card_contents is None:
+			card_contents = EmptyCardFactory()
+		self._populate_deck(card_contents)
+
+	@property
+	def card_list(self):
+		'''
+		The cards still in the pile, top first
+		'''
+		self._compact()
+		return self.cards
+
+	def shuffle(self, num_times = 1, rng = None):
+		self._compact()
+		if rng is None:
+			rng = random
+		i = 0
+		while i < num_times and i < CardContainer.MAX_SHUFFLES:
+			rng.shuffle(self.cards)
+			i += 1
+
+	def num_cards(self):
+		return len(self.cards) - self.start
+
+	def empty(self):
+		return self.start >= len(self.cards)
+
+	def top_card(self, peek=False):
+		start = self.start
+		if start >= len(self.cards):
+			return None
+		card = self.cards[start]
+		if not peek:
+			self.start = start + 1
+			if self.start >= CardPile.MIN_COMPACT and self.start * 2 >= len(self.cards):
+				self._compact()
+		return card
+
+	def bottom_card(self, peek=False):
+		if self.start >= len(self.cards):
+			return None
+		if peek:
+			return self.cards[-1]
+		return self.cards.pop()
+
+	def add_card(self, card):
+		self.cards.append(card)
+
+	def remove_card(self, card):
+		self._compact()
+		self.cards.remove(card)
+
+	def fetch_card(self, index, peek=False):
+		self._compact()
+		try:
+			if peek:
+				return self.cards[index]
+			return self.cards.pop(index)
+		except IndexError:
+			return None
+
+	def clear(self):
+		self.cards = []
+		self.start = 0
+
+	def reset(self, card_contents = None):
+		if card_contents is None:
+			del self.cards[:]
+		else:
+			self.cards[:] = card_contents.get_shared_cards()
+		self.start = 0
+
+	def copy_from(self, src_card_container):
+		self.cards = list(src_card_container.card_list)
+		self.start = 0
+
+	###################################
+	# PROTECTED METHODS ###############
+	###################################
+	def _compact(self):
+		if self.start:
+			del self.cards[:self.start]
+			self.start = 0
+
+	###################################
+	# MAGIC METHODS ###################
+	###################################
+	def __len__(self):
+		return len(self.cards) - self.start
+
+def _copy_card_lists(cards_by_key):
+	return dict([(key, list(cards)) for key, cards in cards_by_key.iteritems()])
+
+def count_bits(mask):
+	'''
+	Number of set bits in a card mask
+	'''
+	return bin(mask).count("1")
+
+class AbstractCardFactory(object):
 	def get_cards(self):
 		'''
-		Function to be overridden by child classes to get the correct
+		Returns a new list holding every card of this factory's deck.
+		The Card objects themselves are only created the first time a
+		factory class is asked for them and are then shared by every
+		deck in the process, so they must never be modified
+		'''
+		return list(self.get_shared_cards())
+
+	def get_shared_cards(self):
+		'''
+		Like get_cards(), but returns the factory's own list of its cards
+		instead of a copy; it must not be changed
+		'''
+		cls = self.__class__
+		# look in this class's own dict so subclasses get their own deck
+		cards = cls.__dict__.get("_interned_cards")
+		if cards is None:
+			cards = self._create_cards()
+			for card_id, card in enumerate(cards):
+				card.card_id = card_id
+			cls._interned_cards = cards
+		return cards
+
+	def get_card(self, card_id):
+		'''
+		Looks up one of this factory's cards by its card_id
+		'''
+		return self.get_shared_cards()[card_id]
+
+	def _create_cards(self):
+		'''
+		Function to be overridden by child classes to create the correct
 		cards
 		'''
-		raise NotImplementedError("Must override get_cards() in child classes")
+		raise NotImplementedError("Must override _create_cards() in child classes")
 
 class EmptyCardFactory(AbstractCardFactory):
-	def get_cards(self):
+	def _create_cards(self):
 		return []
 
-class StandardCardFactory:
+class StandardCardFactory(AbstractCardFactory):
 	'''
 	Defines a standard 52-card deck as used for most card games
 	'''
 	SUITS = ["spade", "diamond", "heart", "club"]
 	VALUES = ["A", "1", "2", "3", "4", "5", "6", "7", "8", "9", "10", "J", "Q", "K"]
-	def get_cards(self):
+	def _create_cards(self):
 		cards = []
 		for suit in StandardCardFactory.SUITS:
 			for value in StandardCardFactory.VALUES:
 				cards.append(Card(suit, value))
 		return cards
 
-class Card:
+class Card(object):
+	# cards are flyweights shared between games, so keep them small
+	__slots__ = ("suit", "value", "card_id")
+
 	def __init__(self, suit, value):
 		'''
 		Basic constructor. Accepts Suit and Value, each of
 		which is intended to be a string. None is an
-		acceptable value by default; this can be overridden
+		acceptable value by default; this can be overridden.
+		card_id is the card's position in its factory's deck
+		and is assigned by the factory
 		'''
 		self.suit = suit
 		self.value = value
+		self.card_id = None
 
 	def __str__(self):
 		return unicode(self).encode("utf-8")
@@ -201,6 +566,9 @@ class AbstractPlayer:
 		'''
 		self.hand = CardContainer()
 		self.name = name
+		self.seat = None
+		self.rng = random
+		self.renderer = ConsoleRenderer()
 		self.init_hand()
 	
 	def init_hand(self):
@@ -228,6 +596,61 @@ class AbstractPlayer:
 		'''
 		return self.hand.num_cards()
 
+	def reset(self):
+		'''
+		Gets the player ready for a new game, emptying their hand in place
+		'''
+		self.hand.reset()
+
+	def snapshot(self):
+		'''
+		Captures whatever state of the player changes during a game
+		'''
+		return self.hand.clone()
+
+	def restore(self, snapshot):
+		'''
+		Puts back the state captured by snapshot()
+		'''
+		self.hand.copy_from(snapshot)
+
+	def clone(self):
+		'''
+		A copy of this player with its own hand
+		'''
+		clone = copy.copy(self)
+		clone.hand = self.hand.clone()
+		return clone
+
+	def _say(self, msg, *args):
+		'''
+		Passes msg (formatted with args) to the renderer of the game the
+		player is seated at
+		'''
+		self.renderer.say(msg, *args)
+
+class GameResult:
+	'''
+	Structured outcome of a single game, as returned by
+	AbstractGameLogic.simulate()
+	'''
+	def __init__(self, winner, winner_index, num_players, num_turns, num_draws, num_reshuffles, seed = None):
+		self.winner = winner
+		self.winner_index = winner_index
+		self.num_players = num_players
+		self.num_turns = num_turns
+		self.num_draws = num_draws
+		self.num_reshuffles = num_reshuffles
+		self.seed = seed
+
+	@property
+	def stalemate(self):
+		return self.winner is None
+
+	def __str__(self):
+		winner = "stalemate" if self.winner is None else self.winner.name
+		return "winner: %s, turns: %d, draws: %d, reshuffles: %d" % (winner, self.num_turns, self.num_draws, self.num_reshuffles)
+
 class AbstractGameLogic:
 	NUM_TIMES_TO_SHUFFLE = 7
 
@@ -239,24 +662,135 @@ class AbstractGameLogic:
 	def get_friendly_name():
 		raise NotImplementedError()
 	
-	def __init__(self):
+	def __init__(self, seed = None, headless = False, renderer = None, pacer = None):
+		'''
+		seed makes every shuffle and random choice in the game
+		reproducible. A headless game never prompts; players must
+		then be passed to start_game() or simulate(). All output
+		goes to renderer, which by default is the console, or
+		nowhere for a headless game. Pauses go to pacer (see
+		common.pacing), which by default sleeps through them, or
+		only counts them on a virtual clock for a headless game
+		'''
+		self.seed = seed
+		self.rng = random.Random(seed)
+		self.headless = headless
+		if renderer is None:
+			renderer = NULL_RENDERER if headless else ConsoleRenderer()
+		self.renderer = renderer
+		if pacer is None:
+			pacer = VirtualClock() if headless else RealTimePacer()
+		self.pacer = pacer
+		self.events = EventDispatcher(pacer.now)
 		self.draw_pile = None
 		self.players = []
 		self.winner = None
+		self.finished = False
+		self.num_turns = 0
+		self.num_draws = 0
+		self.num_reshuffles = 0
 		self._make_cards()
-		self.draw_pile.shuffle(self._get_num_times_to_shuffle())
+		self.draw_pile.shuffle(self._get_num_times_to_shuffle(), self.rng)
 	
 	def _make_cards(self):
 		raise NotImplementedError()	
 
-	def start_game(self):
+	def reset(self, seed = None):
+		'''
+		Gets the game ready to be played again without building anything
+		new: every card goes back into the draw pile in the order a new
+		game starts with and is reshuffled in place, and the players'
+		hands are emptied. Given a seed, the game then plays out exactly
+		as a new game with that seed would. The players stay seated, and
+		start_game() plays with them again unless given other players
+		'''
+		if seed is not None:
+			self.seed = seed
+			self.rng.seed(seed)
+		self.winner = None
+		self.finished = False
+		self.num_turns = 0
+		self.num_draws = 0
+		self.num_reshuffles = 0
+		for player in self.players:
+			player.reset()
+		self._reset_cards()
+		self.draw_pile.shuffle(self._get_num_times_to_shuffle(), self.rng)
+
+	def start_game(self, players = None):
 		'''
 		Begins the game by initializing the players, dealing, and 
-		triggering the game loop
+		triggering the game loop. players is an optional list of
+		names and/or AbstractPlayer instances; if omitted, the players
+		still seated from before a reset() play, or failing that the
+		user is prompted for them
 		'''
-		self._init_players()
+		self.begin(players)
+		winner = self.continue_game()
+		if self.events.active:
+			self.events.emit(GAME_FINISHED, None if winner is None else winner.seat, self.num_turns)
+		return winner
+
+	def begin(self, players = None):
+		'''
+		Seats the players (as start_game() does) and deals, leaving the
+		game ready for its first turn, so it can be played a turn at a
+		time with step()
+		'''
+		self._init_players(players)
+		if self.events.active:
+			self.events.emit(GAME_STARTED, self)
 		self._deal()
-		return self._play_game()
+		self._start_play()
+
+	def get_current_player(self):
+		'''
+		The player whose turn it is
+		'''
+		return self.players[self.player_index]
+
+	def legal_actions(self):
+		'''
+		The actions open to the player whose turn it is, for players that
+		take actions (see games.env); empty if the turn has no decision
+		in it or the player makes their own
+		'''
+		player = self.players[self.player_index]
+		if self.finished or not hasattr(player, "get_legal_actions"):
+			return []
+		return player.get_legal_actions(self)
+
+	def step(self, action = None):
+		'''
+		Plays the turn of the player whose turn it is, with action (one
+		of legal_actions()) as their choice if given; otherwise they decide
+		for themselves. Returns whether the game is over
+		'''
+		if action is not None:
+			self.players[self.player_index].set_action(action, self)
+		self._play_turn()
+		if self.finished and self.events.active:
+			winner = self.winner
+			self.events.emit(GAME_FINISHED, None if winner is None else winner.seat, self.num_turns)
+		return self.finished
+
+	def simulate(self, players = None):
+		'''
+		Plays a whole game with the given players and returns a
+		GameResult instead of just the winner
+		'''
+		self.start_game(players)
+		return self.get_result()
+
+	def get_result(self):
+		'''
+		Builds the GameResult for the game as it stands
+		'''
+		winner_index = None
+		if self.winner is not None:
+			winner_index = self.players.index(self.winner)
+		return GameResult(self.winner, winner_index, len(self.players), self.num_turns,
+			self.num_draws, self.num_reshuffles, self.seed)
 
 	def _get_num_players(self):
 		'''
@@ -266,23 +800,65 @@ class AbstractGameLogic:
 		'''
 		min_num_players = self._get_min_num_players()
 		max_num_players = self._get_max_num_players()
+		self.renderer.flush()
 		num_players = raw_input("How many players (%d-%d)? " % (min_num_players, max_num_players))
 		if not num_players.isdigit() or int(num_players) < min_num_players or int(num_players) > max_num_players:
-			print "Invalid number of players, must choose a number between %d and %d" % (min_num_players, max_num_players)
+			self._say("Invalid number of players, must choose a number between %d and %d", min_num_players, max_num_players)
 			return self._get_num_players()
 		return int(num_players)
 
-	def _init_players(self):
+	def _init_players(self, players = None):
 		'''
 		Creates as many players as are going to play this game
 		'''
+		if players is not None:
+			del self.players[:]
+			self._init_given_players(players)
+			return
+		if self.players:
+			return
+		if self.headless:
+			raise ValueError("Players must be provided for a headless game")
 		num_players = self._get_num_players()
 		i = 0
 		while i < num_players:
 			i += 1
+			self.renderer.flush()
 			name = raw_input("Enter name for player %s: " % str(i))
 			player_class = self._get_player_class()
-			self.players.append(player_class(name))
+			self._seat_player(player_class(name))
+
+	def _init_given_players(self, players):
+		'''
+		Seats the provided players; plain names get an instance of
+		the game's default player class
+		'''
+		min_num_players = self._get_min_num_players()
+		max_num_players = self._get_max_num_players()
+		if len(players) < min_num_players or len(players) > max_num_players:
+			raise ValueError("Invalid number of players, must be between %d and %d" % (min_num_players, max_num_players))
+		for player in players:
+			if not isinstance(player, AbstractPlayer):
+				player = self._get_player_class()(player)
+			self._seat_player(player)
+
+	def _seat_player(self, player):
+		'''
+		Adds a player to the table, sharing the game's random
+		source and output settings with them
+		'''
+		player.rng = self.rng
+		player.renderer = self.renderer
+		player.seat = len(self.players)
+		self.players.append(player)
+
+	def _deal_card(self, player, card):
+		'''
+		Gives a card to a player as part of the deal
+		'''
+		player.draw_card(card)
+		if self.events.active:
+			self.events.emit(CARD_DEALT, player.seat, card)
 
 	def _next_player(self, current_index, rot_reversed):
 		'''
@@ -295,17 +871,123 @@ class AbstractGameLogic:
 			new_index = 0
 		return new_index
 	
+	def _say(self, msg, *args):
+		'''
+		Passes msg (formatted with args) to the game's renderer
+		'''
+		self.renderer.say(msg, *args)
+
+	def _pause(self, seconds):
+		'''
+		Paces the game for human viewers
+		'''
+		self.pacer.pause(seconds)
+
 	def _deal(self):
 		'''
 		Handle dealing the cards to each user
 		'''
 		raise NotImplementedError()
 		
-	def _play_game(self):
+	def continue_game(self):
+		'''
+		Plays turns from wherever the game is (e.g. a clone or a restored
+		snapshot) until it is finished, and returns the winner
+		'''
+		while not self.finished:
+			self._play_turn()
+		return self.winner
+
+	def snapshot(self):
+		'''
+		Captures the state of the game so restore() can put it back later,
+		as many times as needed. Cards are immutable, so this only copies
+		the lists and masks that hold them. The random source isn't part
+		of the snapshot
+		'''
+		return self._get_state()
+
+	def restore(self, snapshot):
+		'''
+		Puts the game back into the state captured by snapshot(). The
+		containers and players are updated in place
+		'''
+		self._set_state(snapshot)
+
+	def clone(self, rng = None, headless = True):
+		'''
+		Forks the game: the clone has its own piles, hands and players (and
+		no event listeners) and can be played on without touching this game.
+		It shares this game's random source unless rng is given, and is
+		headless (and silent) unless told otherwise since clones are meant
+		for search
+		'''
+		clone = copy.copy(self)
+		clone.headless = headless
+		clone.renderer = NULL_RENDERER if headless else self.renderer
+		clone.pacer = VirtualClock(self.pacer.now()) if headless else self.pacer
+		clone.events = EventDispatcher(clone.pacer.now)
+		clone.rng = self.rng if rng is None else rng
+		self._clone_containers(clone)
+		clone.players = []
+		for player in self.players:
+			player_clone = player.clone()
+			player_clone.rng = clone.rng
+			player_clone.renderer = clone.renderer
+			clone.players.append(player_clone)
+		if self.winner is not None:
+			clone.winner = clone.players[self.winner.seat]
+		return clone
+
+	def _start_play(self):
+		'''
+		Sets up whatever the game needs before the first turn
+		'''
+		raise NotImplementedError()
+
+	def _play_turn(self):
+		'''
+		Plays a single turn, setting finished once the game is over
+		'''
+		raise NotImplementedError()
+
+	def _reset_cards(self):
 		'''
-		The core loop of the game. Includes all the turn-based game logic
+		Puts every card back into the draw pile, in its starting order,
+		emptying any other piles the game has
 		'''
 		raise NotImplementedError()
+
+	def _get_state(self):
+		'''
+		Everything snapshot() captures; games add their own state
+		'''
+		return {
+			"draw_pile": self.draw_pile.clone(),
+			"players": [player.snapshot() for player in self.players],
+			"winner": self.winner,
+			"finished": self.finished,
+			"num_turns": self.num_turns,
+			"num_draws": self.num_draws,
+			"num_reshuffles": self.num_reshuffles,
+		}
+
+	def _set_state(self, state):
+		self.draw_pile.copy_from(state["draw_pile"])
+		for player, player_snapshot in zip(self.players, state["players"]):
+			player.restore(player_snapshot)
+		self.winner = state["winner"]
+		self.finished = state["finished"]
+		self.num_turns = state["num_turns"]
+		self.num_draws = state["num_draws"]
+		self.num_reshuffles = state["num_reshuffles"]
+
+	def _clone_containers(self, clone):
+		'''
+		Gives the clone its own copy of every card container the game owns
+		(players' hands are handled by the players)
+		'''
+		clone.draw_pile = self.draw_pile.clone()
 	
 	def _get_max_num_players(self):
 		'''
@@ -333,17 +1015,23 @@ class AbstractGameLogic:
 		return AbstractGameLogic.NUM_TIMES_TO_SHUFFLE
 
 class Game:
-	def __init__(self, logic):
-		self.logic = logic()
+	def __init__(self, logic, renderer = None, pacer = None):
+		'''
+		renderer defaults to the console and pacer to real time; see
+		common.render and common.pacing for others
+		'''
+		self.logic = logic(renderer = renderer, pacer = pacer)
 		self.continue_playing = True
 	
 	def start(self):
-		print("\n\n%s\n\n" % self.logic.get_starting_message())
+		renderer = self.logic.renderer
+		renderer.say("\n\n%s\n\n", self.logic.get_starting_message())
 		winner = self.logic.start_game()
 		if winner:
-			print "Congratulations %s; you're the winner!" % winner.name
+			renderer.say("Congratulations %s; you're the winner!", winner.name)
 		else:
-			print "Stalemate!"
+			renderer.say("Stalemate!")
+		renderer.flush()
 				
 				
 				
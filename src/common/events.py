@@ -0,0 +1,129 @@
+try:
+	from time import monotonic as clock
+except ImportError:
+	# python 2 has no monotonic clock; this is the best timer available
+	from timeit import default_timer as clock
+
+GAME_STARTED = "game_started"
+CARD_DEALT = "card_dealt"
+TURN_STARTED = "turn_started"
+CARD_PLAYED = "card_played"
+CARDS_DRAWN = "cards_drawn"
+RESHUFFLE = "reshuffle"
+TURN_ENDED = "turn_ended"
+GAME_FINISHED = "game_finished"
+
+ALL_EVENTS = [GAME_STARTED, CARD_DEALT, TURN_STARTED, CARD_PLAYED, CARDS_DRAWN,
+	RESHUFFLE, TURN_ENDED, GAME_FINISHED]
+
+# Arguments passed to listeners, after the timestamp:
+#   game_started:  (game_logic)
+#   card_dealt:    (seat, card)
+#   turn_started:  (seat)
+#   card_played:   (seat, card, active_suit)
+#   cards_drawn:   (seat, num_cards, from_seat, card); from_seat is None for the
+#                  draw pile, card is the card drawn when the game knows it
+#   reshuffle:     (num_cards)
+#   turn_ended:    (seat, num_cards_in_hand)
+#   game_finished: (winner_seat, num_turns); winner_seat is None for a stalemate
+# In a turn, the first event after turn_started marks the end of the player's
+# decision (everything after it is the game's own bookkeeping)
+
+class EventDispatcher:
+	'''
+	Calls listeners for game events. Listeners are called with a
+	timestamp from now() followed by the event's arguments; a game's
+	dispatcher uses its pacer's clock, so a simulated game's events carry
+	its logical time, and a dispatcher without one the monotonic clock.
+	Emitting code should check active first so nothing is built when
+	nobody listens
+	'''
+	def __init__(self, now = clock):
+		self.now = now
+		self.listeners = {}
+		self.active = False
+
+	def add_listener(self, event, callback):
+		if event not in ALL_EVENTS:
+			raise ValueError("Unknown event %s" % event)
+		self.listeners.setdefault(event, []).append(callback)
+		self.active = True
+
+	def remove_listener(self, event, callback):
+		callbacks = self.listeners.get(event, [])
+		callbacks.remove(callback)
+		if not callbacks:
+			del self.listeners[event]
+		self.active = len(self.listeners) > 0
+
+	def add_observer(self, observer):
+		'''
+		Registers every on_<event> method of observer as a listener
+		'''
+		for event in ALL_EVENTS:
+			callback = getattr(observer, "on_" + event, None)
+			if callback is not None:
+				self.add_listener(event, callback)
+
+	def emit(self, event, *args):
+		callbacks = self.listeners.get(event)
+		if callbacks:
+			timestamp = self.now()
+			for callback in callbacks:
+				callback(timestamp, *args)
+
+class TurnTimer:
+	'''
+	Observer which measures how long turns take, split into the player's
+	decision and the game's bookkeeping. Attach it with
+	logic.events.add_observer(TurnTimer()). It reads the monotonic clock
+	itself, since a simulated game's event timestamps only move with its
+	pauses
+	'''
+	def __init__(self):
+		self.turn_times = []
+		self.decision_time = 0.0
+		self.bookkeeping_time = 0.0
+		self._turn_start = None
+		self._decision_end = None
+
+	def on_turn_started(self, timestamp, seat):
+		self._turn_start = clock()
+		self._decision_end = None
+
+	def _mark_decision(self):
+		if self._turn_start is not None and self._decision_end is None:
+			self._decision_end = clock()
+
+	def on_card_played(self, timestamp, seat, card, active_suit):
+		self._mark_decision()
+
+	def on_cards_drawn(self, timestamp, seat, num_cards, from_seat, card):
+		self._mark_decision()
+
+	def on_turn_ended(self, timestamp, seat, num_cards_in_hand):
+		if self._turn_start is None:
+			return
+		timestamp = clock()
+		decision_end = timestamp if self._decision_end is None else self._decision_end
+		self.turn_times.append(timestamp - self._turn_start)
+		self.decision_time += decision_end - self._turn_start
+		self.bookkeeping_time += timestamp - decision_end
+		self._turn_start = None
+
+	def percentile(self, fraction):
+		'''
+		Turn latency at the given fraction (0.5 for the median)
+		'''
+		if not self.turn_times:
+			return 0.0
+		ordered = sorted(self.turn_times)
+		return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+	def __str__(self):
+		total = self.decision_time + self.bookkeeping_time
+		if not self.turn_times or total == 0:
+			return "no turns timed"
+		return "turns: %d, median: %.1fus, p99: %.1fus, decision: %.1f%%, bookkeeping: %.1f%%" % (
+			len(self.turn_times), self.percentile(.5) * 1e6, self.percentile(.99) * 1e6,
+			100 * self.decision_time / total, 100 * self.bookkeeping_time / total)
@@ -0,0 +1,253 @@
+'''
+Compact append-only binary log of games.
+
+A log is a magic header followed by records. Every record starts with a
+one byte type; card ids and seats are single bytes and suits are indexes
+into the suit table of the game's header. Games follow each other, each
+starting with a GAME record and ending with an END record:
+
+	GAME     name, player names, suit table, deck order (before the deal)
+	DEAL     seat, card
+	PLAY     seat, card, suit
+	DRAW     seat, number of cards, seat drawn from, card (if known)
+	RESHUFFLE  new draw pile order (first card is the one flipped)
+	END      winner seat, number of turns
+'''
+import struct
+
+MAGIC = "PCGL\x01"
+DEFAULT_BUFFER_SIZE = 1 << 20
+# stands for "none" wherever a seat, card or suit is expected
+NONE = 255
+
+GAME = 1
+DEAL = 2
+PLAY = 3
+DRAW = 4
+RESHUFFLE = 5
+END = 6
+
+_DEAL = struct.Struct("<BBB")
+_PLAY = struct.Struct("<BBBB")
+_DRAW = struct.Struct("<BBBBB")
+_END = struct.Struct("<BBI")
+_SHORT = struct.Struct("<H")
+
+class GameLogError(Exception):
+	pass
+
+class GameLogWriter:
+	'''
+	Records games through their events into a binary log. Records are
+	collected in memory and only written out once buffer_size bytes have
+	built up (or on flush()/close()), so logging costs no system calls per
+	move. Games are added to the end of fileobj, which only gets the magic
+	header if it is empty, so a log can be opened in append mode to carry
+	on with it
+	'''
+	def __init__(self, fileobj, buffer_size = DEFAULT_BUFFER_SIZE):
+		self.fileobj = fileobj
+		self.buffer_size = buffer_size
+		self.buffer = bytearray(MAGIC if _is_empty(fileobj) else "")
+		self._logic = None
+		self._suits = None
+
+	def attach(self, logic):
+		'''
+		Starts logging the given game logic; call before start_game()
+		'''
+		logic.events.add_observer(self)
+
+	def flush(self):
+		if self.buffer:
+			self.fileobj.write(bytes(self.buffer))
+			self.buffer = bytearray()
+
+	def close(self):
+		self.flush()
+		self.fileobj.flush()
+
+	###################################
+	# EVENT LISTENERS #################
+	###################################
+	def on_game_started(self, timestamp, logic):
+		self._logic = logic
+		deck = logic.draw_pile.card_list
+		self._suits = []
+		for card in deck:
+			if card.suit is not None and card.suit not in self._suits:
+				self._suits.append(card.suit)
+
+		self.buffer.append(GAME)
+		self._write_string(logic.get_friendly_name())
+		self.buffer.append(len(logic.players))
+		for player in logic.players:
+			self._write_string(player.name)
+		self.buffer.append(len(self._suits))
+		for suit in self._suits:
+			self._write_string(suit)
+		self._write_cards(deck)
+
+	def on_card_dealt(self, timestamp, seat, card):
+		self.buffer.extend(_DEAL.pack(DEAL, seat, _card_byte(card)))
+
+	def on_card_played(self, timestamp, seat, card, active_suit):
+		self.buffer.extend(_PLAY.pack(PLAY, seat, _card_byte(card), self._suit_byte(active_suit)))
+
+	def on_cards_drawn(self, timestamp, seat, num_cards, from_seat, card):
+		self.buffer.extend(_DRAW.pack(DRAW, seat, num_cards,
+			NONE if from_seat is None else from_seat,
+			NONE if card is None else _card_byte(card)))
+
+	def on_reshuffle(self, timestamp, num_cards):
+		logic = self._logic
+		self.buffer.append(RESHUFFLE)
+		self._write_cards([logic.discard_pile.bottom_card(True)] + list(logic.draw_pile.card_list))
+
+	def on_game_finished(self, timestamp, winner_seat, num_turns):
+		self.buffer.extend(_END.pack(END, NONE if winner_seat is None else winner_seat, num_turns))
+		self._logic = None
+		if len(self.buffer) >= self.buffer_size:
+			self.flush()
+
+	###################################
+	# PROTECTED METHODS ###############
+	###################################
+	def _write_string(self, value):
+		value = unicode(value).encode("utf-8")
+		self.buffer.append(len(value))
+		self.buffer.extend(value)
+
+	def _write_cards(self, cards):
+		self.buffer.extend(_SHORT.pack(len(cards)))
+		self.buffer.extend(bytearray([_card_byte(card) for card in cards]))
+
+	def _suit_byte(self, suit):
+		if suit is None:
+			return NONE
+		return self._suits.index(suit)
+
+def _is_empty(fileobj):
+	'''
+	Whether nothing has been written to fileobj yet; streams that can't
+	seek (pipes) are taken to be new
+	'''
+	try:
+		fileobj.seek(0, 2)
+		return fileobj.tell() == 0
+	except (AttributeError, IOError):
+		return True
+
+def _card_byte(card):
+	if card.card_id is None or card.card_id >= NONE:
+		raise GameLogError("Only cards with a card_id below %d can be logged" % NONE)
+	return card.card_id
+
+class LoggedGame:
+	'''
+	One game read back from a log. moves holds the records after the
+	header as tuples, e.g. (PLAY, seat, card_id, suit); raw is the game's
+	exact bytes
+	'''
+	def __init__(self, name, player_names, suits, deck):
+		self.name = name
+		self.player_names = player_names
+		self.suits = suits
+		self.deck = deck
+		self.moves = []
+		self.winner = None
+		self.num_turns = None
+		self.raw = None
+
+	def get_suit(self, suit_byte):
+		return None if suit_byte == NONE else self.suits[suit_byte]
+
+class _Incomplete(Exception):
+	pass
+
+class _Reader:
+	def __init__(self, data, pos = 0):
+		self.data = data
+		self.pos = pos
+
+	def _take(self, count):
+		end = self.pos + count
+		if end > len(self.data):
+			raise _Incomplete()
+		value = self.data[self.pos:end]
+		self.pos = end
+		return value
+
+	def byte(self):
+		return ord(self._take(1))
+
+	def unpack(self, record_struct):
+		return record_struct.unpack(self._take(record_struct.size))
+
+	def string(self):
+		return self._take(self.byte()).decode("utf-8")
+
+	def cards(self):
+		count = self.unpack(_SHORT)[0]
+		return [ord(card) for card in self._take(count)]
+
+def _read_game(reader):
+	'''
+	Reads one whole game starting at the reader's position
+	'''
+	game_start = reader.pos
+	record_type = reader.byte()
+	if record_type != GAME:
+		raise GameLogError("Record of type %d outside of a game" % record_type)
+	name = reader.string()
+	player_names = [reader.string() for _ in range(reader.byte())]
+	suits = [reader.string() for _ in range(reader.byte())]
+	game = LoggedGame(name, player_names, suits, reader.cards())
+	while True:
+		record_type = reader.byte()
+		reader.pos -= 1
+		if record_type == DEAL:
+			game.moves.append(reader.unpack(_DEAL))
+		elif record_type == PLAY:
+			game.moves.append(reader.unpack(_PLAY))
+		elif record_type == DRAW:
+			game.moves.append(reader.unpack(_DRAW))
+		elif record_type == RESHUFFLE:
+			reader.byte()
+			game.moves.append((RESHUFFLE, reader.cards()))
+		elif record_type == END:
+			_, winner, game.num_turns = reader.unpack(_END)
+			game.winner = None if winner == NONE else winner
+			game.raw = reader.data[game_start:reader.pos]
+			return game
+		else:
+			raise GameLogError("Unknown record type %d" % record_type)
+
+def iter_games(fileobj, chunk_size = DEFAULT_BUFFER_SIZE):
+	'''
+	Generator of the LoggedGames in a log file, reading it chunk_size
+	bytes at a time
+	'''
+	if fileobj.read(len(MAGIC)) != MAGIC:
+		raise GameLogError("Not a game log")
+	data = ""
+	at_eof = False
+	while True:
+		reader = _Reader(data)
+		games_end = 0
+		try:
+			while reader.pos < len(data):
+				game = _read_game(reader)
+				games_end = reader.pos
+				yield game
+		except _Incomplete:
+			pass
+		data = data[games_end:]
+		if at_eof:
+			if data:
+				raise GameLogError("Log ends in the middle of a game")
+			return
+		more = fileobj.read(chunk_size)
+		if not more:
+			at_eof = True
+		data += more
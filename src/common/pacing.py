@@ -0,0 +1,51 @@
+'''
+Pacers decide what a game's pauses (the beats that give people time to
+follow along) actually do, and keep the game's notion of time.
+'''
+from events import clock
+from time import sleep
+
+class RealTimePacer:
+	'''
+	Sleeps through every pause; for tables people are watching
+	'''
+	def now(self):
+		return clock()
+
+	def pause(self, seconds):
+		sleep(seconds)
+
+class VirtualClock:
+	'''
+	Pauses cost nothing: they only move the clock forward, so a
+	simulation still gets the logical time its pauses would have taken
+	'''
+	def __init__(self, start = 0.0):
+		self.time = start
+
+	def now(self):
+		return self.time
+
+	def pause(self, seconds):
+		self.time += seconds
+
+class AsyncPacer:
+	'''
+	For games driven a turn at a time by an event loop: pauses are added
+	up instead of slept through, and whatever drives the game takes them
+	with take_delay() after each turn and waits that long without
+	blocking its thread
+	'''
+	def __init__(self):
+		self.delay = 0.0
+
+	def now(self):
+		return clock()
+
+	def pause(self, seconds):
+		self.delay += seconds
+
+	def take_delay(self):
+		delay = self.delay
+		self.delay = 0.0
+		return delay
@@ -0,0 +1,86 @@
+'''
+Renderers take everything a game has to say to the people watching it.
+Messages come in as a format string and its arguments, and are only
+formatted by renderers that are going to show them; code building
+something expensive to show can check enabled first.
+'''
+import sys
+
+DEFAULT_BLOCK_SIZE = 64 * 1024
+
+class Renderer:
+	enabled = True
+
+	def say(self, msg, *args):
+		'''
+		Shows a line of output; msg is formatted with args if any are given
+		'''
+		if args:
+			msg = msg % args
+		self.write(u"%s\n" % msg)
+
+	def write(self, text):
+		raise NotImplementedError()
+
+	def flush(self):
+		'''
+		Makes sure everything said so far has been shown; call before
+		waiting on the user
+		'''
+		pass
+
+class ConsoleRenderer(Renderer):
+	'''
+	Writes every line straight to stream (stdout by default)
+	'''
+	def __init__(self, stream = None):
+		self.stream = sys.stdout if stream is None else stream
+
+	def write(self, text):
+		self.stream.write(_encode(text))
+
+	def flush(self):
+		self.stream.flush()
+
+class BufferedRenderer(Renderer):
+	'''
+	Collects output and writes it to stream in blocks of at least
+	block_size characters (or whenever flush() is called)
+	'''
+	def __init__(self, stream = None, block_size = DEFAULT_BLOCK_SIZE):
+		self.stream = sys.stdout if stream is None else stream
+		self.block_size = block_size
+		self.pending = []
+		self.pending_size = 0
+
+	def write(self, text):
+		self.pending.append(text)
+		self.pending_size += len(text)
+		if self.pending_size >= self.block_size:
+			self.flush()
+
+	def flush(self):
+		if self.pending:
+			self.stream.write(_encode(u"".join(self.pending)))
+			self.pending = []
+			self.pending_size = 0
+		self.stream.flush()
+
+class NullRenderer(Renderer):
+	'''
+	Drops everything without ever formatting it
+	'''
+	enabled = False
+
+	def say(self, msg, *args):
+		pass
+
+	def write(self, text):
+		pass
+
+NULL_RENDERER = NullRenderer()
+
+def _encode(text):
+	if isinstance(text, unicode):
+		return text.encode("utf-8")
+	return text
@@ -0,0 +1,227 @@
+'''
+Per-turn statistics of simulated games, in columns. TurnStatsRecorder
+listens to a game's events and appends one row per turn to array-backed
+columns, which are handed to a sink in chunks of chunk_size rows. Sinks
+write chunked .npz files (if numpy is installed), CSV, or Parquet (with
+pyarrow, when asked for).
+
+Columns:
+	game_id      numbered by the recorder from first_game_id
+	turn         the game's turn count after the turn
+	seat         the seat whose turn it was
+	card_played  card_id of the card played, or -1
+	cards_drawn  cards the seat drew during its turn
+	active_suit  index of the active suit in the sorted list of the deck's
+	             suits (b, g, r, y for Uno), or -1
+	direction    1 for play going up the seats, -1 for down
+	hand_size_N  cards in seat N's hand after the turn, -1 past the last
+	             seat; there are num_seats of these
+'''
+from array import array
+import csv
+import os
+
+try:
+	import numpy as np
+except ImportError:
+	np = None
+
+try:
+	import pyarrow
+	import pyarrow.parquet
+except ImportError:
+	pyarrow = None
+
+DEFAULT_CHUNK_SIZE = 1 << 16
+DEFAULT_NUM_SEATS = 10
+FORMATS = ["npz", "csv", "parquet"]
+
+def get_columns(num_seats = DEFAULT_NUM_SEATS):
+	'''
+	(name, array typecode) of every column
+	'''
+	columns = [("game_id", "i"), ("turn", "i"), ("seat", "b"), ("card_played", "h"),
+		("cards_drawn", "h"), ("active_suit", "b"), ("direction", "b")]
+	for seat in range(num_seats):
+		columns.append(("hand_size_%d" % seat, "h"))
+	return columns
+
+class TurnStatsRecorder:
+	'''
+	Attach to each game with attach() before it starts; games can follow
+	each other (or be reset()) with the same recorder. Call close() once
+	done to write the last rows
+	'''
+	def __init__(self, sink, num_seats = DEFAULT_NUM_SEATS, chunk_size = DEFAULT_CHUNK_SIZE, first_game_id = 0):
+		self.sink = sink
+		self.num_seats = num_seats
+		self.chunk_size = chunk_size
+		self.next_game_id = first_game_id
+		self.columns = get_columns(num_seats)
+		self.buffers = [array(typecode) for _, typecode in self.columns]
+		(self._game_ids, self._turns, self._seats, self._cards, self._draws,
+			self._suits, self._directions) = self.buffers[:7]
+		self._hand_sizes = self.buffers[7:]
+		self.num_rows = 0
+		self._logic = None
+		self._suit_indexes = None
+		self._suit_indexes_by_class = {}
+		self._game_id = None
+		self._seat = None
+		self._card = -1
+		self._drawn = 0
+
+	def attach(self, logic):
+		logic.events.add_observer(self)
+
+	def flush(self):
+		if self.num_rows:
+			self.sink.write_chunk(self.columns, self.buffers)
+			for buffer in self.buffers:
+				del buffer[:]
+			self.num_rows = 0
+
+	def close(self):
+		self.flush()
+		self.sink.close()
+
+	###################################
+	# EVENT LISTENERS #################
+	###################################
+	def on_game_started(self, timestamp, logic):
+		if len(logic.players) > self.num_seats:
+			raise ValueError("Recorder only has columns for %d seats" % self.num_seats)
+		self._logic = logic
+		self._game_id = self.next_game_id
+		self.next_game_id += 1
+		suit_indexes = self._suit_indexes_by_class.get(logic.__class__)
+		if suit_indexes is None:
+			suits = sorted(set(card.suit for card in logic.draw_pile.card_list if card.suit is not None))
+			suit_indexes = self._suit_indexes_by_class[logic.__class__] = dict(
+				(suit, index) for index, suit in enumerate(suits))
+		self._suit_indexes = suit_indexes
+
+	def on_turn_started(self, timestamp, seat):
+		self._seat = seat
+		self._card = -1
+		self._drawn = 0
+
+	def on_card_played(self, timestamp, seat, card, active_suit):
+		self._card = card.card_id
+
+	def on_cards_drawn(self, timestamp, seat, num_cards, from_seat, card):
+		if seat == self._seat:
+			self._drawn += num_cards
+
+	def on_turn_ended(self, timestamp, seat, num_cards_in_hand):
+		logic = self._logic
+		self._game_ids.append(self._game_id)
+		self._turns.append(logic.num_turns)
+		self._seats.append(seat)
+		self._cards.append(self._card)
+		self._draws.append(self._drawn)
+		self._suits.append(self._suit_indexes.get(getattr(logic, "active_suit", None), -1))
+		self._directions.append(-1 if getattr(logic, "rot_reversed", False) else 1)
+		players = logic.players
+		for hand_sizes, player in zip(self._hand_sizes, players):
+			hand_sizes.append(len(player.hand))
+		for hand_sizes in self._hand_sizes[len(players):]:
+			hand_sizes.append(-1)
+		self.num_rows += 1
+		if self.num_rows >= self.chunk_size:
+			self.flush()
+
+	def on_game_finished(self, timestamp, winner_seat, num_turns):
+		self._logic = None
+
+class ParquetTurnSink:
+	'''
+	Writes every chunk as a row group of one Parquet file
+	'''
+	def __init__(self, path):
+		if pyarrow is None:
+			raise ImportError("ParquetTurnSink needs pyarrow")
+		self.path = path
+		self.writer = None
+
+	def write_chunk(self, columns, buffers):
+		arrays = [pyarrow.array(np.frombuffer(buffer, dtype = typecode))
+			for (_, typecode), buffer in zip(columns, buffers)]
+		table = pyarrow.Table.from_arrays(arrays, [name for name, _ in columns])
+		if self.writer is None:
+			self.writer = pyarrow.parquet.ParquetWriter(self.path, table.schema)
+		self.writer.write_table(table)
+
+	def close(self):
+		if self.writer is not None:
+			self.writer.close()
+
+class NpzTurnSink:
+	'''
+	Writes every chunk to its own numbered file, prefix-00000.npz and on,
+	holding an array per column
+	'''
+	def __init__(self, prefix):
+		if np is None:
+			raise ImportError("NpzTurnSink needs numpy")
+		self.prefix = prefix
+		self.paths = []
+
+	def write_chunk(self, columns, buffers):
+		path = "%s-%05d.npz" % (self.prefix, len(self.paths))
+		arrays = dict((name, np.frombuffer(buffer, dtype = typecode))
+			for (name, typecode), buffer in zip(columns, buffers))
+		np.savez(path, **arrays)
+		self.paths.append(path)
+
+	def close(self):
+		pass
+
+class CsvTurnSink:
+	'''
+	Writes rows to a CSV file with a header line
+	'''
+	def __init__(self, path):
+		self.fileobj = open(path, "wb")
+		self.writer = csv.writer(self.fileobj)
+		self._wrote_header = False
+
+	def write_chunk(self, columns, buffers):
+		if not self._wrote_header:
+			self.writer.writerow([name for name, _ in columns])
+			self._wrote_header = True
+		self.writer.writerows(zip(*buffers))
+
+	def close(self):
+		self.fileobj.close()
+
+def split_stats_path(path):
+	'''
+	(path less its extension, format) if path ends in the extension of
+	one of the FORMATS, or else (path, None)
+	'''
+	base, extension = os.path.splitext(path)
+	if extension[1:] in FORMATS:
+		return (base, extension[1:])
+	return (path, None)
+
+def open_turn_sink(path, format = None):
+	'''
+	Opens a sink writing to path with the format's extension (for npz,
+	path is the prefix of the numbered chunk files); an extension path
+	already has is dropped. format is "npz", "csv" or "parquet"; without
+	one, the path's extension says which, or failing that npz if numpy
+	is installed and csv if not
+	'''
+	path, path_format = split_stats_path(path)
+	if format is None:
+		format = path_format
+	if format is None:
+		format = "npz" if np is not None else "csv"
+	if format == "parquet":
+		return ParquetTurnSink(path + ".parquet")
+	if format == "npz":
+		return NpzTurnSink(path)
+	if format == "csv":
+		return CsvTurnSink(path + ".csv")
+	raise ValueError("Unknown turn stats format %s" % format)
@@ -1,8 +1,7 @@
-__all__ = ["uno", "oldmaid", "registry"]
+__all__ = ["uno", "oldmaid", "registry", "tournament", "uno_batch", "replay", "uno_ismcts", "evaluation", "oldmaid_solver", "env", "distributed"]
 
 from registry import GameRegistry
-from uno import UnoGameLogic
-from oldmaid import OldMaidGameLogic
 
-GameRegistry.register_game(UnoGameLogic)
-GameRegistry.register_game(OldMaidGameLogic)
+# the game modules are only imported once a game is played
+GameRegistry.register_lazy_game("Uno!", "games.uno", "UnoGameLogic")
+GameRegistry.register_lazy_game("Old Maid", "games.oldmaid", "OldMaidGameLogic")
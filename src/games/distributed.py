@@ -0,0 +1,385 @@
+'''
+Tournaments spread over several machines. A coordinator splits the games
+into chunks (seed ranges, seeded as in games.tournament) and serves them
+from a broker that workers reach over TCP through a multiprocessing
+manager. Each worker plays a chunk with play_games() and sends back its
+TournamentResult, which only holds counts. A chunk is leased to one
+worker at a time: if the worker reports an error, or doesn't answer
+before the lease runs out (it crashed, or lost its connection), the
+chunk goes back on the queue for another worker. Results are merged in
+chunk order once every chunk is in, so a tournament comes out the same
+however many workers played it, and whichever of them did.
+
+On the coordinating machine:
+	python -m games.distributed coordinator Uno! 1000000 4 [master seed] [port]
+On each worker machine:
+	python -m games.distributed worker <coordinator host>[:port] [num processes]
+
+Workers and coordinator have to share a secret authkey, taken from the
+TOURNAMENT_AUTHKEY environment variable or given with --authkey (which
+other users of the machine can see in the process list). Neither side
+starts without one. The key only proves both ends know it: manager
+connections unpickle what they receive, so anyone holding the key can
+run code on the coordinator and on its workers. Only let trusted
+machines reach the coordinator's port, e.g. behind a firewall or over
+an SSH tunnel; the coordinator command listens on every interface.
+'''
+from collections import deque
+from multiprocessing import AuthenticationError, Process, cpu_count
+from multiprocessing.connection import Client
+from multiprocessing.managers import BaseManager
+from threading import Condition, Thread
+from tournament import DEFAULT_CHUNK_SIZE, TournamentResult, get_logic_class, play_games
+import os
+import socket
+import sys
+import time
+import traceback
+
+DEFAULT_PORT = 50070
+AUTHKEY_VARIABLE = "TOURNAMENT_AUTHKEY"
+DEFAULT_LEASE_TIMEOUT = 600.0
+DEFAULT_MAX_FAILURES = 3
+POLL_INTERVAL = 0.5
+
+def get_authkey(authkey = None):
+	'''
+	authkey if given, else the TOURNAMENT_AUTHKEY environment variable.
+	There is deliberately no built in key to fall back on: raises
+	ValueError if neither is set
+	'''
+	if authkey is None:
+		authkey = os.environ.get(AUTHKEY_VARIABLE)
+	if not authkey:
+		raise ValueError("No authkey: set %s or pass one in" % AUTHKEY_VARIABLE)
+	return authkey
+
+class BrokerManager(BaseManager):
+	'''
+	Serves the coordinator's ChunkBroker to workers
+	'''
+	pass
+
+BrokerManager.register("get_broker")
+
+class ChunkBroker:
+	'''
+	The coordinator's queue of chunks, each a tuple of play_games()
+	arguments (with the game given as the coordinator was given it), and
+	the results handed in so far. Workers call it through a manager
+	proxy, from one thread per connection
+	'''
+	def __init__(self, chunks, num_players, lease_timeout = DEFAULT_LEASE_TIMEOUT, max_failures = DEFAULT_MAX_FAILURES):
+		self.chunks = chunks
+		self.num_players = num_players
+		self.lease_timeout = lease_timeout
+		self.max_failures = max_failures
+		self.pending = deque(range(len(chunks)))
+		self.leases = {}
+		self.results = {}
+		self.failures = {}
+		self.num_requeued = 0
+		self.error = None
+		self.condition = Condition()
+
+	def get_chunk(self, worker_name):
+		'''
+		(chunk index, chunk) to play; (None, None) if every chunk left is
+		leased to other workers, in which case ask again later; None once
+		the tournament is over
+		'''
+		with self.condition:
+			self._expire_leases()
+			if self.is_done():
+				return None
+			if not self.pending:
+				return (None, None)
+			chunk_index = self.pending.popleft()
+			self.leases[chunk_index] = (worker_name, time.time() + self.lease_timeout)
+			return (chunk_index, self.chunks[chunk_index])
+
+	def submit_result(self, worker_name, chunk_index, result):
+		'''
+		Takes a chunk's TournamentResult. A chunk that was played twice
+		(its first lease ran out) keeps the result that came in first; the
+		two are the same anyway, the games being seeded by index
+		'''
+		with self.condition:
+			if chunk_index in self.results:
+				return
+			if result.num_players != self.num_players or result.num_games != self.chunks[chunk_index][4] - self.chunks[chunk_index][3]:
+				self._fail(chunk_index, "%s sent a result that doesn't fit chunk %d" % (worker_name, chunk_index))
+				return
+			self.results[chunk_index] = result
+			self.leases.pop(chunk_index, None)
+			if chunk_index in self.pending:
+				self.pending.remove(chunk_index)
+			self.condition.notify_all()
+
+	def report_failure(self, worker_name, chunk_index, message):
+		'''
+		Puts a chunk that failed back on the queue, or gives up on the
+		tournament if it has failed max_failures times (counting leases
+		that ran out, as a chunk that crashes its worker never reports)
+		'''
+		with self.condition:
+			if chunk_index in self.results:
+				return
+			self._fail(chunk_index, "chunk %d failed on %s:\n%s" % (chunk_index, worker_name, message))
+
+	def is_done(self):
+		return self.error is not None or len(self.results) == len(self.chunks)
+
+	def get_progress(self):
+		'''
+		(chunks done, chunks leased, chunks waiting, chunks requeued)
+		'''
+		with self.condition:
+			return (len(self.results), len(self.leases), len(self.pending), self.num_requeued)
+
+	def wait(self, timeout):
+		'''
+		Waits up to timeout seconds for the tournament to finish; returns
+		whether it has
+		'''
+		with self.condition:
+			if not self.is_done():
+				self.condition.wait(timeout)
+			self._expire_leases()
+			return self.is_done()
+
+	###################################
+	# PROTECTED METHODS ###############
+	###################################
+	def _fail(self, chunk_index, message):
+		self.failures[chunk_index] = self.failures.get(chunk_index, 0) + 1
+		self.leases.pop(chunk_index, None)
+		if self.failures[chunk_index] >= self.max_failures:
+			self.error = message
+			self.condition.notify_all()
+		elif chunk_index not in self.pending:
+			self.pending.appendleft(chunk_index)
+			self.num_requeued += 1
+
+	def _expire_leases(self):
+		now = time.time()
+		for chunk_index, (worker_name, deadline) in self.leases.items():
+			if deadline < now:
+				self._fail(chunk_index, "chunk %d failed: lease on %s expired" % (chunk_index, worker_name))
+
+class Coordinator:
+	'''
+	Runs a tournament on whichever workers connect to address, a (host,
+	port) pair; port 0 picks a free port, which address then holds once
+	start() has been called. It listens on localhost unless given another
+	host; see the module docstring before opening it up. Chunks leased
+	for longer than lease_timeout seconds are handed out again, so it
+	should be well over the time a worker takes for a chunk; a lease
+	running out counts as one of the chunk's max_failures. The authkey
+	defaults to TOURNAMENT_AUTHKEY, and there has to be one
+	'''
+	def __init__(self, game, num_games, num_players, master_seed = 0, chunk_size = DEFAULT_CHUNK_SIZE,
+			address = ("127.0.0.1", DEFAULT_PORT), authkey = None, lease_timeout = DEFAULT_LEASE_TIMEOUT,
+			max_failures = DEFAULT_MAX_FAILURES, stats_path = None, stats_format = None):
+		# fail here rather than on every worker if the game doesn't exist
+		get_logic_class(game)
+		self.authkey = get_authkey(authkey)
+		self.num_players = num_players
+		chunks = []
+		for start in xrange(0, num_games, chunk_size):
+			chunks.append((game, num_players, master_seed, start, min(start + chunk_size, num_games), stats_path, stats_format))
+		self.broker = ChunkBroker(chunks, num_players, lease_timeout, max_failures)
+		self.address = address
+		self.server = None
+		self.local_workers = []
+		self._serve_thread = None
+		self._stopping = False
+
+	def start(self, num_local_workers = 0):
+		'''
+		Starts serving chunks from a background thread, along with
+		num_local_workers worker processes on this machine
+		'''
+		broker = self.broker
+
+		# registered on a class of this coordinator's own, so other
+		# coordinators in the process keep serving their brokers
+		class CoordinatorManager(BrokerManager):
+			pass
+		CoordinatorManager.register("get_broker", callable = lambda: broker)
+
+		self.server = CoordinatorManager(self.address, self.authkey).get_server()
+		self.address = self.server.address
+		self._stopping = False
+		self._serve_thread = Thread(target = self._serve)
+		self._serve_thread.daemon = True
+		self._serve_thread.start()
+		for index in range(num_local_workers):
+			process = Process(target = self._run_local_worker, args = ("local %d" % (index + 1),))
+			process.daemon = True
+			process.start()
+			self.local_workers.append(process)
+
+	def wait(self, progress_interval = None):
+		'''
+		Waits for every chunk and returns the merged TournamentResult.
+		Prints progress every progress_interval seconds if given. Raises
+		RuntimeError if a chunk failed too often. Stops the server once
+		done either way
+		'''
+		try:
+			last_report = time.time()
+			while not self.broker.wait(POLL_INTERVAL):
+				if progress_interval is not None and time.time() - last_report >= progress_interval:
+					last_report = time.time()
+					print "chunks done: %d, playing: %d, waiting: %d, requeued: %d" % self.broker.get_progress()
+			for process in self.local_workers:
+				process.join()
+		finally:
+			self.stop()
+		if self.broker.error is not None:
+			raise RuntimeError(self.broker.error)
+		result = TournamentResult(self.num_players)
+		for chunk_index in range(len(self.broker.chunks)):
+			result.merge(self.broker.results[chunk_index])
+		return result
+
+	def run(self, num_local_workers = 0, progress_interval = None):
+		self.start(num_local_workers)
+		return self.wait(progress_interval)
+
+	def stop(self):
+		'''
+		Stops taking connections and closes the listening socket; workers
+		already connected are served until they hang up
+		'''
+		if self._serve_thread is None:
+			return
+		self._stopping = True
+		try:
+			# wakes the serving thread up from accept()
+			Client(self._get_connect_address(), authkey = self.authkey).close()
+		except (EOFError, IOError, AuthenticationError):
+			pass
+		self._serve_thread.join()
+		self._serve_thread = None
+
+	###################################
+	# PROTECTED METHODS ###############
+	###################################
+	def _run_local_worker(self, name):
+		# the forked worker has its own copy of the listening socket, which
+		# would keep the port open (and leave the worker hanging when it
+		# hangs up) after stop()
+		self.server.listener.close()
+		run_worker(self._get_connect_address(), self.authkey, name)
+
+	def _serve(self):
+		'''
+		The manager server's accept loop, less serve_forever()'s lack of a
+		way out, and carrying on past a client that fails the handshake
+		'''
+		server = self.server
+		try:
+			while not self._stopping:
+				try:
+					connection = server.listener.accept()
+				except (EOFError, IOError, OSError, AuthenticationError):
+					continue
+				if self._stopping:
+					connection.close()
+					break
+				thread = Thread(target = server.handle_request, args = (connection,))
+				thread.daemon = True
+				thread.start()
+		finally:
+			server.listener.close()
+
+	def _get_connect_address(self):
+		host, port = self.address
+		if host in ("", "0.0.0.0"):
+			host = "127.0.0.1"
+		return (host, port)
+
+def run_worker(address, authkey = None, name = None):
+	'''
+	Plays chunks from the coordinator at address until the tournament is
+	over or the coordinator goes away; returns the number of chunks played
+	'''
+	authkey = get_authkey(authkey)
+	if name is None:
+		name = "%s:%d" % (socket.gethostname(), os.getpid())
+	manager = BrokerManager(address, authkey)
+	manager.connect()
+	broker = manager.get_broker()
+	num_played = 0
+	try:
+		while True:
+			task = broker.get_chunk(name)
+			if task is None:
+				break
+			chunk_index, chunk = task
+			if chunk_index is None:
+				time.sleep(POLL_INTERVAL)
+				continue
+			try:
+				game, num_players, master_seed, start, stop, stats_path, stats_format = chunk
+				result = play_games(get_logic_class(game), num_players, master_seed, start, stop, stats_path, stats_format)
+			except Exception:
+				broker.report_failure(name, chunk_index, traceback.format_exc())
+				continue
+			broker.submit_result(name, chunk_index, result)
+			num_played += 1
+	except (EOFError, IOError):
+		# the coordinator has finished and shut down
+		pass
+	return num_played
+
+def run_workers(address, authkey = None, num_processes = None):
+	'''
+	run_worker() in num_processes processes (one per CPU by default)
+	'''
+	authkey = get_authkey(authkey)
+	if num_processes is None:
+		num_processes = cpu_count()
+	processes = [Process(target = run_worker, args = (address, authkey)) for _ in range(num_processes)]
+	for process in processes:
+		process.start()
+	for process in processes:
+		process.join()
+
+def _parse_address(text):
+	host, _, port = text.partition(":")
+	return (host, int(port) if port else DEFAULT_PORT)
+
+def _usage():
+	print "Usage: distributed.py coordinator <game name> <num games> <num players> [master seed] [port] [--authkey <key>]"
+	print "       distributed.py worker <coordinator host>[:port] [num processes] [--authkey <key>]"
+	print "The authkey can be set in %s instead" % AUTHKEY_VARIABLE
+	sys.exit(1)
+
+if __name__ == "__main__":
+	args = sys.argv[1:]
+	authkey = None
+	if "--authkey" in args:
+		index = args.index("--authkey")
+		if index + 1 >= len(args):
+			_usage()
+		authkey = args[index + 1]
+		del args[index:index + 2]
+	try:
+		authkey = get_authkey(authkey)
+	except ValueError as error:
+		print error
+		_usage()
+	if len(args) >= 4 and args[0] == "coordinator":
+		import games
+		coordinator = Coordinator(args[1], int(args[2]), int(args[3]),
+			int(args[4]) if len(args) > 4 else 0,
+			address = ("", int(args[5]) if len(args) > 5 else DEFAULT_PORT), authkey = authkey)
+		print coordinator.run(progress_interval = 10)
+	elif len(args) >= 2 and args[0] == "worker":
+		import games
+		run_workers(_parse_address(args[1]), authkey, int(args[2]) if len(args) > 2 else None)
+	else:
+		_usage()
@@ -0,0 +1,353 @@
+'''
+Step by step play for training policies. A GameEnv plays one table: the
+seats in agent_seats are played by the caller through reset(),
+legal_actions() and step(action), and every other seat plays the game's
+default policy while the env plays on to the next decision. A VectorEnv
+steps many tables in one call and returns NumPy arrays.
+
+Actions are ints:
+	Uno: card_id * 4 + the index of the suit in UnoCardFactory.SUITS. A
+	card that isn't wild can only be played as its own suit. A turn where
+	nothing in the hand matches isn't a decision: the player draws until
+	a card matches and plays it.
+	Old Maid: the position of the card to draw in the next opponent's hand.
+
+An observation is from the point of view of the seat about to decide:
+	hand: how many of each card type it holds
+	top_card: the card type to play on (-1 if the game has none)
+	active_suit: the index of the suit to follow (-1 if none)
+	hand_sizes: every seat's number of cards, starting with its own and
+	going round the table
+	legal: whether each action is legal, by action
+	seat: the deciding seat
+'''
+from common.common import StandardCardFactory
+from oldmaid import OldMaidCardFactory, OldMaidGameLogic, OldMaidPlayer
+from tournament import get_game_seed
+from uno import UnoCardFactory, UnoGameLogic, UnoPlayer
+from uno_batch import NUM_TYPES, get_card_type
+
+try:
+	import numpy as np
+except ImportError:
+	np = None
+
+NUM_UNO_CARDS = len(UnoCardFactory().get_shared_cards())
+NUM_UNO_SUITS = len(UnoCardFactory.SUITS)
+
+class UnoEnvPlayer(UnoPlayer):
+	'''
+	Plays the card (and picks the suit) of the action it was given
+	'''
+	NUM_ACTIONS = NUM_UNO_CARDS * NUM_UNO_SUITS
+	NUM_CARD_TYPES = NUM_TYPES
+	CARD_TYPES = [get_card_type(card) for card in UnoCardFactory().get_shared_cards()]
+
+	def __init__(self, name):
+		self.next_card = None
+		self.next_suit = None
+		UnoPlayer.__init__(self, name)
+
+	@staticmethod
+	def get_table_features(game_logic):
+		'''
+		(top card type, active suit index)
+		'''
+		top_card = game_logic.discard_pile.bottom_card(True)
+		if game_logic.active_suit is None:
+			# a wild card was turned up to start the game
+			return (UnoEnvPlayer.CARD_TYPES[top_card.card_id], -1)
+		return (UnoEnvPlayer.CARD_TYPES[top_card.card_id], UnoCardFactory.SUITS.index(game_logic.active_suit))
+
+	def get_legal_actions(self, game_logic):
+		active_card = game_logic.discard_pile.bottom_card(True)
+		actions = []
+		for card in self.hand.get_matches(active_card, game_logic.active_suit):
+			first_action = card.card_id * NUM_UNO_SUITS
+			if card.is_wild():
+				actions.extend(range(first_action, first_action + NUM_UNO_SUITS))
+			else:
+				actions.append(first_action + UnoCardFactory.SUITS.index(card.suit))
+		return actions
+
+	def set_action(self, action, game_logic):
+		'''
+		Raises ValueError for an action that isn't legal
+		'''
+		if action not in self.get_legal_actions(game_logic):
+			raise ValueError("action %r isn't legal" % action)
+		card_id, suit_index = divmod(action, NUM_UNO_SUITS)
+		self.next_card = self.hand.cards_by_id[card_id]
+		self.next_suit = UnoCardFactory.SUITS[suit_index] if self.next_card.is_wild() else None
+
+	def reset(self):
+		UnoPlayer.reset(self)
+		self.next_card = None
+		self.next_suit = None
+
+	def determine_best_match(self, card, active_suit):
+		if self.next_card is not None:
+			chosen_card = self.next_card
+			self.next_card = None
+			return chosen_card
+		return UnoPlayer.determine_best_match(self, card, active_suit)
+
+	def _get_choice_in_list(self, selection_list):
+		if self.next_suit is not None:
+			suit = self.next_suit
+			self.next_suit = None
+			return suit
+		return UnoPlayer._get_choice_in_list(self, selection_list)
+
+class OldMaidEnvPlayer(OldMaidPlayer):
+	'''
+	Draws the card at the position its action names. Once pairs are
+	discarded a hand holds at most one card of each value, so there are
+	never more positions to choose from than values
+	'''
+	NUM_ACTIONS = len(StandardCardFactory.VALUES)
+	NUM_CARD_TYPES = len(StandardCardFactory.VALUES)
+	CARD_TYPES = None
+
+	def __init__(self, name):
+		self.next_index = None
+		OldMaidPlayer.__init__(self, name)
+
+	@staticmethod
+	def get_table_features(game_logic):
+		return (-1, -1)
+
+	def get_legal_actions(self, game_logic):
+		draw_from_seat = game_logic.next_seat[self.seat]
+		if draw_from_seat == self.seat:
+			return []
+		return range(game_logic.players[draw_from_seat].num_cards_in_hand())
+
+	def set_action(self, action, game_logic):
+		'''
+		Raises ValueError for a position that doesn't exist
+		'''
+		if action not in self.get_legal_actions(game_logic):
+			raise ValueError("action %r isn't legal" % action)
+		self.next_index = action
+
+	def reset(self):
+		OldMaidPlayer.reset(self)
+		self.next_index = None
+
+	def take_turn(self, **kwargs):
+		if self.next_index is None:
+			return OldMaidPlayer.take_turn(self, **kwargs)
+		hand = kwargs.get("draw_from_player").hand
+		card = hand.card_list[self.next_index]
+		self.next_index = None
+		hand.remove_card(card)
+		self._say("drew a %s", card)
+		self.hand.add_card(card)
+		self.discard_pairs()
+		return card
+
+OldMaidEnvPlayer.CARD_TYPES = [StandardCardFactory.VALUES.index(card.value)
+	for card in OldMaidCardFactory().get_shared_cards()]
+
+ENV_PLAYER_CLASSES = [
+	(UnoGameLogic, UnoEnvPlayer),
+	(OldMaidGameLogic, OldMaidEnvPlayer),
+]
+
+def get_env_player_class(logic_class):
+	for game_logic_class, player_class in ENV_PLAYER_CLASSES:
+		if issubclass(logic_class, game_logic_class):
+			return player_class
+	raise KeyError("%s has no env player" % logic_class.get_friendly_name())
+
+class GameEnv:
+	'''
+	One table. Other seats play as opponent_class (the game's default
+	player class unless given). step() returns (observation, reward,
+	done, info): reward is, for the seat that acted, 1 if the game ended
+	with it winning, -1 if it ended with another seat winning and 0
+	otherwise; info has the acting "seat" and, once the game is over,
+	the "winner" seat (None for a stalemate)
+	'''
+	def __init__(self, logic_class, num_players, agent_seats = (0,), opponent_class = None, seed = None):
+		self.logic_class = logic_class
+		self.num_players = num_players
+		self.agent_seats = frozenset(agent_seats)
+		self.player_class = get_env_player_class(logic_class)
+		self.seed = seed
+		self.logic = None
+		self.players = []
+		for seat in range(num_players):
+			name = "seat %d" % (seat + 1)
+			if seat in self.agent_seats:
+				self.players.append(self.player_class(name))
+			elif opponent_class is not None:
+				self.players.append(opponent_class(name))
+			else:
+				self.players.append(name)
+
+	@property
+	def done(self):
+		return self.logic.finished
+
+	@property
+	def seat(self):
+		'''
+		The seat to decide next
+		'''
+		return self.logic.player_index
+
+	def reset(self, seed = None):
+		'''
+		Starts a new game and plays on to the first decision. Without a
+		seed, the first game uses the env's seed and later ones carry on
+		the game's random source. A game that ends before any agent seat
+		has a decision to make is skipped
+		'''
+		while True:
+			if self.logic is None:
+				self.logic = self.logic_class(self.seed if seed is None else seed, True)
+				self.logic.begin(self.players)
+			else:
+				self.logic.reset(seed)
+				self.logic.begin()
+			self._play_to_decision()
+			if not self.logic.finished:
+				return self.observe()
+			seed = None
+
+	def legal_actions(self):
+		if self.logic.finished:
+			return []
+		return self.logic.legal_actions()
+
+	def step(self, action):
+		reward, done, info = self._play_action(action)
+		return (self.observe(), reward, done, info)
+
+	def observe(self):
+		'''
+		The observation as a dict of plain lists and ints
+		'''
+		hand_types, top_card, active_suit, hand_sizes, legal_actions = self.get_features()
+		hand = [0] * self.player_class.NUM_CARD_TYPES
+		for card_type in hand_types:
+			hand[card_type] += 1
+		legal = [False] * self.player_class.NUM_ACTIONS
+		for action in legal_actions:
+			legal[action] = True
+		return {"hand": hand, "top_card": top_card, "active_suit": active_suit,
+			"hand_sizes": hand_sizes, "legal": legal, "seat": self.logic.player_index}
+
+	def get_features(self):
+		'''
+		(card types in the deciding seat's hand, top card type, active
+		suit index, hand sizes from the deciding seat round, legal actions)
+		'''
+		logic = self.logic
+		seat = logic.player_index
+		card_types = self.player_class.CARD_TYPES
+		hand_types = [card_types[card.card_id] for card in logic.players[seat].hand.card_list]
+		top_card, active_suit = self.player_class.get_table_features(logic)
+		hand_sizes = [logic.players[(seat + offset) % self.num_players].num_cards_in_hand()
+			for offset in range(self.num_players)]
+		return (hand_types, top_card, active_suit, hand_sizes, self.legal_actions())
+
+	###################################
+	# PROTECTED METHODS ###############
+	###################################
+	def _play_action(self, action):
+		'''
+		Plays the action and on to the next decision; returns (reward,
+		done, info)
+		'''
+		logic = self.logic
+		seat = logic.player_index
+		logic.step(action)
+		self._play_to_decision()
+		info = {"seat": seat}
+		reward = 0
+		if logic.finished:
+			winner = logic.winner
+			info["winner"] = None if winner is None else winner.seat
+			if winner is not None:
+				reward = 1 if winner.seat == seat else -1
+		return (reward, logic.finished, info)
+
+	def _play_to_decision(self):
+		'''
+		Plays turns until one of the agent seats has a decision to make or
+		the game is over
+		'''
+		logic = self.logic
+		while not logic.finished:
+			if logic.player_index in self.agent_seats and logic.legal_actions():
+				return
+			logic.step()
+
+class VectorEnv:
+	'''
+	num_envs GameEnvs stepped together. Observations are a dict of arrays
+	with the tables along the first axis, filled in place (copy them to
+	keep them past the next step). A table whose game ends is reset
+	straight away, so its observation is the next game's first decision
+	and its reward and done are for the game that ended
+	'''
+	def __init__(self, logic_class, num_envs, num_players, agent_seats = (0,), opponent_class = None, seed = 0):
+		if np is None:
+			raise ImportError("VectorEnv needs numpy")
+		self.envs = [GameEnv(logic_class, num_players, agent_seats, opponent_class, get_game_seed(seed, index))
+			for index in range(num_envs)]
+		player_class = self.envs[0].player_class
+		self.observations = {
+			"hand": np.zeros((num_envs, player_class.NUM_CARD_TYPES), dtype = np.int16),
+			"top_card": np.zeros(num_envs, dtype = np.int16),
+			"active_suit": np.zeros(num_envs, dtype = np.int16),
+			"hand_sizes": np.zeros((num_envs, num_players), dtype = np.int16),
+			"legal": np.zeros((num_envs, player_class.NUM_ACTIONS), dtype = bool),
+			"seat": np.zeros(num_envs, dtype = np.int16),
+		}
+		self.rewards = np.zeros(num_envs, dtype = np.float32)
+		self.dones = np.zeros(num_envs, dtype = bool)
+
+	def reset(self):
+		for index, env in enumerate(self.envs):
+			env.reset()
+			self._write_observation(index, env)
+		return self.observations
+
+	def step(self, actions):
+		'''
+		Plays actions[i] at table i; returns (observations, rewards, dones,
+		infos)
+		'''
+		infos = []
+		for index, env in enumerate(self.envs):
+			reward, done, info = env._play_action(int(actions[index]))
+			self.rewards[index] = reward
+			self.dones[index] = done
+			if done:
+				env.reset()
+			self._write_observation(index, env)
+			infos.append(info)
+		return (self.observations, self.rewards, self.dones, infos)
+
+	###################################
+	# PROTECTED METHODS ###############
+	###################################
+	def _write_observation(self, index, env):
+		hand_types, top_card, active_suit, hand_sizes, legal_actions = env.get_features()
+		observations = self.observations
+		hand = observations["hand"][index]
+		hand[:] = 0
+		for card_type in hand_types:
+			hand[card_type] += 1
+		observations["top_card"][index] = top_card
+		observations["active_suit"][index] = active_suit
+		observations["hand_sizes"][index] = hand_sizes
+		legal = observations["legal"][index]
+		legal[:] = False
+		if legal_actions:
+			legal[legal_actions] = True
+		observations["seat"][index] = env.logic.player_index
@@ -0,0 +1,314 @@
+'''
+Head-to-head evaluation of player policies. A policy is anything that
+makes a player from a name: a player class (UnoPlayer, OldMaidPlayer or
+a subclass) or a callable such as functools.partial(UnoISMCTSPlayer,
+rollout_budget = 50).
+
+Every matchup is played in blocks. A block is one deal, played once for
+each rotation of the two policies around the table, so both policies
+play every seat on exactly the same cards; every matchup uses the same
+deals too (common random numbers). Luck of the deal mostly cancels out
+within a block, which makes the block scores far less noisy than single
+games. After every batch of blocks the result is tested and play stops
+as soon as one policy is significantly better.
+
+	python -m games.evaluation Uno! 4 games.uno.UnoPlayer games.uno_ismcts.UnoISMCTSPlayer
+'''
+from common.common import AbstractPlayer
+from multiprocessing import Pool, cpu_count
+from tournament import get_game_seed, get_logic_class
+import importlib
+import math
+import sys
+
+DEFAULT_ALPHA = 0.05
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_MAX_BLOCKS = 2000
+
+def make_player(policy, name):
+	'''
+	Builds a player from a policy
+	'''
+	player = policy(name)
+	if not isinstance(player, AbstractPlayer):
+		raise TypeError("Policy %r made %r, which isn't a player" % (policy, player))
+	return player
+
+def get_lineups(num_players):
+	'''
+	The seatings a block is played under, as tuples of 0 (first policy)
+	and 1 (second policy) by seat: every rotation of the two alternating
+	seatings. Each policy has the same number of seats over a block, and
+	plays each seat equally often
+	'''
+	lineups = []
+	for first in (0, 1):
+		lineup = [(first + seat) % 2 for seat in range(num_players)]
+		for shift in range(num_players):
+			rotated = tuple(lineup[shift:] + lineup[:shift])
+			if rotated not in lineups:
+				lineups.append(rotated)
+	return lineups
+
+def normal_cdf(z):
+	return 0.5 * math.erfc(-z / math.sqrt(2))
+
+def normal_quantile(p):
+	'''
+	Inverse of normal_cdf, by bisection
+	'''
+	low, high = -40.0, 40.0
+	for _ in range(100):
+		middle = (low + high) / 2
+		if normal_cdf(middle) < p:
+			low = middle
+		else:
+			high = middle
+	return (low + high) / 2
+
+class MatchupResult:
+	'''
+	Running totals for one pair of policies. Scores are from the first
+	policy's point of view: a game it wins scores 1, a game the second
+	policy wins 0 and a stalemate 0.5; a block scores the mean of its
+	games, so evenly matched policies average 0.5. Results for separate
+	blocks can be combined with merge()
+	'''
+	def __init__(self, first, second, num_players):
+		self.first = first
+		self.second = second
+		self.num_players = num_players
+		self.num_blocks = 0
+		self.num_games = 0
+		self.first_wins = 0
+		self.second_wins = 0
+		self.num_stalemates = 0
+		self.total_score = 0.0
+		self.total_squared_score = 0.0
+		self.num_looks = 0
+		self.significant = False
+
+	def add_block(self, outcomes):
+		'''
+		Folds in one block, given the winning policy (0 or 1, or None for
+		a stalemate) of each of its games
+		'''
+		score = 0.0
+		for outcome in outcomes:
+			if outcome is None:
+				self.num_stalemates += 1
+				score += 0.5
+			elif outcome == 0:
+				self.first_wins += 1
+				score += 1
+			else:
+				self.second_wins += 1
+		score /= len(outcomes)
+		self.num_blocks += 1
+		self.num_games += len(outcomes)
+		self.total_score += score
+		self.total_squared_score += score * score
+
+	def merge(self, other):
+		self.num_blocks += other.num_blocks
+		self.num_games += other.num_games
+		self.first_wins += other.first_wins
+		self.second_wins += other.second_wins
+		self.num_stalemates += other.num_stalemates
+		self.total_score += other.total_score
+		self.total_squared_score += other.total_squared_score
+
+	def mean_score(self):
+		if self.num_blocks == 0:
+			return 0.5
+		return self.total_score / self.num_blocks
+
+	def std_error(self):
+		'''
+		Standard error of mean_score(), from the spread of block scores
+		'''
+		if self.num_blocks < 2:
+			return float("inf")
+		mean = self.mean_score()
+		variance = (self.total_squared_score - self.num_blocks * mean * mean) / (self.num_blocks - 1)
+		return math.sqrt(max(variance, 0.0) / self.num_blocks)
+
+	def z_score(self):
+		std_error = self.std_error()
+		if std_error == 0:
+			if self.mean_score() == 0.5:
+				return 0.0
+			return float("inf") if self.mean_score() > 0.5 else float("-inf")
+		return (self.mean_score() - 0.5) / std_error
+
+	def p_value(self):
+		'''
+		Two sided, for the policies being evenly matched; this is the
+		fixed sample p value, so compare it against the per-look alpha
+		when play was stopped early
+		'''
+		return 2 * normal_cdf(-abs(self.z_score()))
+
+	def confidence_interval(self, alpha = DEFAULT_ALPHA):
+		'''
+		(low, high) bounds on the first policy's expected block score
+		'''
+		margin = normal_quantile(1 - alpha / 2) * self.std_error()
+		return (self.mean_score() - margin, self.mean_score() + margin)
+
+	def leader(self):
+		'''
+		Name of the policy that scored better, or None if they're level
+		'''
+		if self.mean_score() > 0.5:
+			return self.first
+		if self.mean_score() < 0.5:
+			return self.second
+		return None
+
+	def __str__(self):
+		low, high = self.confidence_interval()
+		verdict = ("%s is better" % self.leader()) if self.significant else "no significant difference"
+		return "%s vs %s: %.4f [%.4f, %.4f] over %d blocks (%d games, %d-%d, %d stalemates); %s" % (
+			self.first, self.second, self.mean_score(), low, high, self.num_blocks, self.num_games,
+			self.first_wins, self.second_wins, self.num_stalemates, verdict)
+
+class EvaluationResult:
+	'''
+	The MatchupResult for every pair of policies
+	'''
+	def __init__(self, names):
+		self.names = names
+		self.matchups = {}
+
+	def add_matchup(self, matchup):
+		self.matchups[(matchup.first, matchup.second)] = matchup
+
+	def get_score(self, first, second):
+		'''
+		first's mean block score against second
+		'''
+		if (first, second) in self.matchups:
+			return self.matchups[(first, second)].mean_score()
+		return 1 - self.matchups[(second, first)].mean_score()
+
+	def total_games(self):
+		return sum(matchup.num_games for matchup in self.matchups.itervalues())
+
+	def __str__(self):
+		width = max(8, max(len(name) for name in self.names))
+		lines = [" " * width + "".join(" %*s" % (width, name) for name in self.names)]
+		for first in self.names:
+			cells = []
+			for second in self.names:
+				if first == second:
+					cells.append(" %*s" % (width, "-"))
+				else:
+					cells.append(" %*.4f" % (width, self.get_score(first, second)))
+			lines.append("%-*s%s" % (width, first, "".join(cells)))
+		for first, second in sorted(self.matchups):
+			lines.append(str(self.matchups[(first, second)]))
+		return "\n".join(lines)
+
+def get_look_alpha(alpha, look, max_looks):
+	'''
+	The share of alpha spent on a look: it is split over the looks in
+	proportion to the growth of (look / max_looks) ** 2, so early looks
+	(on few blocks) only stop for very lopsided results. The shares add
+	up to alpha, so the chance of ever stopping on two evenly matched
+	policies stays below alpha however many looks are taken
+	'''
+	return alpha * (look * look - (look - 1) * (look - 1)) / float(max_looks * max_looks)
+
+def play_blocks(logic_class, num_players, policies, master_seed, start, stop):
+	'''
+	Plays blocks start..stop-1 of a matchup between policies (a pair) in
+	this process; returns the winning policy of every game, by block
+	'''
+	lineups = get_lineups(num_players)
+	blocks = []
+	for block_index in xrange(start, stop):
+		outcomes = []
+		for lineup in lineups:
+			logic = logic_class(get_game_seed(master_seed, block_index), True)
+			players = [make_player(policies[side], "p%d" % (seat + 1)) for seat, side in enumerate(lineup)]
+			result = logic.simulate(players)
+			outcomes.append(None if result.winner_index is None else lineup[result.winner_index])
+		blocks.append(outcomes)
+	return blocks
+
+def _play_chunk(args):
+	return play_blocks(*args)
+
+def run_matchup(game, num_players, first, second, master_seed = 0, alpha = DEFAULT_ALPHA,
+		batch_size = DEFAULT_BATCH_SIZE, max_blocks = DEFAULT_MAX_BLOCKS, pool = None, chunk_size = 10):
+	'''
+	Plays first against second, each a (name, policy) pair, a batch of
+	batch_size blocks at a time until the difference between them is
+	significant at level alpha or max_blocks blocks have been played.
+	Batches are split over pool's workers if a pool is given, in which
+	case the policies have to be picklable
+	'''
+	logic_class = get_logic_class(game)
+	policies = (first[1], second[1])
+	matchup = MatchupResult(first[0], second[0], num_players)
+	max_looks = int(math.ceil(float(max_blocks) / batch_size))
+	while matchup.num_blocks < max_blocks:
+		start = matchup.num_blocks
+		stop = min(start + batch_size, max_blocks)
+		chunks = [(logic_class, num_players, policies, master_seed, chunk_start, min(chunk_start + chunk_size, stop))
+			for chunk_start in xrange(start, stop, chunk_size)]
+		if pool is None:
+			chunk_results = map(_play_chunk, chunks)
+		else:
+			chunk_results = pool.map(_play_chunk, chunks)
+		for blocks in chunk_results:
+			for outcomes in blocks:
+				matchup.add_block(outcomes)
+
+		matchup.num_looks += 1
+		look_alpha = get_look_alpha(alpha, matchup.num_looks, max_looks)
+		if matchup.num_blocks >= 2 and matchup.p_value() < look_alpha:
+			matchup.significant = True
+			break
+	return matchup
+
+def run_evaluation(game, num_players, policies, master_seed = 0, alpha = DEFAULT_ALPHA,
+		batch_size = DEFAULT_BATCH_SIZE, max_blocks = DEFAULT_MAX_BLOCKS, num_workers = 1):
+	'''
+	Round robin of every pair of policies, given as a list of (name,
+	policy) pairs. Every matchup is played on the same deals. Returns an
+	EvaluationResult
+	'''
+	names = [name for name, _ in policies]
+	if len(set(names)) != len(names):
+		raise ValueError("Policy names must be unique")
+	result = EvaluationResult(names)
+	if num_workers is None:
+		num_workers = cpu_count()
+	pool = Pool(num_workers) if num_workers > 1 else None
+	try:
+		for index, first in enumerate(policies):
+			for second in policies[index + 1:]:
+				result.add_matchup(run_matchup(game, num_players, first, second, master_seed, alpha,
+					batch_size, max_blocks, pool))
+	finally:
+		if pool is not None:
+			pool.close()
+			pool.join()
+	return result
+
+def _import_policy(path):
+	'''
+	Looks up a policy by its dotted path, e.g. games.uno.UnoPlayer
+	'''
+	module_path, _, attribute = path.rpartition(".")
+	return getattr(importlib.import_module(module_path), attribute)
+
+if __name__ == "__main__":
+	if len(sys.argv) < 5:
+		print "Usage: evaluation.py <game name> <num players> <policy path> <policy path> [...]"
+		sys.exit(1)
+	import games
+	paths = sys.argv[3:]
+	print run_evaluation(sys.argv[1], int(sys.argv[2]), [(path.rpartition(".")[2], _import_policy(path)) for path in paths])
@@ -1,16 +1,16 @@
 from common.common import AbstractGameLogic, AbstractPlayer
-from common.common import Card, CardContainer, StandardCardFactory
-from time import sleep
+from common.common import BitsetCardContainer, Card, CardContainer, CardPile, StandardCardFactory
+from common.events import CARDS_DRAWN, TURN_ENDED, TURN_STARTED
 
 def get_game_play_class():
 	return OldMaidGameLogic
 
 class OldMaidCard(Card):
-	pass
+	__slots__ = ()
 
 class OldMaidCardFactory(StandardCardFactory):
-	def get_cards(self):
-		cards = StandardCardFactory.get_cards(self)
+	def _create_cards(self):
+		cards = StandardCardFactory._create_cards(self)
 		cards_to_remove = []
 		for card in cards:
 			if card.value == "Q":
@@ -18,50 +18,145 @@ class OldMaidCardFactory(StandardCardFactory):
 				if len(cards_to_remove) == 3:
 					break;
 		for card_to_remove in cards_to_remove:
-			print card_to_remove
 			cards.remove(card_to_remove)
 		return cards	
 	
+class OldMaidHand(BitsetCardContainer):
+	'''
+	Hand which pairs cards up as they come in: unpaired holds the card of
+	each value still waiting for a partner, and pairs the pairs made since
+	the last take_pairs(), so finding pairs never means scanning the hand
+	'''
+	def __init__(self, card_contents = None):
+		self.unpaired = {}
+		self.pairs = []
+		BitsetCardContainer.__init__(self, card_contents)
+
+	def take_pairs(self):
+		'''
+		Returns the pairs made since the last call; the cards stay in the
+		hand
+		'''
+		pairs = self.pairs
+		self.pairs = []
+		return pairs
+
+	def clear(self):
+		BitsetCardContainer.clear(self)
+		self.unpaired = {}
+		self.pairs = []
+
+	def reset(self, card_contents = None):
+		self.unpaired.clear()
+		del self.pairs[:]
+		BitsetCardContainer.reset(self, card_contents)
+
+	def copy_from(self, src_card_container):
+		if not isinstance(src_card_container, OldMaidHand):
+			self.clear()
+			for card in src_card_container.card_list:
+				self.add_card(card)
+			return
+		BitsetCardContainer.copy_from(self, src_card_container)
+		self.unpaired = dict(src_card_container.unpaired)
+		self.pairs = list(src_card_container.pairs)
+
+	###################################
+	# PROTECTED METHODS ###############
+	###################################
+	def _add_card_to_meta_lists(self, card):
+		BitsetCardContainer._add_card_to_meta_lists(self, card)
+		self._pair_up(card)
+
+	def _remove_card_from_meta_lists(self, card):
+		BitsetCardContainer._remove_card_from_meta_lists(self, card)
+		if self.unpaired.get(card.value) is card:
+			del self.unpaired[card.value]
+			return
+		for index, pair in enumerate(self.pairs):
+			if card in pair:
+				# the pair is broken up; its other card waits for a partner again
+				del self.pairs[index]
+				partner = pair[1] if pair[0] is card else pair[0]
+				self._pair_up(partner)
+				return
+
+	def _pair_up(self, card):
+		partner = self.unpaired.pop(card.value, None)
+		if partner is None:
+			self.unpaired[card.value] = card
+		else:
+			self.pairs.append((partner, card))
+
 class OldMaidPlayer(AbstractPlayer):
 	def __init__(self, name):
 		AbstractPlayer.__init__(self, name)
 		self.had_matches = False
 
 	def init_hand(self):
-		self.hand = CardContainer()
+		self.hand = OldMaidHand()
 		self.discard = CardContainer()
+
+	def snapshot(self):
+		return (self.hand.clone(), self.discard.clone(), self.had_matches)
+
+	def reset(self):
+		AbstractPlayer.reset(self)
+		self.discard.reset()
+		self.had_matches = False
+
+	def restore(self, snapshot):
+		hand, discard, self.had_matches = snapshot
+		self.hand.copy_from(hand)
+		self.discard.copy_from(discard)
+
+	def clone(self):
+		clone = AbstractPlayer.clone(self)
+		clone.discard = self.discard.clone()
+		return clone
 	
 	def discard_pairs(self):
 		'''
-		discards any instance of pairs
+		discards any instance of pairs; the hand has already found them
 		'''
-		for value, cards in self.hand.cards_by_value.items():
-			while len(cards) > 1:
-				self.had_matches = True
-				cards_to_remove = cards[-2:]
-				for card in cards_to_remove:
-					print "removing %s" % str(card)
-					self.hand.remove_card(card)
-					self.discard.add_card(card)
-
+		for pair in self.hand.take_pairs():
+			self.had_matches = True
+			for card in pair:
+				self._say("removing %s", card)
+				self.hand.remove_card(card)
+				self.discard.add_card(card)
 
 	def take_turn(self, **kwargs):
 		'''
 		Implement how a turn is taken in OldMaid, ensuring all the values
-		are in the args
+		are in the args. Returns the card drawn
 		'''
 		draw_from_player = kwargs.get("draw_from_player", None)
 		if not draw_from_player:
 			raise ValueError("Need to pass a player object in 'draw_from_player'")
 
-		draw_from_player.hand.shuffle()
-		card = draw_from_player.hand.top_card()
-		print "drew a %s" % str(card)
+		hand = draw_from_player.hand
+		card = hand.card_list[self.rng.randrange(hand.num_cards())]
+		hand.remove_card(card)
+		self._say("drew a %s", card)
 		self.hand.add_card(card)
 		self.discard_pairs()
+		return card
 
 
 class OldMaidGameLogic(AbstractGameLogic):
+	'''
+	Keeps the number of cards in play and a ring of the seats that still
+	hold cards (next_seat/prev_seat, linked both ways) up to date as cards
+	change hands, so neither finding the next opponent nor checking for
+	the end of the game has to look at every seat
+	'''
+	def __init__(self, seed = None, headless = False, renderer = None, pacer = None):
+		self.cards_in_play = 0
+		self.next_seat = None
+		self.prev_seat = None
+		AbstractGameLogic.__init__(self, seed, headless, renderer, pacer)
+
 	@staticmethod
 	def get_friendly_name():
 		return "Old Maid"
@@ -89,7 +184,10 @@ class OldMaidGameLogic(AbstractGameLogic):
 		return OldMaidPlayer
 
 	def _make_cards(self):
-		self.draw_pile = CardContainer(OldMaidCardFactory())
+		self.draw_pile = CardPile(OldMaidCardFactory())
+
+	def _reset_cards(self):
+		self.draw_pile.reset(OldMaidCardFactory())
 
 	
 	def _deal(self):
@@ -100,55 +198,103 @@ class OldMaidGameLogic(AbstractGameLogic):
 				# we have to check again :-(
 				if len(self.draw_pile) == 0:
 					break;
-				player.draw_card(self.draw_pile.top_card())
+				self._deal_card(player, self.draw_pile.top_card())
 
+		# the hands paired cards up as they were dealt, so this only
+		# discards the pairs already found
 		for player in self.players:
 			player.discard_pairs()
-			cl = []
-			for card in player.hand.card_list:
-				cl.append(str(card))
-			print ", ".join(cl)
+			self._say("%s", player.hand)
 			
 
-	def _play_game(self):
-		player_index = 0
+	def _start_play(self):
 		self.turns_without_matches = 0
+		self.cards_in_play = 0
+		active_seats = []
+		for player in self.players:
+			self.cards_in_play += player.num_cards_in_hand()
+			if player.num_cards_in_hand() > 0:
+				active_seats.append(player.seat)
+		self.next_seat = [None] * len(self.players)
+		self.prev_seat = [None] * len(self.players)
+		for index, seat in enumerate(active_seats):
+			self.next_seat[seat] = active_seats[(index + 1) % len(active_seats)]
+			self.prev_seat[seat] = active_seats[index - 1]
+		self.player_index = active_seats[0] if active_seats else 0
+
+	def _play_turn(self):
+		events = self.events
+		player_index = self.player_index
+		player = self.players[player_index]
+		self._say("=========\n%s's turn", player.name)
 
-		while self.winner is None:
-			player = self.players[player_index]
-			print "=========\n%s's turn" % player.name
+		draw_from_index = self.next_seat[player_index]
+		if draw_from_index != player_index:
+			draw_from_player = self.players[draw_from_index]
+			if events.active:
+				events.emit(TURN_STARTED, player_index)
+			self._say("drawing from %s", draw_from_player.name)
+			num_cards_before = player.num_cards_in_hand()
+			card = player.take_turn(draw_from_player=draw_from_player)
+			if events.active:
+				events.emit(CARDS_DRAWN, player_index, 1, draw_from_index, card)
+			self.num_turns += 1
+			self.num_draws += 1
+			# the card drawn stays in play; only the pairs leave it
+			self.cards_in_play -= num_cards_before + 1 - player.num_cards_in_hand()
+			if draw_from_player.num_cards_in_hand() == 0:
+				self._leave_ring(draw_from_index)
 			if player.num_cards_in_hand() == 0:
-				print "no cards left, skipping\n===========\n"
-				player_index = self._next_player(player_index, False)
-				continue
-
-			draw_from_index = player_index
-			draw_from_player = None
-			while draw_from_player is None:
-				draw_from_index = self._next_player(draw_from_index, False)
-				if draw_from_index == player_index:
-					# we've gone around the table
-					break
-	
-				if self.players[draw_from_index].num_cards_in_hand() > 0:
-					draw_from_player = self.players[draw_from_index]
+				self._leave_ring(player_index)
+			if player.had_matches:
+				self.turns_without_matches = 0
+				player.had_matches = False
+			else:
+				self.turns_without_matches += 1
+			if events.active:
+				events.emit(TURN_ENDED, player_index, player.num_cards_in_hand())
 
-			if draw_from_player != None:
-				print "drawing from %s" % draw_from_player.name
-				player.take_turn(draw_from_player=draw_from_player)
-				if player.had_matches:
-					self.turns_without_matches = 0
-					player.had_matches = False
-				else:
-					self.turns_without_matches += 1
+		self.player_index = self.next_seat[player_index]
+		self.winner = self._check_for_game_completion()
+		if self.winner is not None:
+			self.finished = True
+			return
 
-			self.winner = self._check_for_game_completion()
+		self._say("left with %d cards\n========\n", player.num_cards_in_hand())
+		self._pause(.25)
 
-			player_index = self._next_player(player_index, False)
-			print "left with %d cards\n========\n" % player.num_cards_in_hand()
-			sleep(.25)
+	def _leave_ring(self, seat):
+		'''
+		Unlinks a seat whose hand is empty. Its own next_seat is left
+		alone, so it still leads back into the ring
+		'''
+		next_seat = self.next_seat[seat]
+		prev_seat = self.prev_seat[seat]
+		self.next_seat[prev_seat] = next_seat
+		self.prev_seat[next_seat] = prev_seat
+
+	def _get_state(self):
+		state = AbstractGameLogic._get_state(self)
+		state["player_index"] = self.player_index
+		state["turns_without_matches"] = self.turns_without_matches
+		state["cards_in_play"] = self.cards_in_play
+		state["next_seat"] = list(self.next_seat)
+		state["prev_seat"] = list(self.prev_seat)
+		return state
+
+	def _set_state(self, state):
+		AbstractGameLogic._set_state(self, state)
+		self.player_index = state["player_index"]
+		self.turns_without_matches = state["turns_without_matches"]
+		self.cards_in_play = state["cards_in_play"]
+		self.next_seat = list(state["next_seat"])
+		self.prev_seat = list(state["prev_seat"])
 
-		return self.winner
+	def _clone_containers(self, clone):
+		AbstractGameLogic._clone_containers(self, clone)
+		if self.next_seat is not None:
+			clone.next_seat = list(self.next_seat)
+			clone.prev_seat = list(self.prev_seat)
 	
 	def _check_for_game_completion(self):
 		'''
@@ -156,21 +302,13 @@ class OldMaidGameLogic(AbstractGameLogic):
 		card is left in play and it is the Old Maid), return the winner
 		'''
 		winner = None
-		if self.turns_without_matches > 3 * len(self.players):
-			return winner
-
-		if self._num_cards_in_play() == 1:
-			for player in self.players:
-				if player.num_cards_in_hand() == 1:
-					winner = player
-					break
+		if self.cards_in_play == 1:
+			# only the holder of the last card is still in the ring
+			winner = self.players[self.player_index]
 		return winner
 
 	def _num_cards_in_play(self):
 		'''
 		Determines how many total cards are in the players' hands
 		'''
-		num_cards_in_play = 0
-		for player in self.players:
-			num_cards_in_play += player.num_cards_in_hand()
-		return num_cards_in_play
+		return self.cards_in_play
@@ -0,0 +1,355 @@
+'''
+Exact outcome of an Old Maid game from any point after the deal. Nobody
+makes a decision in Old Maid: each turn draws a uniformly random card
+from the next seat still holding cards, so the game is a Markov chain and
+the chances of each seat being left with the last card (the game's
+winner) and the expected number of turns left can be worked out instead
+of simulated.
+
+Values are interchangeable, so a state only records how many values are
+held by each set of seats (a pair of seats, or four seats once four
+players each hold one of a value's cards), who has the odd queen and
+whose turn it is.
+'''
+from oldmaid import OldMaidGameLogic
+from itertools import combinations
+
+try:
+	import numpy as np
+except ImportError:
+	np = None
+
+# groups of up to this many states are solved directly when numpy is
+# installed; bigger ones (or all of them, without numpy) by Gauss-Seidel
+# iteration, which stops once no value moves by more than TOLERANCE
+# (relative to its size, for expected turns)
+DENSE_LIMIT = 4000
+TOLERANCE = 1e-13
+
+class OldMaidOutcome:
+	'''
+	win_probabilities is by seat
+	'''
+	def __init__(self, win_probabilities, expected_turns):
+		self.win_probabilities = win_probabilities
+		self.expected_turns = expected_turns
+
+	def __str__(self):
+		lines = ["expected turns: %.4f" % self.expected_turns]
+		for seat, probability in enumerate(self.win_probabilities):
+			lines.append("  seat %d wins: %.6f" % (seat + 1, probability))
+		return "\n".join(lines)
+
+class OldMaidSolver:
+	'''
+	Solves games for num_players seats, remembering every state it has
+	solved so later games that reach them are free
+	'''
+	def __init__(self, num_players):
+		self.num_players = num_players
+		self.masks = []
+		for size in (2, 4):
+			for seats in combinations(range(num_players), size):
+				self.masks.append(sum(1 << seat for seat in seats))
+		self.index_of = dict((mask, index) for index, mask in enumerate(self.masks))
+		self.indices_by_seat = [[index for index, mask in enumerate(self.masks) if mask & (1 << seat)]
+			for seat in range(num_players)]
+		self.values = {}
+		self.moves = {}
+		self.terminal_values = []
+		for seat in range(num_players):
+			value = [0.0] * (num_players + 1)
+			value[seat] = 1.0
+			self.terminal_values.append(tuple(value))
+
+	def solve_game(self, logic):
+		'''
+		The outcome of a dealt OldMaidGameLogic from where it stands
+		'''
+		if len(logic.players) != self.num_players:
+			raise ValueError("Solver is for %d players, game has %d" % (self.num_players, len(logic.players)))
+		seats_by_value = {}
+		for player in logic.players:
+			for card in player.hand.card_list:
+				seats_by_value.setdefault(card.value, []).append(player.seat)
+		counts = [0] * len(self.masks)
+		queen = None
+		for seats in seats_by_value.itervalues():
+			if len(seats) % 2:
+				queen = seats[0]
+				continue
+			counts[self.index_of[sum(1 << seat for seat in seats)]] += 1
+		if getattr(logic, "next_seat", None) is not None:
+			mover = logic.player_index
+		else:
+			sizes = [player.num_cards_in_hand() for player in logic.players]
+			mover = self._next_active(sizes, self.num_players - 1)
+		return self.solve(tuple(counts), queen, mover)
+
+	def solve_hand_sizes(self, hand_sizes, queen_seat, first_seat = None):
+		'''
+		The outcome of a game dealt into hands of the given sizes (after
+		pairs are discarded) with the odd queen in queen_seat. With two or
+		three players the sizes are enough to tell which seats share each
+		value; with more they aren't, so use solve_game() instead
+		'''
+		if len(hand_sizes) != self.num_players:
+			raise ValueError("Need %d hand sizes" % self.num_players)
+		if self.num_players > 3:
+			raise ValueError("Hand sizes don't say who shares which values with more than 3 players")
+		unpaired = list(hand_sizes)
+		unpaired[queen_seat] -= 1
+		counts = [0] * len(self.masks)
+		total = sum(unpaired)
+		for mask in self.masks:
+			seats = [seat for seat in range(self.num_players) if mask & (1 << seat)]
+			# each seat's cards are shared with the seats not left out
+			left_out = [seat for seat in range(self.num_players) if seat not in seats]
+			count = total / 2 - sum(unpaired[seat] for seat in left_out)
+			if total % 2 or count < 0:
+				raise ValueError("No deal gives hands of sizes %s" % (hand_sizes,))
+			counts[self.index_of[mask]] = count
+		if min(unpaired) < 0 or any(unpaired[seat] != sum(counts[index] for index in self.indices_by_seat[seat])
+				for seat in range(self.num_players)):
+			raise ValueError("No deal gives hands of sizes %s" % (hand_sizes,))
+		if first_seat is None:
+			first_seat = self._next_active(hand_sizes, self.num_players - 1)
+		return self.solve(tuple(counts), queen_seat, first_seat)
+
+	def solve(self, counts, queen, mover):
+		'''
+		The outcome from a state: counts has, for each of self.masks, the
+		number of values held by exactly that set of seats
+		'''
+		start = (counts, queen, mover)
+		if sum(counts) == 0:
+			value = self.terminal_values[queen]
+		else:
+			value = self._solve(start)
+		return OldMaidOutcome(list(value[:self.num_players]), value[self.num_players])
+
+	###################################
+	# PROTECTED METHODS ###############
+	###################################
+	def _solve(self, start):
+		'''
+		Play can come back round to a state (the queen going back and
+		forth, or a value moving from seat to seat), so the states reachable
+		from start are split into groups that lead to each other (Tarjan's
+		strongly connected components). A group is finished only after
+		every group it leads to, so each is solved as soon as it's found
+		'''
+		values = self.values
+		transitions = {}
+		index_of = {}
+		lowest = {}
+		on_stack = set()
+		component_stack = []
+		start_transitions = transitions[start] = self._get_transitions(start)
+		index_of[start] = lowest[start] = 0
+		component_stack.append(start)
+		on_stack.add(start)
+		stack = [(start, iter(start_transitions))]
+		while stack:
+			state, pending = stack[-1]
+			for _, next_state, _ in pending:
+				if next_state is None or next_state in values:
+					continue
+				if next_state not in index_of:
+					index_of[next_state] = lowest[next_state] = len(index_of)
+					component_stack.append(next_state)
+					on_stack.add(next_state)
+					next_transitions = transitions[next_state] = self._get_transitions(next_state)
+					stack.append((next_state, iter(next_transitions)))
+					break
+				if next_state in on_stack:
+					lowest[state] = min(lowest[state], index_of[next_state])
+			else:
+				stack.pop()
+				if stack:
+					parent = stack[-1][0]
+					lowest[parent] = min(lowest[parent], lowest[state])
+				if lowest[state] == index_of[state]:
+					component = []
+					while True:
+						member = component_stack.pop()
+						on_stack.discard(member)
+						component.append(member)
+						if member == state:
+							break
+					self._solve_component(component, transitions)
+		return values[start]
+
+	def _solve_component(self, states, transitions):
+		'''
+		Solves states that only lead to each other, to states already
+		solved, or to the end of the game. Each state's value is a linear
+		combination of the others' plus a constant part, the same for every
+		seat's chance of winning and for the turns left
+		'''
+		values = self.values
+		width = self.num_players + 1
+		index_of = dict((state, index) for index, state in enumerate(states))
+		constants = []
+		links = []
+		for state in states:
+			constant = [0.0] * width
+			constant[self.num_players] = 1.0
+			state_links = []
+			for probability, next_state, terminal_value in transitions[state]:
+				if next_state is not None:
+					index = index_of.get(next_state)
+					if index is not None:
+						state_links.append((probability, index))
+						continue
+					terminal_value = values[next_state]
+				constant = [total + probability * outcome for total, outcome in zip(constant, terminal_value)]
+			constants.append(constant)
+			links.append(state_links)
+
+		if not links[0] and len(states) == 1:
+			columns = [[total] for total in constants[0]]
+		elif np is not None and len(states) <= DENSE_LIMIT:
+			columns = self._solve_dense(constants, links)
+		else:
+			columns = self._solve_iteratively(constants, links)
+		for index, state in enumerate(states):
+			values[state] = tuple(column[index] for column in columns)
+
+	def _solve_dense(self, constants, links):
+		matrix = np.identity(len(constants))
+		for index, state_links in enumerate(links):
+			for probability, other in state_links:
+				matrix[index, other] -= probability
+		return np.linalg.solve(matrix, np.array(constants)).T.tolist()
+
+	def _solve_iteratively(self, constants, links):
+		'''
+		Gauss-Seidel, one column of values at a time, going through the
+		states so that those they lead to are mostly updated first
+		'''
+		order = []
+		seen = [False] * len(links)
+		for root in range(len(links)):
+			if seen[root]:
+				continue
+			seen[root] = True
+			stack = [(root, iter(links[root]))]
+			while stack:
+				index, pending = stack[-1]
+				for _, other in pending:
+					if not seen[other]:
+						seen[other] = True
+						stack.append((other, iter(links[other])))
+						break
+				else:
+					stack.pop()
+					if links[index]:
+						order.append(index)
+
+		columns = []
+		for column in range(self.num_players + 1):
+			column_constants = [constant[column] for constant in constants]
+			solution = list(column_constants)
+			change = 1.0
+			while change > TOLERANCE:
+				change = 0.0
+				for index in order:
+					value = column_constants[index]
+					for probability, other in links[index]:
+						value += probability * solution[other]
+					change = max(change, abs(value - solution[index]) / max(1.0, abs(value)))
+					solution[index] = value
+			columns.append(solution)
+		return columns
+
+	def _get_transitions(self, state):
+		'''
+		(probability, next state, None) for every way the turn can go, or
+		(probability, None, value) where it ends the game
+		'''
+		counts, queen, mover = state
+		sizes = self._hand_sizes(counts, queen)
+		drawee = self._next_active(sizes, mover)
+		num_drawee_cards = float(sizes[drawee])
+		# the drawee always loses a card; the mover either gains one or
+		# loses the one it pairs with
+		sizes[drawee] -= 1
+		matched_sizes = list(sizes)
+		matched_sizes[mover] -= 1
+		sizes[mover] += 1
+		passed_mover = self._next_active(sizes, mover)
+		matched_mover = self._next_active(matched_sizes, mover)
+		game_over = sum(matched_sizes) == 1
+		moves = self._get_moves(mover, drawee)
+
+		transitions = []
+		for index in self.indices_by_seat[drawee]:
+			count = counts[index]
+			if count == 0:
+				continue
+			probability = count / num_drawee_cards
+			next_index, matched = moves[index]
+			if matched and game_over:
+				transitions.append((probability, None, self.terminal_values[queen]))
+				continue
+			next_counts = list(counts)
+			next_counts[index] -= 1
+			if next_index is not None:
+				next_counts[next_index] += 1
+			if matched:
+				next_state = (tuple(next_counts), queen, matched_mover)
+			else:
+				next_state = (tuple(next_counts), queen, passed_mover)
+			transitions.append((probability, next_state, None))
+		if queen == drawee:
+			transitions.append((1 / num_drawee_cards, (counts, mover, passed_mover), None))
+		return transitions
+
+	def _get_moves(self, mover, drawee):
+		'''
+		For each of self.masks holding a card of drawee's, where the values
+		go when mover draws that card (None once the last two cards pair),
+		and whether mover makes a pair; worked out once per pair of seats
+		'''
+		key = (mover, drawee)
+		moves = self.moves.get(key)
+		if moves is None:
+			mover_bit = 1 << mover
+			drawee_bit = 1 << drawee
+			moves = {}
+			for index in self.indices_by_seat[drawee]:
+				mask = self.masks[index]
+				if mask & mover_bit:
+					rest = mask & ~(mover_bit | drawee_bit)
+					moves[index] = (self.index_of[rest] if rest else None, True)
+				else:
+					moves[index] = (self.index_of[(mask & ~drawee_bit) | mover_bit], False)
+			self.moves[key] = moves
+		return moves
+
+	def _hand_sizes(self, counts, queen):
+		sizes = [0] * self.num_players
+		sizes[queen] = 1
+		for seat in range(self.num_players):
+			for index in self.indices_by_seat[seat]:
+				sizes[seat] += counts[index]
+		return sizes
+
+	def _next_active(self, sizes, seat):
+		'''
+		The first seat after seat that still has cards
+		'''
+		for offset in range(1, self.num_players + 1):
+			next_seat = (seat + offset) % self.num_players
+			if sizes[next_seat] > 0:
+				return next_seat
+		raise ValueError("No seat has any cards")
+
+def deal_game(num_players, seed = None):
+	'''
+	A headless OldMaidGameLogic dealt and ready for its first turn
+	'''
+	logic = OldMaidGameLogic(seed, True)
+	logic.begin(["seat %d" % (seat + 1) for seat in range(num_players)])
+	return logic
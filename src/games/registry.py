@@ -1,21 +1,89 @@
+import importlib
+
+# setuptools entry point group other packages can add games to
+ENTRY_POINT_GROUP = "py_card_games.games"
+
 class RegisteredGame:
-	def __init__(self, logic_class):
-		self.logic_class = logic_class
-	
+	'''
+	A game in the registry. It is either registered with its logic class,
+	or lazily with its friendly name and where the logic class lives, in
+	which case the module is only imported when logic_class is first used
+	'''
+	def __init__(self, logic_class = None, friendly_name = None, module_path = None, class_name = None):
+		self._logic_class = logic_class
+		self._friendly_name = friendly_name
+		self.module_path = module_path
+		self.class_name = class_name
+
+	@property
+	def logic_class(self):
+		if self._logic_class is None:
+			module = importlib.import_module(self.module_path)
+			self._logic_class = getattr(module, self.class_name)
+		return self._logic_class
+
+	@property
+	def loaded(self):
+		return self._logic_class is not None
+
 	@property
 	def friendly_name(self):
-		return self.logic_class.get_friendly_name()
+		if self._friendly_name is None:
+			self._friendly_name = self.logic_class.get_friendly_name()
+		return self._friendly_name
 
 class GameRegistry:
 	registered_games = []
+	# registered games by friendly name
+	games_by_name = {}
 
 	def __init__(self):
 		raise Exception("Must use this class statically")
-	
+
 	@staticmethod
 	def register_game(logic_class):
-		GameRegistry.registered_games.append(RegisteredGame(logic_class))
-	
+		GameRegistry._add(RegisteredGame(logic_class))
+
+	@staticmethod
+	def register_lazy_game(friendly_name, module_path, class_name):
+		'''
+		Registers a game without importing it; module_path is the
+		absolute module name holding its logic class, class_name
+		'''
+		GameRegistry._add(RegisteredGame(None, friendly_name, module_path, class_name))
+
+	@staticmethod
+	def register_entry_points(group = ENTRY_POINT_GROUP):
+		'''
+		Lazily registers every game other installed packages list under
+		the entry point group, as "friendly name = module:LogicClass".
+		Does nothing if setuptools isn't installed
+		'''
+		try:
+			import pkg_resources
+		except ImportError:
+			return
+		for entry_point in pkg_resources.iter_entry_points(group):
+			GameRegistry.register_lazy_game(entry_point.name, entry_point.module_name, entry_point.attrs[0])
+
 	@staticmethod
 	def get_registered_games():
 		return GameRegistry.registered_games
+
+	@staticmethod
+	def get_game(friendly_name):
+		'''
+		Looks up a registered game by its friendly name
+		'''
+		try:
+			return GameRegistry.games_by_name[friendly_name]
+		except KeyError:
+			raise KeyError("No game named %s has been registered" % friendly_name)
+
+	@staticmethod
+	def _add(game):
+		previous = GameRegistry.games_by_name.get(game.friendly_name)
+		if previous is not None:
+			GameRegistry.registered_games.remove(previous)
+		GameRegistry.registered_games.append(game)
+		GameRegistry.games_by_name[game.friendly_name] = game
@@ -0,0 +1,144 @@
+from common.gamelog import GameLogError, GameLogWriter, iter_games
+from common.gamelog import DRAW, MAGIC, NONE, PLAY, RESHUFFLE
+from oldmaid import OldMaidGameLogic, OldMaidPlayer
+from registry import GameRegistry
+from uno import UnoGameLogic, UnoPlayer
+from StringIO import StringIO
+
+class ReplayError(GameLogError):
+	pass
+
+class ReplayRandom:
+	'''
+	Stands in for a replayed game's random source: shuffles put the cards
+	in the next order taken from the log, and random choices aren't
+	allowed since the replay players make their choices from the log
+	'''
+	def __init__(self, cards_by_id, orders):
+		self.cards_by_id = cards_by_id
+		self.orders = iter(orders)
+
+	def shuffle(self, cards):
+		try:
+			order = next(self.orders)
+		except StopIteration:
+			raise ReplayError("The game shuffled more often than the log says")
+		if sorted([card.card_id for card in cards]) != sorted(order):
+			raise ReplayError("The logged shuffle doesn't hold the cards being shuffled")
+		cards[:] = [self.cards_by_id[card_id] for card_id in order]
+
+	def choice(self, seq):
+		raise ReplayError("A replayed game made a random choice the log doesn't cover")
+
+class UnoReplayPlayer(UnoPlayer):
+	'''
+	Plays the cards (and picks the suits) the log says this seat did
+	'''
+	def __init__(self, name, moves):
+		self.moves = iter(moves)
+		self.next_suit = None
+		UnoPlayer.__init__(self, name)
+
+	@staticmethod
+	def get_logged_moves(logged_game, seat, cards_by_id):
+		return [(cards_by_id[move[2]], logged_game.get_suit(move[3]))
+			for move in logged_game.moves if move[0] == PLAY and move[1] == seat]
+
+	def determine_best_match(self, card, active_suit):
+		try:
+			chosen_card, self.next_suit = next(self.moves)
+		except StopIteration:
+			raise ReplayError("%s has no more logged moves" % self.name)
+		if chosen_card not in self.hand.get_matches(card, active_suit):
+			raise ReplayError("%s can't legally play %s" % (self.name, chosen_card))
+		return chosen_card
+
+	def _get_choice_in_list(self, selection_list):
+		return self.next_suit
+
+class OldMaidReplayPlayer(OldMaidPlayer):
+	'''
+	Draws the cards the log says this seat drew
+	'''
+	def __init__(self, name, moves):
+		self.moves = iter(moves)
+		OldMaidPlayer.__init__(self, name)
+
+	@staticmethod
+	def get_logged_moves(logged_game, seat, cards_by_id):
+		return [cards_by_id[move[4]] for move in logged_game.moves
+			if move[0] == DRAW and move[1] == seat and move[4] != NONE]
+
+	def take_turn(self, **kwargs):
+		draw_from_player = kwargs.get("draw_from_player", None)
+		try:
+			card = next(self.moves)
+		except StopIteration:
+			raise ReplayError("%s has no more logged moves" % self.name)
+		if card not in draw_from_player.hand.card_list:
+			raise ReplayError("%s doesn't hold %s" % (draw_from_player.name, card))
+		draw_from_player.hand.remove_card(card)
+		self.hand.add_card(card)
+		self.discard_pairs()
+		return card
+
+REPLAY_PLAYER_CLASSES = [
+	(UnoGameLogic, UnoReplayPlayer),
+	(OldMaidGameLogic, OldMaidReplayPlayer),
+]
+
+class ReplayResult:
+	def __init__(self, game_result, verified):
+		self.game_result = game_result
+		self.verified = verified
+
+def _get_replay_player_class(logic_class):
+	for game_logic_class, player_class in REPLAY_PLAYER_CLASSES:
+		if issubclass(logic_class, game_logic_class):
+			return player_class
+	raise ReplayError("Don't know how to replay %s" % logic_class.__name__)
+
+def replay_game(logged_game):
+	'''
+	Re-plays a LoggedGame through its game logic, with the deck, shuffles
+	and every move taken from the log. The replay is logged again, and is
+	verified if that log is identical to the original
+	'''
+	logic_class = GameRegistry.get_game(logged_game.name).logic_class
+	player_class = _get_replay_player_class(logic_class)
+	logic = logic_class(None, True)
+
+	cards_by_id = dict([(card.card_id, card) for card in logic.draw_pile.card_list])
+	if sorted(cards_by_id.keys()) != sorted(logged_game.deck):
+		raise ReplayError("The logged deck doesn't match the game's deck")
+	logic.draw_pile.clear()
+	for card_id in logged_game.deck:
+		logic.draw_pile.add_card(cards_by_id[card_id])
+	logic.rng = ReplayRandom(cards_by_id, [move[1] for move in logged_game.moves if move[0] == RESHUFFLE])
+
+	players = []
+	for seat, name in enumerate(logged_game.player_names):
+		players.append(player_class(name, player_class.get_logged_moves(logged_game, seat, cards_by_id)))
+
+	output = StringIO()
+	writer = GameLogWriter(output)
+	writer.attach(logic)
+	result = logic.simulate(players)
+	writer.close()
+	return ReplayResult(result, output.getvalue()[len(MAGIC):] == logged_game.raw)
+
+def verify_log(fileobj):
+	'''
+	Replays every game in a log; returns (games replayed, games that
+	didn't replay identically)
+	'''
+	num_games = 0
+	num_failed = 0
+	for logged_game in iter_games(fileobj):
+		num_games += 1
+		try:
+			if not replay_game(logged_game).verified:
+				num_failed += 1
+		except ReplayError:
+			num_failed += 1
+	return (num_games, num_failed)
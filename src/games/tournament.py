@@ -0,0 +1,183 @@
+from common.turnstats import TurnStatsRecorder, open_turn_sink, split_stats_path
+from multiprocessing import Pool, cpu_count
+from registry import GameRegistry
+import sys
+
+# games are seeded from (master seed, game index) rather than from a
+# per-worker stream, so a tournament gives the same numbers no matter how
+# many workers it is split over
+GAME_SEED_STRIDE = 2 ** 32
+DEFAULT_CHUNK_SIZE = 250
+
+def get_game_seed(master_seed, game_index):
+	'''
+	The seed for a single game of a tournament
+	'''
+	return master_seed * GAME_SEED_STRIDE + game_index
+
+class TournamentResult:
+	'''
+	Aggregate statistics over a batch of games. Results from separate
+	batches can be combined with merge(), in any order
+	'''
+	def __init__(self, num_players):
+		self.num_players = num_players
+		self.num_games = 0
+		self.num_stalemates = 0
+		self.wins_by_seat = [0] * num_players
+		self.game_lengths = {}
+		self.reshuffle_counts = {}
+		self.total_turns = 0
+		self.total_draws = 0
+		self.total_reshuffles = 0
+
+	def add_result(self, game_result):
+		'''
+		Folds a single GameResult into the totals
+		'''
+		self.num_games += 1
+		if game_result.winner_index is None:
+			self.num_stalemates += 1
+		else:
+			self.wins_by_seat[game_result.winner_index] += 1
+		self.game_lengths[game_result.num_turns] = self.game_lengths.get(game_result.num_turns, 0) + 1
+		self.reshuffle_counts[game_result.num_reshuffles] = self.reshuffle_counts.get(game_result.num_reshuffles, 0) + 1
+		self.total_turns += game_result.num_turns
+		self.total_draws += game_result.num_draws
+		self.total_reshuffles += game_result.num_reshuffles
+
+	def merge(self, other):
+		'''
+		Adds another TournamentResult's totals into this one
+		'''
+		if other.num_players != self.num_players:
+			raise ValueError("Can't merge results for %d players into results for %d players" % (other.num_players, self.num_players))
+		self.num_games += other.num_games
+		self.num_stalemates += other.num_stalemates
+		for seat in range(self.num_players):
+			self.wins_by_seat[seat] += other.wins_by_seat[seat]
+		for turns, count in other.game_lengths.iteritems():
+			self.game_lengths[turns] = self.game_lengths.get(turns, 0) + count
+		for reshuffles, count in other.reshuffle_counts.iteritems():
+			self.reshuffle_counts[reshuffles] = self.reshuffle_counts.get(reshuffles, 0) + count
+		self.total_turns += other.total_turns
+		self.total_draws += other.total_draws
+		self.total_reshuffles += other.total_reshuffles
+
+	def win_rates(self):
+		'''
+		Fraction of all games won from each seat
+		'''
+		if self.num_games == 0:
+			return [0.0] * self.num_players
+		return [float(wins) / self.num_games for wins in self.wins_by_seat]
+
+	def mean_game_length(self):
+		if self.num_games == 0:
+			return 0.0
+		return float(self.total_turns) / self.num_games
+
+	def length_histogram(self, bucket_size = 10):
+		'''
+		Game lengths (in turns) grouped into buckets; returns a sorted list
+		of (bucket start, number of games)
+		'''
+		buckets = {}
+		for turns, count in self.game_lengths.iteritems():
+			bucket = turns - turns % bucket_size
+			buckets[bucket] = buckets.get(bucket, 0) + count
+		return sorted(buckets.items())
+
+	def __str__(self):
+		lines = ["games: %d, stalemates: %d" % (self.num_games, self.num_stalemates)]
+		for seat, rate in enumerate(self.win_rates()):
+			lines.append("  seat %d wins: %.4f" % (seat + 1, rate))
+		lines.append("mean length: %.2f turns" % self.mean_game_length())
+		lines.append("reshuffles: %d" % self.total_reshuffles)
+		for bucket, count in self.length_histogram():
+			lines.append("  %4d+ turns: %d" % (bucket, count))
+		return "\n".join(lines)
+
+def play_games(logic_class, num_players, master_seed, start, stop, stats_path = None, stats_format = None):
+	'''
+	Plays games start..stop-1 of a tournament in this process. One game
+	is built and then reset() for each game after it, so the same cards,
+	piles and players are reused throughout. With stats_path, every turn
+	is recorded (see common.turnstats) to stats_path-<start>, with the
+	number going before stats_path's extension if it has one and the
+	game index as the game id. stats_format is passed on to
+	open_turn_sink(); by default it goes by the extension
+	'''
+	result = TournamentResult(num_players)
+	names = ["seat %d" % (i + 1) for i in range(num_players)]
+	recorder = None
+	if stats_path is not None:
+		base, path_format = split_stats_path(stats_path)
+		sink = open_turn_sink("%s-%09d" % (base, start), stats_format or path_format)
+		recorder = TurnStatsRecorder(sink, num_players, first_game_id = start)
+	logic = None
+	for game_index in xrange(start, stop):
+		seed = get_game_seed(master_seed, game_index)
+		if logic is None:
+			logic = logic_class(seed, True)
+			if recorder is not None:
+				recorder.attach(logic)
+			result.add_result(logic.simulate(names))
+		else:
+			logic.reset(seed)
+			result.add_result(logic.simulate())
+	if recorder is not None:
+		recorder.close()
+	return result
+
+def _play_chunk(args):
+	return play_games(*args)
+
+def get_logic_class(game):
+	'''
+	Accepts either a logic class or the friendly name of a registered game
+	'''
+	if isinstance(game, basestring):
+		return GameRegistry.get_game(game).logic_class
+	return game
+
+def run_tournament(game, num_games, num_players, master_seed = 0, num_workers = None, chunk_size = DEFAULT_CHUNK_SIZE,
+		stats_path = None, stats_format = None):
+	'''
+	Plays num_games headless games of the given game across a pool of
+	worker processes, and returns the merged TournamentResult. With
+	stats_path, each chunk of games records its turns to its own file
+	in stats_format (see play_games())
+	'''
+	logic_class = get_logic_class(game)
+	if num_workers is None:
+		num_workers = cpu_count()
+	chunks = []
+	for start in xrange(0, num_games, chunk_size):
+		chunks.append((logic_class, num_players, master_seed, start, min(start + chunk_size, num_games), stats_path, stats_format))
+
+	result = TournamentResult(num_players)
+	if num_workers <= 1:
+		for chunk in chunks:
+			result.merge(_play_chunk(chunk))
+		return result
+
+	pool = Pool(num_workers)
+	try:
+		for chunk_result in pool.imap_unordered(_play_chunk, chunks):
+			result.merge(chunk_result)
+	finally:
+		pool.close()
+		pool.join()
+	return result
+
+if __name__ == "__main__":
+	if len(sys.argv) < 4:
+		print "Usage: tournament.py <game name> <num games> <num players> [master seed] [num workers] [turn stats path]"
+		sys.exit(1)
+	import games
+	args = sys.argv[1:]
+	print run_tournament(args[0], int(args[1]), int(args[2]),
+		int(args[3]) if len(args) > 3 else 0,
+		int(args[4]) if len(args) > 4 else None,
+		stats_path = args[5] if len(args) > 5 else None)
@@ -1,7 +1,7 @@
 from common.common import AbstractCardFactory, AbstractGameLogic, AbstractPlayer
-from common.common import Card, CardContainer
-from random import choice
-from time import sleep
+from common.common import BitsetCardContainer, Card, CardContainer, CardPile
+from common.events import CARD_PLAYED, CARDS_DRAWN, RESHUFFLE, TURN_ENDED, TURN_STARTED
+import random
 
 
 def get_game_play_class():
@@ -15,7 +15,7 @@ class UnoCardFactory(AbstractCardFactory):
 	SKIP_CARD_VALUES = ["S"]
 	REVERSE_CARD_VALUES = ["R"]
 
-	def get_cards(self):
+	def _create_cards(self):
 		cards = []
 		'''
 		Create a deck of cards ready for UNO
@@ -36,42 +36,63 @@ class UnoCardFactory(AbstractCardFactory):
 		return cards
 	
 class UnoCard(Card):
+	WILD = 1
+	DRAW = 2
+	SKIP = 4
+	REVERSE = 8
+
+	__slots__ = ("flags", "draw_count")
+
 	def __init__(self, suit, value):
-		self.special_state_used = False
+		'''
+		The card's special abilities are worked out once here and kept
+		as bit flags, since the card is shared by every game
+		'''
 		Card.__init__(self, suit, value)
+		flags = 0
+		if value in UnoCardFactory.WILD_CARD_VALUES:
+			flags |= UnoCard.WILD
+		if value in UnoCardFactory.DRAW_CARD_VALUES:
+			flags |= UnoCard.DRAW
+		if value in UnoCardFactory.SKIP_CARD_VALUES:
+			flags |= UnoCard.SKIP
+		if value in UnoCardFactory.REVERSE_CARD_VALUES:
+			flags |= UnoCard.REVERSE
+		self.flags = flags
+		self.draw_count = 0
+		if flags & UnoCard.DRAW:
+			self.draw_count = 2 if value == "D2" else 4
 	
 	def is_wild(self):
 		'''
 		Whether this card is wild
 		'''
-		return self.value in UnoCardFactory.WILD_CARD_VALUES
+		return self.flags & UnoCard.WILD != 0
 	
 	def is_draw(self):
 		'''
 		Whether this card is a draw card
 		'''
-		return self.value in UnoCardFactory.DRAW_CARD_VALUES
+		return self.flags & UnoCard.DRAW != 0
 	
 	def is_skip(self):
 		'''
 		Whether this card is a skip card
 		'''
-		return self.value in UnoCardFactory.SKIP_CARD_VALUES
+		return self.flags & UnoCard.SKIP != 0
 	
 	def is_reverse(self):
 		'''
 		Whether this card is a reverse card
 		'''
-		return self.value in UnoCardFactory.REVERSE_CARD_VALUES
+		return self.flags & UnoCard.REVERSE != 0
 	
 	def num_draw_cards(self):
 		'''
 		How many cards the next player should draw if this
 		card is played
 		'''
-		if not self.is_draw():
-			return 0
-		return 2 if self.value is "D2" else 4
+		return self.draw_count
 	
 	def is_match(self, card):
 		"""
@@ -79,6 +100,65 @@ class UnoCard(Card):
 		"""
 		return self.suit == card.suit or self.value == card.value
 	
+class UnoMatchTable:
+	'''
+	Which cards of the Uno deck can be played on which, for every active
+	suit (None standing for no active suit): masks[active_suit][card_id]
+	has a bit set, by card_id, for every card playable on that card, and
+	playable[active_suit][card_id] is the same as a list of booleans.
+	card_types[card_id] is the card_id of the first card in the deck of
+	the same suit and value, which stands for all of them. Cards are
+	interned, so one table serves every game in the process;
+	get it with get_match_table()
+	'''
+	def __init__(self, cards):
+		self.wild_mask = 0
+		for card in cards:
+			if card.flags & UnoCard.WILD:
+				self.wild_mask |= 1 << card.card_id
+		first_ids = {}
+		self.card_types = [first_ids.setdefault((card.suit, card.value), card.card_id) for card in cards]
+		self.masks = {}
+		self.playable = {}
+		for active_suit in UnoCardFactory.SUITS + [None]:
+			masks = [0] * len(cards)
+			for top_card in cards:
+				suit = active_suit if top_card.flags & UnoCard.WILD else top_card.suit
+				mask = self.wild_mask
+				for card in cards:
+					if (suit is not None and card.suit == suit) or card.value == top_card.value:
+						mask |= 1 << card.card_id
+				masks[top_card.card_id] = mask
+			self.masks[active_suit] = masks
+			self.playable[active_suit] = [[mask >> card.card_id & 1 == 1 for card in cards] for mask in masks]
+
+	def get_match_mask(self, top_card, active_suit, include_wild = True):
+		'''
+		Mask of every card in the deck playable on top_card
+		'''
+		mask = self.masks.get(active_suit, self.masks[None])[top_card.card_id]
+		if include_wild:
+			return mask
+		return mask & ~self.wild_mask
+
+	def is_playable(self, card, top_card, active_suit):
+		return self.playable.get(active_suit, self.playable[None])[top_card.card_id][card.card_id]
+
+_match_table = None
+# the table's masks, filled in once it's built; hot paths read this
+# directly to save looking the table up
+_match_masks = {}
+
+def get_match_table():
+	'''
+	The process wide UnoMatchTable, built on first use
+	'''
+	global _match_table
+	if _match_table is None:
+		_match_table = UnoMatchTable(UnoCardFactory().get_cards())
+		_match_masks.update(_match_table.masks)
+	return _match_table
+
 class UnoCardContainer(CardContainer):
 	def __init__(self):
 		'''
@@ -103,6 +183,18 @@ class UnoCardContainer(CardContainer):
 		CardContainer.remove_card(self, card)
 		if card.is_wild():
 			self.wild_cards.remove(card)
+
+	def clear(self):
+		CardContainer.clear(self)
+		self.wild_cards = []
+
+	def reset(self, card_contents = None):
+		del self.wild_cards[:]
+		CardContainer.reset(self, card_contents)
+
+	def copy_from(self, src_card_container):
+		CardContainer.copy_from(self, src_card_container)
+		self.wild_cards = [card for card in self.card_list if card.is_wild()]
 	
 	def get_matches(self, card, active_suit, include_wild = True):
 		'''
@@ -110,18 +202,19 @@ class UnoCardContainer(CardContainer):
 		provided card.  Also provide the active_suit in case the
 		card provided is wild
 		'''
-		ret = []
-		suit = active_suit if card.is_wild() else card.suit
-		all_cards = self.cards_by_suit.get(suit, []) + self.cards_by_value.get(card.value, [])
+		table = get_match_table()
+		playable = table.playable.get(active_suit, table.playable[None])[card.card_id]
 		if include_wild:
-			all_cards = all_cards + self.wild_cards
-		for card in all_cards:
-			# this is inefficient
-			if card not in ret:
-				ret.append(card)
-		return ret
+			return [hand_card for hand_card in self.card_list if playable[hand_card.card_id]]
+		return [hand_card for hand_card in self.card_list if playable[hand_card.card_id] and not hand_card.is_wild()]
+
+	def has_match(self, card, active_suit):
+		'''
+		Whether any card in this hand can be played on card
+		'''
+		return len(self.get_matches(card, active_suit)) > 0
 	
-	def get_suit_most_owned(self):
+	def get_suit_most_owned(self, rng = random):
 		'''
 		Gets the suit of which there are the most cards in this hand. If it
 		happens that there are no suited cards, pick a suit at random
@@ -137,16 +230,107 @@ class UnoCardContainer(CardContainer):
 				most_owned_suit = suit
 
 		if most_owned_suit == None:
-			most_owned_suit = choice(UnoCardFactory.SUITS)
+			most_owned_suit = rng.choice(UnoCardFactory.SUITS)
 
 		return most_owned_suit
 
+class UnoBitsetCardContainer(BitsetCardContainer):
+	'''
+	Uno hand built on BitsetCardContainer, so finding the playable cards
+	is a couple of mask operations rather than list merging
+	'''
+	def __init__(self):
+		self.wild_mask = 0
+		BitsetCardContainer.__init__(self)
+
+	@property
+	def wild_cards(self):
+		return self.cards_in_mask(self.wild_mask)
+
+	def clear(self):
+		BitsetCardContainer.clear(self)
+		self.wild_mask = 0
+
+	def reset(self, card_contents = None):
+		self.wild_mask = 0
+		BitsetCardContainer.reset(self, card_contents)
+
+	def copy_from(self, src_card_container):
+		BitsetCardContainer.copy_from(self, src_card_container)
+		if isinstance(src_card_container, UnoBitsetCardContainer):
+			self.wild_mask = src_card_container.wild_mask
+
+	def get_match_mask(self, card, active_suit, include_wild = True):
+		'''
+		Mask of the cards in this hand which match the provided card,
+		using active_suit if the card provided is wild
+		'''
+		masks = _match_masks.get(active_suit)
+		if masks is None:
+			masks = get_match_table().masks.get(active_suit, _match_masks[None])
+		mask = masks[card.card_id] & self.mask
+		if include_wild:
+			return mask
+		return mask & ~self.wild_mask
+
+	def get_matches(self, card, active_suit, include_wild = True):
+		'''
+		Retrieves a list of all the cards which match the
+		provided card.  Also provide the active_suit in case the
+		card provided is wild
+		'''
+		return self.cards_in_mask(self.get_match_mask(card, active_suit, include_wild))
+
+	def has_match(self, card, active_suit):
+		'''
+		Whether any card in this hand can be played on card
+		'''
+		return self.get_match_mask(card, active_suit) != 0
+
+	def get_suit_most_owned(self, rng = random):
+		'''
+		Gets the suit of which there are the most cards in this hand. If it
+		happens that there are no suited cards, pick a suit at random
+		'''
+		count = 0
+		most_owned_suit = None
+		suit_counts = self.suit_counts
+		for suit in UnoCardFactory.SUITS:
+			suit_count = suit_counts.get(suit, 0)
+			if suit_count > count:
+				count = suit_count
+				most_owned_suit = suit
+
+		if most_owned_suit == None:
+			most_owned_suit = rng.choice(UnoCardFactory.SUITS)
+
+		return most_owned_suit
+
+	def _add_card_to_meta_lists(self, card):
+		BitsetCardContainer._add_card_to_meta_lists(self, card)
+		if card.flags & UnoCard.WILD:
+			self.wild_mask |= 1 << card.card_id
+
+	def _remove_card_from_meta_lists(self, card):
+		BitsetCardContainer._remove_card_from_meta_lists(self, card)
+		if card.flags & UnoCard.WILD:
+			self.wild_mask &= ~(1 << card.card_id)
+
 class UnoPlayer(AbstractPlayer):
+	# a DecisionCache (see common.cache) to keep this policy's decisions
+	# in; only for policies whose choice of card and suit depends on
+	# nothing but get_decision_key(), and never the default random one
+	decision_cache = None
+	# container for the hand; UnoBitsetCardContainer answers has_match()
+	# and the suit counts in constant time, but listing the matches is
+	# cheaper from the plain lists, which is what a turn mostly does
+	hand_class = UnoCardContainer
+
 	def init_hand(self):
 		'''
 		Override base functionality to create an UnoHand
 		'''
-		self.hand = UnoCardContainer()
+		self.hand = self.hand_class()
 	
 	def determine_best_match(self, card, active_suit):
 		'''
@@ -154,44 +338,85 @@ class UnoPlayer(AbstractPlayer):
 		'''
 		matches = self.hand.get_matches(card, active_suit)
 		if len(matches) > 0:
-			return choice(matches)
+			return self.rng.choice(matches)
 		return None
 	
 	def take_turn(self, **kwargs):
 		game_logic = kwargs.get("game_logic", "hello")
 		active_card = game_logic.discard_pile.bottom_card(True)
 		chosen_card = None
+		cached_suit = key = None
 		while chosen_card is None:
-			if len(self.hand.get_matches(active_card, game_logic.active_suit)) > 0:
-				chosen_card = self.determine_best_match(active_card, game_logic.active_suit)
-			else:
-				self._prompt_draw(game_logic)
+			if self.hand.has_match(active_card, game_logic.active_suit):
+				if self.decision_cache is None:
+					chosen_card = self.determine_best_match(active_card, game_logic.active_suit)
+				else:
+					chosen_card, cached_suit, key = self._get_cached_decision(active_card, game_logic.active_suit)
+			elif self._prompt_draw(game_logic) is None:
+				# every card is in someone's hand; nothing to do but pass
+				return (None, game_logic.active_suit)
 			
 		self.hand.remove_card(chosen_card)
 		game_logic.discard_pile.add_card(chosen_card)
 		if chosen_card.is_wild():
-			print "You played a wild card; please choose a suit!"
-			new_suit = self._get_choice_in_list(UnoCardFactory.SUITS)
+			self._say("You played a wild card; please choose a suit!")
+			if cached_suit is not None:
+				new_suit = cached_suit
+				self._say("%s selected", new_suit)
+			else:
+				new_suit = self._get_choice_in_list(UnoCardFactory.SUITS)
 		else:
 			new_suit = chosen_card.suit
+		if key is not None:
+			self.decision_cache.put(key, (get_match_table().card_types[chosen_card.card_id],
+				new_suit if chosen_card.is_wild() else None))
 			
 		return (chosen_card, new_suit)
+
+	def get_decision_key(self, card, active_suit):
+		'''
+		Encodes the situation a decision is made in for the decision
+		cache: the cards in hand (as a sorted tuple of card types, so
+		identical cards are interchangeable), the type of the card to play
+		on and the active suit. Policies that look at more of the game
+		should add it to the key
+		'''
+		card_types = get_match_table().card_types
+		return (tuple(sorted(card_types[hand_card.card_id] for hand_card in self.hand.card_list)),
+			card_types[card.card_id], active_suit)
 	
+	def _get_cached_decision(self, card, active_suit):
+		'''
+		(card, suit, key) from the decision cache, with key None; or, if
+		the situation is new, (card, None, key) from determine_best_match()
+		with the key to store the decision under once the suit is picked
+		'''
+		key = self.get_decision_key(card, active_suit)
+		decision = self.decision_cache.get(key)
+		if decision is None:
+			return (self.determine_best_match(card, active_suit), None, key)
+		card_type, suit = decision
+		card_types = get_match_table().card_types
+		for hand_card in self.hand.card_list:
+			if card_types[hand_card.card_id] == card_type:
+				return (hand_card, suit, None)
+		raise ValueError("Cached decision %r isn't in the hand" % (decision,))
+
 	def _prompt_draw(self, game_logic):
 		'''
 		prompts the user to draw. Basically, any input will do it
 		'''
-		game_logic.update_draw_pile()
-		card = game_logic.draw_pile.top_card()
-		self.hand.add_card(card)
-		print("You have no matches for the top card in your hand; drew %s" % card)
+		card = game_logic.draw_card_for(self)
+		if card is not None:
+			self._say("You have no matches for the top card in your hand; drew %s", card)
+		return card
 		
 	def _get_choice_in_list(self, selection_list):
 		'''
 		Displays a list of cards for the user and prompts them for a selection
 		'''
-		selection = self.hand.get_suit_most_owned()
-		print "%s selected" % selection
+		selection = self.hand.get_suit_most_owned(self.rng)
+		self._say("%s selected", selection)
 		return selection
 	
 	def _validate_card_match(self, chosen_card, active_card, active_suit):
@@ -199,7 +424,7 @@ class UnoPlayer(AbstractPlayer):
 		Ensures that chosen_card is an acceptable match, given the active_card
 		and active_suit
 		"""
-		return chosen_card.is_match(active_card) or chosen_card.suit == active_suit
+		return get_match_table().is_playable(chosen_card, active_card, active_suit)
 
 class UnoRealPlayer(UnoPlayer):
 	
@@ -207,9 +432,9 @@ class UnoRealPlayer(UnoPlayer):
 		'''
 		prompts the user to draw. Basically, any input will do it
 		'''
+		self.renderer.flush()
 		raw_input("You have no matches for the top card in your hand; hit enter to draw")
-		game_logic.update_draw_pile
-		self.hand.add_card(game_logic.draw_pile.top_card())
+		return game_logic.draw_card_for(self)
 		
 	def determine_best_match(self, active_card, active_suit):
 		'''
@@ -217,10 +442,11 @@ class UnoRealPlayer(UnoPlayer):
 		'''
 		chosen_card = None
 		while chosen_card is None:
-			print "Card to match is %s" % active_card
+			self._say("Card to match is %s", active_card)
 			if active_card.is_wild():
-				print "Suit to match is %s" % active_suit
-			print "Your cards: "
+				self._say("Suit to match is %s", active_suit)
+			self._say("Your cards: ")
+			self.renderer.flush()
 			chosen_card = self._get_choice_in_list(self.hand.cards)
 			
 			if not self.validate_card_match(chosen_card, active_card, active_suit):
@@ -233,18 +459,35 @@ class UnoGameLogic(AbstractGameLogic):
 	MAX_PLAYERS = 10
 	MIN_PLAYERS = 2
 
-	def __init__(self):
-		AbstractGameLogic.__init__(self)
+	def __init__(self, seed = None, headless = False, renderer = None, pacer = None):
+		AbstractGameLogic.__init__(self, seed, headless, renderer, pacer)
 	
 	def update_draw_pile(self):
-		if self.draw_pile.empty():
-			print "***************************\nFLIPPING DISCARD AND SHUFFLING\n***************************\n"
-			sleep(1)
+		if self.draw_pile.empty() and not self.discard_pile.empty():
+			self._say("***************************\nFLIPPING DISCARD AND SHUFFLING\n***************************\n")
+			self._pause(1)
 			tmp = self.discard_pile
 			self.discard_pile = self.draw_pile
 			self.draw_pile = tmp
-			self.draw_pile.shuffle()
+			self.draw_pile.shuffle(1, self.rng)
 			self.discard_pile.add_card(self.draw_pile.top_card())
+			self.num_reshuffles += 1
+			if self.events.active:
+				self.events.emit(RESHUFFLE, self.draw_pile.num_cards())
+
+	def draw_card_for(self, player):
+		'''
+		Refills the draw pile if needed, then moves its top card
+		into the player's hand. Returns None if there was nothing
+		left to draw
+		'''
+		self.update_draw_pile()
+		card = self.draw_pile.top_card()
+		if card is None:
+			return None
+		player.draw_card(card)
+		self.num_draws += 1
+		return card
 	
 	@staticmethod
 	def get_friendly_name():
@@ -280,8 +523,12 @@ class UnoGameLogic(AbstractGameLogic):
 		return UnoPlayer
 
 	def _make_cards(self):
-		self.draw_pile = CardContainer(UnoCardFactory())
-		self.discard_pile = CardContainer()
+		self.draw_pile = CardPile(UnoCardFactory())
+		self.discard_pile = CardPile()
+
+	def _reset_cards(self):
+		self.draw_pile.reset(UnoCardFactory())
+		self.discard_pile.reset()
 
 	
 	def _deal(self):
@@ -289,66 +536,113 @@ class UnoGameLogic(AbstractGameLogic):
 		while i < UnoGameLogic.NUM_CARDS:
 			for player in self.players:
 				card = self.draw_pile.top_card()
-				player.draw_card(card)
+				self._deal_card(player, card)
 			i += 1
 	
-	def _play_game(self):
+	def _start_play(self):
 		self._flip_draw_card()
-		move_count = 0
-		player_index = 0
-		rot_reversed = False
+		self.player_index = 0
+		self.rot_reversed = False
+		self.consecutive_passes = 0
 		self.active_suit = self.discard_pile.bottom_card(True).suit
 
-		while self.winner == None:
-			msg = ""
-			player = self.players[player_index]
-			starting_cards = player.num_cards_in_hand()
-			old_active_suit = self.active_suit
+	def _play_turn(self):
+		events = self.events
+		player = self.players[self.player_index]
+		starting_cards = player.num_cards_in_hand()
+		old_active_suit = self.active_suit
+		if events.active:
+			events.emit(TURN_STARTED, player.seat)
 
-			turn_args = {"game_logic": self}
-			print player.hand
-			card_played, self.active_suit = player.take_turn(**turn_args)
-			move_count += 1
+		turn_args = {"game_logic": self}
+		renderer = self.renderer
+		if renderer.enabled:
+			renderer.say("%s", player.hand)
+		card_played, self.active_suit = player.take_turn(**turn_args)
+		self.num_turns += 1
 
-			msg += "Player %s played %s and has " % (player.name, str(card_played))
+		if card_played is None:
+			renderer.say("Player %s can't play or draw, and passes", player.name)
+			if events.active:
+				if player.num_cards_in_hand() > starting_cards:
+					events.emit(CARDS_DRAWN, player.seat, player.num_cards_in_hand() - starting_cards, None, None)
+				events.emit(TURN_ENDED, player.seat, player.num_cards_in_hand())
+			self.consecutive_passes += 1
+			if self.consecutive_passes >= len(self.players):
+				# nobody can move; call it a stalemate
+				self.finished = True
+				return
+			self.player_index = self._next_player(self.player_index, self.rot_reversed)
+			return
+		self.consecutive_passes = 0
+		if events.active:
+			events.emit(CARD_PLAYED, player.seat, card_played, self.active_suit)
 
-			ending_cards = player.num_cards_in_hand()
-			cards_drawn = ending_cards - starting_cards + 1
+		ending_cards = player.num_cards_in_hand()
+		cards_drawn = ending_cards - starting_cards + 1
+		if cards_drawn > 0 and events.active:
+			events.emit(CARDS_DRAWN, player.seat, cards_drawn, None, None)
+		if renderer.enabled:
+			msg = ["Player %s played %s and has %d cards remaining! " % (player.name, card_played, ending_cards)]
+			if cards_drawn > 0:
+				msg.append("cards drawn: %d! " % cards_drawn)
+			if self.active_suit != old_active_suit:
+				msg.append("New suit: %s" % self.active_suit)
 
-			msg += "%d cards remaining! " % ending_cards
+		if card_played.is_skip():
+			renderer.say("Skip played!")
+			self.player_index = self._next_player(self.player_index, self.rot_reversed)
+		elif card_played.is_draw():
+			draw_player = self.players[self._next_player(self.player_index, self.rot_reversed)]
+			# if card is a draw, we draw and don't get to play
+			renderer.say("Draw played! %s is taking %d cards", draw_player.name, card_played.num_draw_cards())
+			num_cards_drawn = 0
+			while num_cards_drawn < card_played.num_draw_cards():
+				self.draw_card_for(draw_player)
+				num_cards_drawn += 1
+			if events.active:
+				events.emit(CARDS_DRAWN, draw_player.seat, num_cards_drawn, None, None)
+			self.player_index = self._next_player(self.player_index, self.rot_reversed)
+		elif card_played.is_reverse():
+			renderer.say("Reverse played!")
+			self.rot_reversed = not self.rot_reversed
 
-			if cards_drawn > 0:
-				msg += "cards drawn: %d! " % cards_drawn
-
-			if card_played.is_skip():
-				print "Skip played!"
-				player_index = self._next_player(player_index, rot_reversed)
-			elif card_played.is_draw():
-				draw_player = self.players[self._next_player(player_index, rot_reversed)]
-				# if card is a draw, we draw and don't get to play
-				print "Draw played! %s is taking %d cards" % (draw_player.name, card_played.num_draw_cards())
-				num_cards_drawn = 0
-				while num_cards_drawn < card_played.num_draw_cards():
-					self.update_draw_pile()
-					draw_player.draw_card(self.draw_pile.top_card())
-					num_cards_drawn += 1
-				player_index = self._next_player(player_index, rot_reversed)
-			elif card_played.is_reverse():
-				print "Reverse played!"
-				rot_reversed = not rot_reversed
+		if renderer.enabled:
+			renderer.say("".join(msg))
+		if player.num_cards_in_hand() == 1:
+			renderer.say("========= Player %s has UNO! =========", player.name)
+		if events.active:
+			events.emit(TURN_ENDED, player.seat, player.num_cards_in_hand())
+		if player.num_cards_in_hand() == 0:
+			self.winner = player
+			self.finished = True
+			return
 
-			if self.active_suit != old_active_suit:
-				msg += "New suit: %s" % self.active_suit
-			print (msg)
-			if player.num_cards_in_hand() == 1:
-				print "========= Player %s has UNO! =========" % player.name
-			if player.num_cards_in_hand() == 0:
-				self.winner = player
-				break
-
-			player_index = self._next_player(player_index, rot_reversed)
-		return self.winner
+		self.player_index = self._next_player(self.player_index, self.rot_reversed)
+
+	def _get_state(self):
+		state = AbstractGameLogic._get_state(self)
+		state.update({
+			"discard_pile": self.discard_pile.clone(),
+			"active_suit": self.active_suit,
+			"player_index": self.player_index,
+			"rot_reversed": self.rot_reversed,
+			"consecutive_passes": self.consecutive_passes,
+		})
+		return state
+
+	def _set_state(self, state):
+		AbstractGameLogic._set_state(self, state)
+		self.discard_pile.copy_from(state["discard_pile"])
+		self.active_suit = state["active_suit"]
+		self.player_index = state["player_index"]
+		self.rot_reversed = state["rot_reversed"]
+		self.consecutive_passes = state["consecutive_passes"]
+
+	def _clone_containers(self, clone):
+		AbstractGameLogic._clone_containers(self, clone)
+		clone.discard_pile = self.discard_pile.clone()
 	
 	def _flip_draw_card(self):
 		self.discard_pile.add_card(self.draw_pile.top_card())
-		print "new card on discard pile: " + str(self.discard_pile.bottom_card(True))
\ No newline at end of file
+		self._say("new card on discard pile: %s", self.discard_pile.bottom_card(True))
\ No newline at end of file
@@ -0,0 +1,339 @@
+from uno import UnoCardFactory, UnoGameLogic
+import math
+
+try:
+	import numpy as np
+except ImportError:
+	np = None
+
+# cards are reduced to 54 types: 13 suited values for each of the 4 suits,
+# followed by the two kinds of wild card. Two cards of the same type are
+# interchangeable as far as the rules and the default UnoPlayer go
+NUM_SUITS = len(UnoCardFactory.SUITS)
+NUM_SUITED_VALUES = len(UnoCardFactory.SUITED_VALUES)
+NUM_SUITED_TYPES = NUM_SUITS * NUM_SUITED_VALUES
+NUM_TYPES = NUM_SUITED_TYPES + len(UnoCardFactory.WILD_CARD_VALUES)
+# suit index used for wild cards and for "no active suit"
+NO_SUIT = NUM_SUITS
+
+def get_card_type(card):
+	'''
+	Maps an UnoCard to its card type
+	'''
+	if card.is_wild():
+		return NUM_SUITED_TYPES + UnoCardFactory.WILD_CARD_VALUES.index(card.value)
+	values = [str(value) for value in UnoCardFactory.SUITED_VALUES]
+	return UnoCardFactory.SUITS.index(card.suit) * NUM_SUITED_VALUES + values.index(card.value)
+
+class _TypeTables:
+	'''
+	Per card type lookup arrays, built once per process
+	'''
+	def __init__(self):
+		cards = UnoCardFactory().get_cards()
+		self.suit = np.full(NUM_TYPES, NO_SUIT, dtype=np.int64)
+		self.value = np.zeros(NUM_TYPES, dtype=np.int64)
+		self.is_wild = np.zeros(NUM_TYPES, dtype=bool)
+		self.is_skip = np.zeros(NUM_TYPES, dtype=bool)
+		self.is_reverse = np.zeros(NUM_TYPES, dtype=bool)
+		self.draw_count = np.zeros(NUM_TYPES, dtype=np.int64)
+		self.deck = np.array([get_card_type(card) for card in cards], dtype=np.int64)
+		for card in cards:
+			card_type = get_card_type(card)
+			if card.suit is not None:
+				self.suit[card_type] = UnoCardFactory.SUITS.index(card.suit)
+			self.value[card_type] = card_type % NUM_SUITED_VALUES if card.suit is not None else card_type
+			self.is_wild[card_type] = card.is_wild()
+			self.is_skip[card_type] = card.is_skip()
+			self.is_reverse[card_type] = card.is_reverse()
+			self.draw_count[card_type] = card.num_draw_cards()
+
+		# match[top card type, active suit, hand card type]; mirrors
+		# UnoCardContainer.get_matches()
+		self.match = np.zeros((NUM_TYPES, NUM_SUITS + 1, NUM_TYPES), dtype=bool)
+		for top in range(NUM_TYPES):
+			for active_suit in range(NUM_SUITS + 1):
+				suit = active_suit if self.is_wild[top] else self.suit[top]
+				same_suit = (self.suit == suit) & (self.suit != NO_SUIT)
+				self.match[top, active_suit] = same_suit | (self.value == self.value[top]) | self.is_wild
+
+_tables = None
+
+def _get_tables():
+	global _tables
+	if _tables is None:
+		_tables = _TypeTables()
+	return _tables
+
+class UnoBatchResult:
+	'''
+	Per game outcomes of a batch; winners is -1 for a game with no winner,
+	either a stalemate or, if truncated is set for it, a game still going
+	when the batch reached max_turns
+	'''
+	def __init__(self, winners, num_turns, num_draws, num_reshuffles, truncated):
+		self.winners = winners
+		self.num_turns = num_turns
+		self.num_draws = num_draws
+		self.num_reshuffles = num_reshuffles
+		self.truncated = truncated
+
+	@property
+	def num_games(self):
+		return len(self.winners)
+
+	@property
+	def num_truncated(self):
+		return int(self.truncated.sum())
+
+	@property
+	def num_stalemates(self):
+		return int(((self.winners == -1) & ~self.truncated).sum())
+
+	def win_rates(self, num_players):
+		return [float((self.winners == seat).sum()) / self.num_games for seat in range(num_players)]
+
+class UnoBatchSimulator:
+	'''
+	Plays many games of Uno in lockstep with NumPy arrays, following the
+	rules of UnoGameLogic with every seat using the default UnoPlayer
+	policy. Hands are (game, seat, card type) count arrays and the piles
+	are per game arrays of card types with a length or read position, so
+	every turn is a handful of array operations over all unfinished
+	games. The random streams differ from UnoGameLogic's, so the two only
+	agree statistically (see compare_with_reference())
+	'''
+	def __init__(self, num_games, num_players, seed = None, max_turns = 20000):
+		if np is None:
+			raise ImportError("UnoBatchSimulator needs numpy")
+		if num_players < UnoGameLogic.MIN_PLAYERS or num_players > UnoGameLogic.MAX_PLAYERS:
+			raise ValueError("Invalid number of players, must be between %d and %d" % (UnoGameLogic.MIN_PLAYERS, UnoGameLogic.MAX_PLAYERS))
+		self.num_games = num_games
+		self.num_players = num_players
+		self.max_turns = max_turns
+		self.rng = np.random.RandomState(seed)
+		self.tables = _get_tables()
+
+	def run(self):
+		'''
+		Plays every game to completion, or until max_turns turns have been
+		played, and returns an UnoBatchResult
+		'''
+		self._setup()
+		games = np.arange(self.num_games)
+		turn = 0
+		while len(games) > 0 and turn < self.max_turns:
+			self._play_turn(games)
+			games = games[~self.done[games]]
+			turn += 1
+		truncated = np.zeros(self.num_games, dtype=bool)
+		truncated[games] = True
+		return UnoBatchResult(self.winners, self.num_turns, self.num_draws, self.num_reshuffles, truncated)
+
+	###################################
+	# PROTECTED METHODS ###############
+	###################################
+	def _setup(self):
+		num_games = self.num_games
+		num_players = self.num_players
+		deck_size = len(self.tables.deck)
+		# shuffle every deck at once
+		order = self.rng.rand(num_games, deck_size).argsort(axis=1)
+		self.draw_pile = self.tables.deck[order]
+		self.draw_pos = np.zeros(num_games, dtype=np.int64)
+		self.draw_len = np.full(num_games, deck_size, dtype=np.int64)
+		self.discard_pile = np.zeros((num_games, deck_size), dtype=np.int64)
+		self.discard_len = np.zeros(num_games, dtype=np.int64)
+		self.hands = np.zeros((num_games, num_players, NUM_TYPES), dtype=np.int64)
+
+		# deal UnoGameLogic.NUM_CARDS rounds, one card per player per round
+		games = np.arange(num_games)
+		num_dealt = UnoGameLogic.NUM_CARDS * num_players
+		for position in range(num_dealt):
+			np.add.at(self.hands, (games, position % num_players, self.draw_pile[:, position]), 1)
+		self.draw_pos[:] = num_dealt
+
+		# flip the first discard
+		self.discard_pile[:, 0] = self.draw_pile[:, num_dealt]
+		self.discard_len[:] = 1
+		self.draw_pos += 1
+		self.active_suit = self.tables.suit[self.discard_pile[:, 0]].copy()
+
+		self.current = np.zeros(num_games, dtype=np.int64)
+		self.direction = np.ones(num_games, dtype=np.int64)
+		self.passes = np.zeros(num_games, dtype=np.int64)
+		self.done = np.zeros(num_games, dtype=bool)
+		self.winners = np.full(num_games, -1, dtype=np.int64)
+		self.num_turns = np.zeros(num_games, dtype=np.int64)
+		self.num_draws = np.zeros(num_games, dtype=np.int64)
+		self.num_reshuffles = np.zeros(num_games, dtype=np.int64)
+
+	def _reshuffle(self, games):
+		'''
+		UnoGameLogic.update_draw_pile() for the given games at once: the
+		discards become the draw pile, and its new top card is flipped.
+		Each game's discards are shuffled by sorting them on random keys,
+		the slots past the end of its pile sorting last
+		'''
+		games = games[self.discard_len[games] > 0]
+		if len(games) == 0:
+			return
+		counts = self.discard_len[games]
+		width = counts.max()
+		keys = self.rng.rand(len(games), width)
+		keys[np.arange(width) >= counts[:, None]] = np.inf
+		order = keys.argsort(axis=1)
+		cards = self.discard_pile[games[:, None], order]
+		self.draw_pile[games, :width] = cards
+		self.draw_len[games] = counts
+		self.draw_pos[games] = 1
+		self.discard_pile[games, 0] = cards[:, 0]
+		self.discard_len[games] = 1
+		self.num_reshuffles[games] += 1
+
+	def _draw(self, games, players):
+		'''
+		Each of the given players draws one card; returns which of them
+		actually got one
+		'''
+		empty = self.draw_pos[games] >= self.draw_len[games]
+		if empty.any():
+			self._reshuffle(games[empty])
+		drew = self.draw_pos[games] < self.draw_len[games]
+		games = games[drew]
+		cards = self.draw_pile[games, self.draw_pos[games]]
+		self.draw_pos[games] += 1
+		self.hands[games, players[drew], cards] += 1
+		self.num_draws[games] += 1
+		return drew
+
+	def _match_counts(self, games, players, top, active_suit):
+		return self.hands[games, players] * self.tables.match[top, active_suit]
+
+	def _play_turn(self, games):
+		tables = self.tables
+		players = self.current[games]
+		# the card to match is fixed when the turn starts, even if drawing
+		# causes a reshuffle
+		top = self.discard_pile[games, self.discard_len[games] - 1]
+		active_suit = self.active_suit[games]
+		self.num_turns[games] += 1
+
+		# draw until there's a match or nothing left to draw
+		matches = self._match_counts(games, players, top, active_suit)
+		playing = np.ones(len(games), dtype=bool)
+		drawing = np.nonzero(matches.sum(axis=1) == 0)[0]
+		while len(drawing) > 0:
+			drew = self._draw(games[drawing], players[drawing])
+			playing[drawing[~drew]] = False
+			drawing = drawing[drew]
+			matches[drawing] = self._match_counts(games[drawing], players[drawing], top[drawing], active_suit[drawing])
+			drawing = drawing[matches[drawing].sum(axis=1) == 0]
+
+		passed = games[~playing]
+		if len(passed) > 0:
+			self.passes[passed] += 1
+			stalled = passed[self.passes[passed] >= self.num_players]
+			self.done[stalled] = True
+			self._advance(passed, 1)
+		games = games[playing]
+		if len(games) == 0:
+			return
+		self.passes[games] = 0
+		players = players[playing]
+		matches = matches[playing]
+
+		# choose uniformly between the matching cards
+		cumulative = matches.cumsum(axis=1)
+		picks = (self.rng.rand(len(games)) * cumulative[:, -1]).astype(np.int64)
+		cards = (cumulative > picks[:, None]).argmax(axis=1)
+		self.hands[games, players, cards] -= 1
+		self.discard_pile[games, self.discard_len[games]] = cards
+		self.discard_len[games] += 1
+
+		# choose a suit; wilds take the suit most owned (first in suit order
+		# on a tie), or a random one with no suited cards left
+		new_suit = tables.suit[cards].copy()
+		wild = np.nonzero(tables.is_wild[cards])[0]
+		if len(wild) > 0:
+			suited = self.hands[games[wild], players[wild], :NUM_SUITED_TYPES]
+			suit_counts = suited.reshape(len(wild), NUM_SUITS, NUM_SUITED_VALUES).sum(axis=2)
+			most_owned = suit_counts.argmax(axis=1)
+			no_suits = suit_counts.max(axis=1) == 0
+			most_owned[no_suits] = self.rng.randint(0, NUM_SUITS, no_suits.sum())
+			new_suit[wild] = most_owned
+		self.active_suit[games] = new_suit
+
+		# card effects
+		steps = np.ones(len(games), dtype=np.int64)
+		skipping = tables.is_skip[cards]
+		draw_count = tables.draw_count[cards]
+		drawing = np.nonzero(draw_count > 0)[0]
+		if len(drawing) > 0:
+			victims = (players[drawing] + self.direction[games[drawing]]) % self.num_players
+			for i in range(draw_count[drawing].max()):
+				still_drawing = draw_count[drawing] > i
+				self._draw(games[drawing][still_drawing], victims[still_drawing])
+		steps[skipping | (draw_count > 0)] = 2
+		reversing = games[tables.is_reverse[cards]]
+		self.direction[reversing] *= -1
+
+		won = self.hands[games, players].sum(axis=1) == 0
+		self.done[games[won]] = True
+		self.winners[games[won]] = players[won]
+		self._advance(games[~won], steps[~won])
+
+	def _advance(self, games, steps):
+		self.current[games] = (self.current[games] + steps * self.direction[games]) % self.num_players
+
+class ValidationReport:
+	'''
+	Side by side summary of the batch simulator and UnoGameLogic over the
+	same number of games; z is the two-sample z score of each difference
+	'''
+	def __init__(self, num_players):
+		self.num_players = num_players
+		self.rows = []
+
+	def add(self, name, batch_values, reference_values):
+		batch_mean, batch_var = _mean_and_variance(batch_values)
+		reference_mean, reference_var = _mean_and_variance(reference_values)
+		error = math.sqrt(batch_var / len(batch_values) + reference_var / len(reference_values))
+		z = 0.0 if error == 0 else (batch_mean - reference_mean) / error
+		self.rows.append((name, batch_mean, reference_mean, z))
+
+	def max_abs_z(self):
+		return max([abs(row[3]) for row in self.rows])
+
+	def __str__(self):
+		lines = ["%-20s %10s %10s %8s" % ("", "batch", "reference", "z")]
+		for name, batch_mean, reference_mean, z in self.rows:
+			lines.append("%-20s %10.4f %10.4f %8.2f" % (name, batch_mean, reference_mean, z))
+		return "\n".join(lines)
+
+def _mean_and_variance(values):
+	values = np.asarray(values, dtype=float)
+	return values.mean(), values.var(ddof=1)
+
+def compare_with_reference(num_games, num_players, seed = 0):
+	'''
+	Plays num_games with both engines and compares win rate per seat,
+	game length, draws and reshuffles. With matching rules every |z|
+	should be small (say under 4)
+	'''
+	batch = UnoBatchSimulator(num_games, num_players, seed).run()
+
+	reference_games = []
+	names = ["seat %d" % (i + 1) for i in range(num_players)]
+	for game_index in xrange(num_games):
+		logic = UnoGameLogic(seed * num_games + game_index, True)
+		reference_games.append(logic.simulate(names))
+
+	report = ValidationReport(num_players)
+	for seat in range(num_players):
+		report.add("seat %d wins" % (seat + 1), batch.winners == seat,
+			[result.winner_index == seat for result in reference_games])
+	report.add("turns", batch.num_turns, [result.num_turns for result in reference_games])
+	report.add("draws", batch.num_draws, [result.num_draws for result in reference_games])
+	report.add("reshuffles", batch.num_reshuffles, [result.num_reshuffles for result in reference_games])
+	return report
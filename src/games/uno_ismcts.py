@@ -0,0 +1,252 @@
+from uno import UnoCardFactory, UnoGameLogic, UnoPlayer
+from multiprocessing import Pool
+from random import Random
+from time import time
+import math
+
+DEFAULT_ROLLOUT_BUDGET = 200
+DEFAULT_EXPLORATION = 0.7
+# rollouts that haven't finished after this many turns count as losses
+MAX_ROLLOUT_TURNS = 2000
+
+class _RolloutPlayer(UnoPlayer):
+	'''
+	Default random policy, except that the first card played (and suit
+	picked) can be forced
+	'''
+	def __init__(self, name):
+		self.forced_card = None
+		self.forced_suit = None
+		UnoPlayer.__init__(self, name)
+
+	def determine_best_match(self, card, active_suit):
+		if self.forced_card is not None:
+			chosen_card = self.forced_card
+			self.forced_card = None
+			return chosen_card
+		return UnoPlayer.determine_best_match(self, card, active_suit)
+
+	def _get_choice_in_list(self, selection_list):
+		if self.forced_suit is not None:
+			suit = self.forced_suit
+			self.forced_suit = None
+			return suit
+		return UnoPlayer._get_choice_in_list(self, selection_list)
+
+def _make_rollout_game(logic, rng):
+	'''
+	Clones the game with every seat replaced by a _RolloutPlayer holding
+	the same hand
+	'''
+	game = logic.clone(rng)
+	for player in game.players:
+		rollout_player = _RolloutPlayer(player.name)
+		rollout_player.hand = player.hand
+		rollout_player.seat = player.seat
+		rollout_player.rng = rng
+		rollout_player.renderer = game.renderer
+		game.players[player.seat] = rollout_player
+	return game
+
+class _Search:
+	'''
+	Flat information set MCTS from one seat's point of view: each rollout
+	re-deals the cards that seat can't see (opponents' hands and the draw
+	pile), picks a move by UCB1 and plays the game out with the default
+	random policy
+	'''
+	def __init__(self, logic, seat, actions, rng, exploration):
+		self.seat = seat
+		self.actions = actions
+		self.rng = rng
+		self.exploration = exploration
+		self.visits = [0] * len(actions)
+		self.wins = [0] * len(actions)
+
+		self.game = _make_rollout_game(logic, rng)
+		self.start = self.game.snapshot()
+
+	def run(self, max_rollouts, deadline):
+		rollouts = 0
+		while rollouts < max_rollouts and (deadline is None or time() < deadline):
+			self._rollout()
+			rollouts += 1
+		return rollouts
+
+	def _select(self):
+		total = sum(self.visits)
+		best_index = 0
+		best_score = None
+		for index in range(len(self.actions)):
+			if self.visits[index] == 0:
+				return index
+			score = float(self.wins[index]) / self.visits[index] + \
+				self.exploration * math.sqrt(math.log(total) / self.visits[index])
+			if best_score is None or score > best_score:
+				best_index = index
+				best_score = score
+		return best_index
+
+	def _determinize(self):
+		game = self.game
+		opponents = [player for player in game.players if player.seat != self.seat]
+		hidden = list(game.draw_pile.card_list)
+		for player in opponents:
+			hidden.extend(player.hand.card_list)
+		self.rng.shuffle(hidden)
+		game.draw_pile.clear()
+		for player in opponents:
+			num_cards = player.hand.num_cards()
+			player.hand.clear()
+			for card in hidden[:num_cards]:
+				player.hand.add_card(card)
+			hidden = hidden[num_cards:]
+		for card in hidden:
+			game.draw_pile.add_card(card)
+
+	def _rollout(self):
+		game = self.game
+		game.restore(self.start)
+		self._determinize()
+		index = self._select()
+		player = game.players[self.seat]
+		player.forced_card, player.forced_suit = self.actions[index]
+		turns = 0
+		while not game.finished and turns < MAX_ROLLOUT_TURNS:
+			game._play_turn()
+			turns += 1
+		self.visits[index] += 1
+		if game.winner is not None and game.winner.seat == self.seat:
+			self.wins[index] += 1
+
+def _search_worker(args):
+	'''
+	Runs a search in a pool worker; the actions come in as (card_id, suit)
+	since card identity doesn't survive pickling
+	'''
+	logic, seat, action_ids, seed, exploration, max_rollouts, time_budget = args
+	cards_by_id = dict([(card.card_id, card) for card in logic.players[seat].hand.card_list])
+	actions = [(cards_by_id[card_id], suit) for card_id, suit in action_ids]
+	search = _Search(logic, seat, actions, Random(seed), exploration)
+	deadline = None if time_budget is None else time() + time_budget
+	search.run(max_rollouts, deadline)
+	return (search.visits, search.wins)
+
+class UnoISMCTSPlayer(UnoPlayer):
+	'''
+	Uno player which picks its card (and wild suit) by information set
+	Monte Carlo tree search. Each decision runs up to rollout_budget
+	rollouts, stopping early once time_budget seconds have passed. With a
+	multiprocessing pool, the rollouts are split between num_workers
+	independent searches whose results are summed. Given a DecisionCache,
+	a decision is only searched the first time its situation comes up
+	'''
+	def __init__(self, name, rollout_budget = DEFAULT_ROLLOUT_BUDGET, time_budget = None,
+			exploration = DEFAULT_EXPLORATION, pool = None, num_workers = 1, decision_cache = None):
+		UnoPlayer.__init__(self, name)
+		self.decision_cache = decision_cache
+		self.rollout_budget = rollout_budget
+		self.time_budget = time_budget
+		self.exploration = exploration
+		self.pool = pool
+		self.num_workers = num_workers
+		self.total_rollouts = 0
+		self.total_search_time = 0.0
+		self.num_decisions = 0
+		self._game_logic = None
+		self._chosen_suit = None
+
+	def take_turn(self, **kwargs):
+		self._game_logic = kwargs.get("game_logic")
+		return UnoPlayer.take_turn(self, **kwargs)
+
+	def rollouts_per_second(self):
+		if self.total_search_time == 0:
+			return 0.0
+		return self.total_rollouts / self.total_search_time
+
+	def determine_best_match(self, card, active_suit):
+		'''
+		Searches over every distinct playable card, and every suit for
+		wild cards
+		'''
+		self._chosen_suit = None
+		actions = self._get_actions(card, active_suit)
+		if len(actions) == 0:
+			return None
+		if len(actions) == 1:
+			chosen_card, self._chosen_suit = actions[0]
+			return chosen_card
+
+		start = time()
+		visits, wins = self._search(actions)
+		self.total_search_time += time() - start
+		self.total_rollouts += sum(visits)
+		self.num_decisions += 1
+
+		best_index = max(range(len(actions)), key = lambda index: (visits[index], wins[index]))
+		chosen_card, self._chosen_suit = actions[best_index]
+		return chosen_card
+
+	def get_decision_key(self, card, active_suit):
+		'''
+		Adds the number of cards each other seat holds, in the order they
+		play after this one; how the rollouts go depends on them
+		'''
+		logic = self._game_logic
+		num_players = len(logic.players)
+		step = -1 if logic.rot_reversed else 1
+		hand_sizes = tuple(logic.players[(self.seat + step * offset) % num_players].num_cards_in_hand()
+			for offset in range(1, num_players))
+		return UnoPlayer.get_decision_key(self, card, active_suit) + (hand_sizes,)
+
+	def _get_choice_in_list(self, selection_list):
+		if self._chosen_suit is not None:
+			self._say("%s selected", self._chosen_suit)
+			return self._chosen_suit
+		return UnoPlayer._get_choice_in_list(self, selection_list)
+
+	def _get_actions(self, card, active_suit):
+		'''
+		(card, suit) pairs; identical cards are only included once
+		'''
+		actions = []
+		seen = set()
+		for match in self.hand.get_matches(card, active_suit):
+			if (match.suit, match.value) in seen:
+				continue
+			seen.add((match.suit, match.value))
+			if match.is_wild():
+				for suit in UnoCardFactory.SUITS:
+					actions.append((match, suit))
+			else:
+				actions.append((match, None))
+		return actions
+
+	def _search(self, actions):
+		if self.pool is None or self.num_workers <= 1:
+			deadline = None if self.time_budget is None else time() + self.time_budget
+			search = _Search(self._game_logic, self.seat, actions, Random(self.rng.getrandbits(64)), self.exploration)
+			search.run(self.rollout_budget, deadline)
+			return (search.visits, search.wins)
+
+		game = _make_rollout_game(self._game_logic, Random())
+		action_ids = [(chosen_card.card_id, suit) for chosen_card, suit in actions]
+		rollouts_per_worker = int(math.ceil(float(self.rollout_budget) / self.num_workers))
+		jobs = [(game, self.seat, action_ids, self.rng.getrandbits(64), self.exploration,
+			rollouts_per_worker, self.time_budget) for _ in range(self.num_workers)]
+		visits = [0] * len(actions)
+		wins = [0] * len(actions)
+		for worker_visits, worker_wins in self.pool.map(_search_worker, jobs):
+			for index in range(len(actions)):
+				visits[index] += worker_visits[index]
+				wins[index] += worker_wins[index]
+		return (visits, wins)
+
+class UnoISMCTSGameLogic(UnoGameLogic):
+	'''
+	Uno where every seat that isn't passed in explicitly is an
+	UnoISMCTSPlayer
+	'''
+	def _get_player_class(self):
+		return UnoISMCTSPlayer
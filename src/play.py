@@ -1,7 +1,8 @@
 from games.registry import GameRegistry
-from common.common import Game
 
 def play_game():
+	# only import the engine once there's something to play
+	from common.common import Game
 	game_list = GameRegistry.get_registered_games()
 	if len(game_list) < 1:
 		print "No games have been registered. Please register some."
@@ -0,0 +1 @@
+__all__ = ["reactor", "players", "game_server", "bots"]
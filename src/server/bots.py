@@ -0,0 +1,135 @@
+'''
+Bot clients for the game server, and a load test which runs a server and
+a table's worth of bots for every table in one process. Run from the src
+directory:
+
+	python -m server.bots --tables 1000 --players 4
+	python -m server.bots --game "Old Maid" --tables 500 --players 3
+
+Bots answer every decision with a random legal move, after about
+think_time seconds if given.
+'''
+from common.events import clock
+from server.reactor import JsonConnection, Reactor, connect
+from server.game_server import GameServer
+import argparse
+import random
+
+class BotClient(JsonConnection):
+	'''
+	Joins one table, plays it out and disconnects. round_trips collects,
+	for each of its moves, the seconds from sending the move to hearing
+	its outcome back from the table
+	'''
+	def __init__(self, reactor, sock, game, num_players, name, rng, think_time = 0):
+		JsonConnection.__init__(self, reactor, sock)
+		self.rng = rng
+		self.think_time = think_time
+		self.seat = None
+		self.round_trips = []
+		self.errors = []
+		self.finished = False
+		self.winner = None
+		self._move_sent = None
+		self.send({"type": "join", "game": game, "name": name, "players": num_players})
+
+	def on_message(self, message, received):
+		message_type = message.get("type")
+		if message_type == "start":
+			self.seat = message["seat"]
+		elif message_type == "your_turn":
+			move = self._choose_move(message)
+			if self.think_time:
+				# vary the delay so bots don't all move in lockstep
+				delay = self.rng.uniform(.5, 1.5) * self.think_time
+				self.reactor.call_later(delay, lambda: self._send_move(move))
+			else:
+				self._send_move(move)
+		elif message_type == "event":
+			if self._move_sent is not None and message["event"] == "turn_ended" and message["seat"] == self.seat:
+				self.round_trips.append(received - self._move_sent)
+				self._move_sent = None
+			if message["event"] == "game_finished":
+				self.finished = True
+				self.winner = message["winner"]
+				self.close()
+		elif message_type == "error":
+			self.errors.append(message["message"])
+
+	###################################
+	# PROTECTED METHODS ###############
+	###################################
+	def _choose_move(self, prompt):
+		if "playable" in prompt:
+			card_id = self.rng.choice(prompt["playable"])
+			return {"type": "move", "card": card_id, "suit": self.rng.choice(prompt["suits"])}
+		return {"type": "move", "index": self.rng.randrange(prompt["num_choices"])}
+
+	def _send_move(self, move):
+		self._move_sent = clock()
+		self.send(move)
+
+def _percentile(values, fraction):
+	if not values:
+		return 0.0
+	ordered = sorted(values)
+	return ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+
+def run_load_test(game = "Uno!", num_tables = 100, num_players = 4, think_time = 0,
+		move_timeout = 5.0, seed = 0, time_limit = 600, paced = False):
+	'''
+	Seats num_tables tables of bots at once and plays them all out.
+	Returns a dict of the results
+	'''
+	reactor = Reactor()
+	server = GameServer(reactor, port = 0, move_timeout = move_timeout, seed = seed, paced = paced)
+	rng = random.Random(seed)
+	start = clock()
+	bots = []
+	for index in range(num_tables * num_players):
+		bots.append(connect(reactor, BotClient, server.address, game, num_players,
+			"bot%d" % index, random.Random(rng.getrandbits(32)), think_time))
+	deadline = start + time_limit
+	reactor.run(until = lambda: server.tables_finished == num_tables or clock() > deadline)
+	elapsed = clock() - start
+	server.close()
+	for bot in bots:
+		bot.close()
+
+	round_trips = []
+	errors = []
+	for bot in bots:
+		round_trips.extend(bot.round_trips)
+		errors.extend(bot.errors)
+	return {
+		"tables": server.tables_finished,
+		"seconds": elapsed,
+		"moves": len(server.move_latencies),
+		"latency_p50": server.latency_percentile(.5),
+		"latency_p99": server.latency_percentile(.99),
+		"round_trip_p50": _percentile(round_trips, .5),
+		"round_trip_p99": _percentile(round_trips, .99),
+		"errors": len(errors),
+	}
+
+def main(argv = None):
+	parser = argparse.ArgumentParser(description = "Plays many tables of bots against a local game server")
+	parser.add_argument("--game", default = "Uno!")
+	parser.add_argument("--tables", type = int, default = 100)
+	parser.add_argument("--players", type = int, default = 4)
+	parser.add_argument("--think-time", type = float, default = 0, help = "seconds each bot waits before moving")
+	parser.add_argument("--move-timeout", type = float, default = 5.0)
+	parser.add_argument("--seed", type = int, default = 0)
+	parser.add_argument("--paced", action = "store_true", help = "keep the games' pauses between turns")
+	args = parser.parse_args(argv)
+
+	results = run_load_test(args.game, args.tables, args.players, args.think_time, args.move_timeout,
+		args.seed, paced = args.paced)
+	print "tables: %d in %.2fs, moves: %d, errors: %d" % (results["tables"], results["seconds"],
+		results["moves"], results["errors"])
+	print "move to broadcast: p50 %.3fms, p99 %.3fms" % (results["latency_p50"] * 1e3, results["latency_p99"] * 1e3)
+	print "bot round trip:    p50 %.3fms, p99 %.3fms" % (results["round_trip_p50"] * 1e3, results["round_trip_p99"] * 1e3)
+	return 0
+
+if __name__ == "__main__":
+	main()
@@ -0,0 +1,419 @@
+'''
+Game server hosting many tables of any registered game at once.
+
+Clients connect over TCP and exchange JSON objects, one per line. A client
+joins a table with
+
+	{"type": "join", "game": "Uno!", "name": "alice", "players": 4}
+
+and is seated once enough clients have asked for the same game and
+number of players. From then on it receives "event" messages for
+everything that happens at the table (cards it can't see are left out),
+and a "your_turn" message whenever it has a decision to make, which it
+answers with {"type": "move", ...}: {"card": card_id, "suit": suit} for
+Uno, {"index": position} for Old Maid. A client that doesn't answer
+within the move timeout (or disconnects) has its move made by the game's
+default player.
+
+Every table is a generator coroutine driven by one event loop, so a
+table waiting on a slow client costs nothing but its state. Run from the
+src directory:
+
+	python -m server.game_server --port 7777
+'''
+from common.events import clock
+from common.pacing import AsyncPacer
+from games.registry import GameRegistry
+from server.players import describe_card, get_remote_player_class
+from server.reactor import JsonConnection, Listener, Reactor, encode_message
+import argparse
+import math
+import random
+
+DEFAULT_MOVE_TIMEOUT = 30.0
+DEFAULT_PORT = 7777
+
+# what a table's coroutine can wait for
+WAIT_FOR_MOVE = "move"
+WAIT_FOR_DRAIN = "drain"
+WAIT_FOR_DELAY = "delay"
+
+# move latencies are counted in buckets this many to a doubling, from
+# SMALLEST_LATENCY up to about SMALLEST_LATENCY * 2 ** LATENCY_DOUBLINGS
+SMALLEST_LATENCY = 1e-6
+LATENCY_BUCKETS_PER_DOUBLING = 8
+LATENCY_DOUBLINGS = 30
+
+class LatencyHistogram:
+	'''
+	Counts latencies in fixed buckets, spaced so that each is about 9%
+	wider than the last, so it takes the same room however many are
+	added. A percentile is the upper edge of the bucket it falls in
+	(never more than the largest latency seen), so it is out by at most
+	a bucket's width
+	'''
+	def __init__(self):
+		self.buckets = [0] * (LATENCY_BUCKETS_PER_DOUBLING * LATENCY_DOUBLINGS + 1)
+		self.count = 0
+		self.largest = 0.0
+
+	def add(self, latency):
+		if latency <= SMALLEST_LATENCY:
+			index = 0
+		else:
+			index = int(math.log(latency / SMALLEST_LATENCY, 2) * LATENCY_BUCKETS_PER_DOUBLING) + 1
+			index = min(index, len(self.buckets) - 1)
+		self.buckets[index] += 1
+		self.count += 1
+		self.largest = max(self.largest, latency)
+
+	def percentile(self, fraction):
+		'''
+		Latency at the given fraction (0.99 for p99), or 0.0 if none have
+		been added
+		'''
+		if not self.count:
+			return 0.0
+		rank = min(self.count - 1, int(fraction * self.count))
+		seen = 0
+		for index, bucket in enumerate(self.buckets):
+			seen += bucket
+			if seen > rank:
+				break
+		if index == len(self.buckets) - 1:
+			return self.largest
+		upper_edge = SMALLEST_LATENCY * 2 ** (float(index) / LATENCY_BUCKETS_PER_DOUBLING)
+		return min(upper_edge, self.largest)
+
+	def __len__(self):
+		return self.count
+
+class Table:
+	'''
+	One game between connected clients. _play() is the table's coroutine:
+	it plays the game a turn at a time, yielding whenever it has to wait
+	for a client's move, for slow clients to catch up on what they've
+	been sent or, on a paced table, for the game's pauses
+	'''
+	def __init__(self, server, table_id, logic_class, clients, seed, paced = False):
+		self.server = server
+		self.table_id = table_id
+		self.clients = list(clients)
+		self.pacer = AsyncPacer() if paced else None
+		self.logic = logic_class(seed, True, pacer = self.pacer)
+		player_class = get_remote_player_class(logic_class)
+		self.players = [player_class(client.name) for client in clients]
+		self.waiting_seat = None
+		self.draining = False
+		self._timer = None
+		self._coroutine = self._play()
+
+	def start(self):
+		for seat, client in enumerate(self.clients):
+			client.table = self
+			client.seat = seat
+		self._resume(None)
+
+	def deliver_move(self, seat, message, received):
+		if seat != self.waiting_seat:
+			self._send(seat, {"type": "error", "message": "it isn't your turn"})
+			return
+		self._stop_waiting()
+		self._resume((message, received))
+
+	def client_closed(self, seat):
+		self.clients[seat] = None
+		if seat == self.waiting_seat:
+			self._stop_waiting()
+			self._resume((None, None))
+
+	def client_drained(self):
+		if self.draining and not self._is_congested():
+			self.draining = False
+			self._resume(None)
+
+	###################################
+	# EVENT LISTENERS #################
+	###################################
+	def on_game_started(self, timestamp, logic):
+		names = [player.name for player in logic.players]
+		for seat in range(len(self.clients)):
+			self._send(seat, {"type": "start", "table": self.table_id, "game": logic.get_friendly_name(),
+				"seat": seat, "players": names})
+
+	def on_card_dealt(self, timestamp, seat, card):
+		self._send(seat, {"type": "event", "event": "card_dealt", "seat": seat, "card": describe_card(card)})
+
+	def on_turn_started(self, timestamp, seat):
+		self._broadcast({"type": "event", "event": "turn_started", "seat": seat})
+
+	def on_card_played(self, timestamp, seat, card, active_suit):
+		self._broadcast({"type": "event", "event": "card_played", "seat": seat,
+			"card": describe_card(card), "active_suit": active_suit})
+
+	def on_cards_drawn(self, timestamp, seat, num_cards, from_seat, card):
+		message = {"type": "event", "event": "cards_drawn", "seat": seat,
+			"num_cards": num_cards, "from_seat": from_seat, "card": None}
+		if card is None:
+			self._broadcast(message)
+			return
+		hidden = encode_message(message)
+		message["card"] = describe_card(card)
+		shown = encode_message(message)
+		for client in self.clients:
+			if client is not None:
+				client.send_encoded(shown if client.seat in (seat, from_seat) else hidden)
+
+	def on_reshuffle(self, timestamp, num_cards):
+		self._broadcast({"type": "event", "event": "reshuffle", "num_cards": num_cards})
+
+	def on_turn_ended(self, timestamp, seat, num_cards_in_hand):
+		self._broadcast({"type": "event", "event": "turn_ended", "seat": seat,
+			"num_cards_in_hand": num_cards_in_hand})
+
+	def on_game_finished(self, timestamp, winner_seat, num_turns):
+		self._broadcast({"type": "event", "event": "game_finished", "winner": winner_seat,
+			"num_turns": num_turns})
+
+	###################################
+	# PROTECTED METHODS ###############
+	###################################
+	def _play(self):
+		logic = self.logic
+		logic.events.add_observer(self)
+		logic.begin(self.players)
+		while not logic.finished:
+			player = logic.get_current_player()
+			prompt = player.get_prompt(logic)
+			received = None
+			if prompt is not None:
+				deadline = clock() + self.server.move_timeout
+				prompt["type"] = "your_turn"
+				self._send(player.seat, prompt)
+				while True:
+					message, received = yield (WAIT_FOR_MOVE, player.seat, deadline)
+					if message is None:
+						break
+					try:
+						player.set_move(message, logic)
+						break
+					except ValueError as error:
+						self._send(player.seat, {"type": "error", "message": str(error)})
+			logic.step()
+			if received is not None:
+				self.server.move_latencies.add(clock() - received)
+			if self._is_congested():
+				yield (WAIT_FOR_DRAIN,)
+			if self.pacer is not None:
+				delay = self.pacer.take_delay()
+				if delay > 0:
+					yield (WAIT_FOR_DELAY, delay)
+
+	def _resume(self, value):
+		'''
+		Runs the coroutine until it has to wait for something that hasn't
+		happened yet
+		'''
+		while True:
+			try:
+				command = self._coroutine.send(value)
+			except StopIteration:
+				self.server.table_finished(self)
+				return
+			if command[0] == WAIT_FOR_MOVE:
+				_, seat, deadline = command
+				if self.clients[seat] is not None:
+					self.waiting_seat = seat
+					self._timer = self.server.reactor.call_later(max(0, deadline - clock()), self._on_timeout)
+					return
+				# nobody to ask; the default player moves
+				value = (None, None)
+			elif command[0] == WAIT_FOR_DRAIN:
+				if self._is_congested():
+					self.draining = True
+					return
+				value = None
+			elif command[0] == WAIT_FOR_DELAY:
+				self._timer = self.server.reactor.call_later(command[1], self._on_delay_over)
+				return
+
+	def _on_delay_over(self):
+		self._timer = None
+		self._resume(None)
+
+	def _on_timeout(self):
+		seat = self.waiting_seat
+		self._timer = None
+		self.waiting_seat = None
+		self._send(seat, {"type": "timeout"})
+		self._resume((None, None))
+
+	def _stop_waiting(self):
+		if self._timer is not None:
+			self._timer.cancel()
+			self._timer = None
+		self.waiting_seat = None
+
+	def _is_congested(self):
+		for client in self.clients:
+			if client is not None and client.is_congested():
+				return True
+		return False
+
+	def _send(self, seat, message):
+		client = self.clients[seat]
+		if client is not None:
+			client.send(message)
+
+	def _broadcast(self, message):
+		data = encode_message(message)
+		for client in self.clients:
+			if client is not None:
+				client.send_encoded(data)
+
+class ClientConnection(JsonConnection):
+	def __init__(self, reactor, sock, server):
+		JsonConnection.__init__(self, reactor, sock)
+		self.server = server
+		self.name = None
+		self.lobby_key = None
+		self.table = None
+		self.seat = None
+
+	def on_message(self, message, received):
+		message_type = message.get("type")
+		if message_type == "move":
+			if self.table is None:
+				self.send({"type": "error", "message": "you aren't seated at a table"})
+				return
+			self.table.deliver_move(self.seat, message, received)
+		elif message_type == "join":
+			self.server.join(self, message)
+		else:
+			self.send({"type": "error", "message": "unknown message type %r" % message_type})
+
+	def on_drain(self):
+		if self.table is not None:
+			self.table.client_drained()
+
+	def on_close(self):
+		self.server.client_closed(self)
+
+class GameServer:
+	'''
+	Accepts clients, groups those who asked for the same game and number
+	of players into tables, and keeps count of how the tables are doing.
+	move_latencies is a LatencyHistogram of, for every move made by a
+	client, the seconds from the move arriving to the table having sent
+	out its outcome.
+	Tables are only paced (keeping the games' pauses between turns) if
+	paced is set
+	'''
+	def __init__(self, reactor, host = "127.0.0.1", port = DEFAULT_PORT,
+			move_timeout = DEFAULT_MOVE_TIMEOUT, seed = None, paced = False):
+		self.reactor = reactor
+		self.move_timeout = move_timeout
+		self.paced = paced
+		self.rng = random.Random(seed)
+		self.lobby = {}
+		self.tables = {}
+		self.tables_started = 0
+		self._player_limits = {}
+		self.tables_finished = 0
+		self.move_latencies = LatencyHistogram()
+		self.listener = Listener(reactor, self._accept, host, port)
+		self.address = self.listener.address
+
+	def join(self, client, message):
+		if client.table is not None or client.lobby_key is not None:
+			client.send({"type": "error", "message": "you have already joined a table"})
+			return
+		try:
+			logic_class = GameRegistry.get_game(message.get("game")).logic_class
+			get_remote_player_class(logic_class)
+		except KeyError as error:
+			client.send({"type": "error", "message": error.args[0]})
+			return
+		num_players = message.get("players")
+		min_num_players, max_num_players = self._get_player_limits(logic_class)
+		if not isinstance(num_players, int) or num_players < min_num_players or num_players > max_num_players:
+			client.send({"type": "error", "message": "players must be between %d and %d" % (min_num_players, max_num_players)})
+			return
+
+		client.name = unicode(message.get("name") or "player")
+		client.lobby_key = (logic_class, num_players)
+		waiting = self.lobby.setdefault(client.lobby_key, [])
+		waiting.append(client)
+		client.send({"type": "waiting", "players": len(waiting), "needed": num_players})
+		if len(waiting) == num_players:
+			del self.lobby[client.lobby_key]
+			self._start_table(logic_class, waiting)
+
+	def client_closed(self, client):
+		if client.table is not None:
+			client.table.client_closed(client.seat)
+		elif client.lobby_key is not None:
+			waiting = self.lobby.get(client.lobby_key, [])
+			if client in waiting:
+				waiting.remove(client)
+
+	def table_finished(self, table):
+		del self.tables[table.table_id]
+		self.tables_finished += 1
+		for client in table.clients:
+			if client is not None:
+				client.table = None
+				client.seat = None
+				client.lobby_key = None
+
+	def latency_percentile(self, fraction):
+		'''
+		Move to broadcast latency at the given fraction (0.99 for p99)
+		'''
+		return self.move_latencies.percentile(fraction)
+
+	def close(self):
+		self.listener.close()
+
+	###################################
+	# PROTECTED METHODS ###############
+	###################################
+	def _accept(self, reactor, sock):
+		ClientConnection(reactor, sock, self)
+
+	def _get_player_limits(self, logic_class):
+		if logic_class not in self._player_limits:
+			logic = logic_class(None, True)
+			self._player_limits[logic_class] = (logic._get_min_num_players(), logic._get_max_num_players())
+		return self._player_limits[logic_class]
+
+	def _start_table(self, logic_class, clients):
+		self.tables_started += 1
+		table = Table(self, self.tables_started, logic_class, clients, self.rng.getrandbits(32), self.paced)
+		self.tables[table.table_id] = table
+		for client in clients:
+			client.lobby_key = None
+		table.start()
+
+def main(argv = None):
+	parser = argparse.ArgumentParser(description = "Multi-table card game server")
+	parser.add_argument("--host", default = "127.0.0.1")
+	parser.add_argument("--port", type = int, default = DEFAULT_PORT)
+	parser.add_argument("--move-timeout", type = float, default = DEFAULT_MOVE_TIMEOUT,
+		help = "seconds a client gets to make a move")
+	parser.add_argument("--seed", type = int, help = "seed for the tables' games")
+	parser.add_argument("--paced", action = "store_true", help = "keep the games' pauses between turns")
+	args = parser.parse_args(argv)
+
+	reactor = Reactor()
+	server = GameServer(reactor, args.host, args.port, args.move_timeout, args.seed, args.paced)
+	print "Serving %s on %s:%d" % (", ".join([game.friendly_name for game in GameRegistry.get_registered_games()]),
+		server.address[0], server.address[1])
+	try:
+		reactor.run()
+	except KeyboardInterrupt:
+		pass
+	return 0
+
+if __name__ == "__main__":
+	main()
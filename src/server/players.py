@@ -0,0 +1,124 @@
+'''
+Players whose decisions come from a remote client. A table asks the
+player for a prompt before each of its turns; if there is a decision to
+make, the client's answer is handed over with set_move() before the game
+plays the turn. Without a move (the client timed out or went away) the
+player falls back to the game's default policy.
+'''
+from games.oldmaid import OldMaidGameLogic, OldMaidPlayer
+from games.uno import UnoCardFactory, UnoGameLogic, UnoPlayer
+
+def describe_card(card):
+	return {"id": card.card_id, "suit": card.suit, "value": card.value, "name": str(card)}
+
+class UnoRemotePlayer(UnoPlayer):
+	'''
+	Plays the card (and picks the suit) its client chose. When nothing in
+	the hand matches there is no decision to make: the player draws until
+	a card matches and plays it, naming the suit it holds most of if it
+	drew a wild card
+	'''
+	def __init__(self, name):
+		self.next_card = None
+		self.next_suit = None
+		UnoPlayer.__init__(self, name)
+
+	def get_prompt(self, game_logic):
+		active_card = game_logic.discard_pile.bottom_card(True)
+		matches = self.hand.get_matches(active_card, game_logic.active_suit)
+		if not matches:
+			return None
+		return {
+			"top_card": describe_card(active_card),
+			"active_suit": game_logic.active_suit,
+			"hand": [describe_card(card) for card in self.hand.card_list],
+			"playable": [card.card_id for card in matches],
+			"suits": UnoCardFactory.SUITS,
+		}
+
+	def set_move(self, message, game_logic):
+		'''
+		Takes {"card": card_id, "suit": suit}; the suit is only needed for
+		wild cards. Raises ValueError for a move that isn't legal
+		'''
+		active_card = game_logic.discard_pile.bottom_card(True)
+		matches = self.hand.get_matches(active_card, game_logic.active_suit)
+		chosen_card = None
+		for card in matches:
+			if card.card_id == message.get("card"):
+				chosen_card = card
+				break
+		if chosen_card is None:
+			raise ValueError("card %r can't be played" % message.get("card"))
+		suit = message.get("suit")
+		if chosen_card.is_wild() and suit not in UnoCardFactory.SUITS:
+			raise ValueError("a wild card needs one of the suits %s" % ", ".join(UnoCardFactory.SUITS))
+		self.next_card = chosen_card
+		self.next_suit = suit if chosen_card.is_wild() else None
+
+	def determine_best_match(self, card, active_suit):
+		if self.next_card is not None:
+			chosen_card = self.next_card
+			self.next_card = None
+			return chosen_card
+		return UnoPlayer.determine_best_match(self, card, active_suit)
+
+	def _get_choice_in_list(self, selection_list):
+		if self.next_suit is not None:
+			suit = self.next_suit
+			self.next_suit = None
+			return suit
+		return UnoPlayer._get_choice_in_list(self, selection_list)
+
+class OldMaidRemotePlayer(OldMaidPlayer):
+	'''
+	Draws the card at the position its client chose from the next
+	opponent's (face down) hand
+	'''
+	def __init__(self, name):
+		self.next_index = None
+		OldMaidPlayer.__init__(self, name)
+
+	def get_prompt(self, game_logic):
+		draw_from_seat = game_logic.next_seat[self.seat]
+		if draw_from_seat == self.seat:
+			return None
+		return {
+			"hand": [describe_card(card) for card in self.hand.card_list],
+			"draw_from": draw_from_seat,
+			"num_choices": game_logic.players[draw_from_seat].num_cards_in_hand(),
+		}
+
+	def set_move(self, message, game_logic):
+		'''
+		Takes {"index": position in the opponent's hand}. Raises
+		ValueError for a position that doesn't exist
+		'''
+		draw_from_player = game_logic.players[game_logic.next_seat[self.seat]]
+		index = message.get("index")
+		if not isinstance(index, int) or index < 0 or index >= draw_from_player.num_cards_in_hand():
+			raise ValueError("index must be between 0 and %d" % (draw_from_player.num_cards_in_hand() - 1))
+		self.next_index = index
+
+	def take_turn(self, **kwargs):
+		if self.next_index is None:
+			return OldMaidPlayer.take_turn(self, **kwargs)
+		hand = kwargs.get("draw_from_player").hand
+		card = hand.card_list[self.next_index]
+		self.next_index = None
+		hand.remove_card(card)
+		self._say("drew a %s", card)
+		self.hand.add_card(card)
+		self.discard_pairs()
+		return card
+
+REMOTE_PLAYER_CLASSES = [
+	(UnoGameLogic, UnoRemotePlayer),
+	(OldMaidGameLogic, OldMaidRemotePlayer),
+]
+
+def get_remote_player_class(logic_class):
+	for game_logic_class, player_class in REMOTE_PLAYER_CLASSES:
+		if issubclass(logic_class, game_logic_class):
+			return player_class
+	raise KeyError("%s can't be played remotely" % logic_class.get_friendly_name())
@@ -0,0 +1,396 @@
+'''
+Single threaded, non-blocking networking for the game server: a poll
+based event loop with timers, and connections that exchange JSON
+messages, one per line.
+'''
+from common.events import clock
+import errno
+import heapq
+import json
+import select
+import socket
+
+# a connection with more than HIGH_WATER bytes waiting to be sent stops
+# being read from until it has drained below LOW_WATER
+HIGH_WATER = 64 * 1024
+LOW_WATER = 16 * 1024
+MAX_LINE_LENGTH = 64 * 1024
+READ_SIZE = 64 * 1024
+# seconds a listener stops accepting for once the process (or system) is
+# out of file descriptors
+ACCEPT_BACKOFF = 0.1
+
+_POLLIN = getattr(select, "POLLIN", 1)
+_POLLOUT = getattr(select, "POLLOUT", 4)
+_POLLERR = getattr(select, "POLLERR", 8) | getattr(select, "POLLHUP", 16) | getattr(select, "POLLNVAL", 32)
+
+class _EpollPoller:
+	'''
+	select.epoll, which only costs as much as the number of sockets that
+	are ready; its event flags are the same as poll's
+	'''
+	def __init__(self):
+		self.epoll = select.epoll()
+		self.register = self.epoll.register
+		self.modify = self.epoll.modify
+		self.unregister = self.epoll.unregister
+
+	def poll(self, timeout = None):
+		if timeout is None:
+			return self.epoll.poll(-1)
+		# epoll waits whole milliseconds, rounding the timeout down, which
+		# would wake it just before the next timer is due
+		return self.epoll.poll((int(timeout * 1000 + .999) + .5) / 1000)
+
+class _PollPoller:
+	def __init__(self):
+		self.poller = select.poll()
+		self.register = self.poller.register
+		self.modify = self.poller.modify
+		self.unregister = self.poller.unregister
+
+	def poll(self, timeout = None):
+		return self.poller.poll(None if timeout is None else int(timeout * 1000 + .999))
+
+class _SelectPoller:
+	'''
+	The pollers' interface on top of select.select, for platforms
+	without poll
+	'''
+	def __init__(self):
+		self.masks = {}
+
+	def register(self, fd, mask):
+		self.masks[fd] = mask
+
+	def modify(self, fd, mask):
+		self.masks[fd] = mask
+
+	def unregister(self, fd):
+		del self.masks[fd]
+
+	def poll(self, timeout = None):
+		readers = [fd for fd, mask in self.masks.iteritems() if mask & _POLLIN]
+		writers = [fd for fd, mask in self.masks.iteritems() if mask & _POLLOUT]
+		readable, writable, _ = select.select(readers, writers, [], timeout)
+		ready = dict([(fd, _POLLIN) for fd in readable])
+		for fd in writable:
+			ready[fd] = ready.get(fd, 0) | _POLLOUT
+		return ready.items()
+
+class Timer:
+	def __init__(self, deadline, callback):
+		self.deadline = deadline
+		self.callback = callback
+		self.cancelled = False
+
+	def cancel(self):
+		self.cancelled = True
+
+class Reactor:
+	'''
+	Waits for sockets to become ready and for timers to expire, and calls
+	whatever handles them. Everything runs on the calling thread, so
+	handlers must never block
+	'''
+	def __init__(self):
+		self.handlers = {}
+		self.masks = {}
+		self.timers = []
+		self.running = False
+		self._timer_count = 0
+		if hasattr(select, "epoll"):
+			self.poller = _EpollPoller()
+		elif hasattr(select, "poll"):
+			self.poller = _PollPoller()
+		else:
+			self.poller = _SelectPoller()
+
+	def add_handler(self, handler, mask):
+		fd = handler.fileno()
+		self.handlers[fd] = handler
+		self.masks[fd] = mask
+		self.poller.register(fd, mask)
+
+	def update_handler(self, handler, mask):
+		fd = handler.fileno()
+		if self.masks.get(fd) != mask:
+			self.masks[fd] = mask
+			self.poller.modify(fd, mask)
+
+	def remove_handler(self, handler):
+		fd = handler.fileno()
+		if self.handlers.pop(fd, None) is not None:
+			del self.masks[fd]
+			self.poller.unregister(fd)
+
+	def call_later(self, delay, callback):
+		'''
+		Calls callback after delay seconds; returns a Timer which can be
+		cancelled
+		'''
+		timer = Timer(clock() + delay, callback)
+		self._timer_count += 1
+		heapq.heappush(self.timers, (timer.deadline, self._timer_count, timer))
+		return timer
+
+	def run(self, until = None):
+		'''
+		Runs the loop until stop() is called or, if given, until() returns
+		True
+		'''
+		self.running = True
+		while self.running and (until is None or not until()):
+			self.run_once()
+
+	def run_once(self):
+		timeout = None
+		if self.timers:
+			timeout = max(0, self.timers[0][0] - clock())
+		elif not self.handlers:
+			self.running = False
+			return
+		try:
+			ready = self.poller.poll(timeout)
+		except (select.error, IOError) as error:
+			if error.args[0] == errno.EINTR:
+				return
+			raise
+		for fd, events in ready:
+			handler = self.handlers.get(fd)
+			if handler is None:
+				continue
+			if events & (_POLLIN | _POLLERR):
+				handler.handle_read()
+			if events & _POLLOUT and fd in self.handlers:
+				handler.handle_write()
+		self._run_timers()
+
+	def stop(self):
+		self.running = False
+
+	def _run_timers(self):
+		now = clock()
+		timers = self.timers
+		while timers and timers[0][0] <= now:
+			timer = heapq.heappop(timers)[2]
+			if not timer.cancelled:
+				timer.callback()
+
+class Listener:
+	'''
+	Accepts connections on a listening socket, wrapping each one with
+	connection_factory(reactor, sock). When there are no file descriptors
+	left the pending connections can't be taken off the socket, which
+	would keep it ready forever, so the listener leaves the reactor for
+	ACCEPT_BACKOFF seconds before trying again
+	'''
+	def __init__(self, reactor, connection_factory, host = "127.0.0.1", port = 0, backlog = 1024):
+		self.reactor = reactor
+		self.connection_factory = connection_factory
+		self.sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+		self.sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+		self.sock.bind((host, port))
+		self.sock.listen(backlog)
+		self.sock.setblocking(False)
+		self.address = self.sock.getsockname()
+		self._resume_timer = None
+		reactor.add_handler(self, _POLLIN)
+
+	def fileno(self):
+		return self.sock.fileno()
+
+	def handle_read(self):
+		while True:
+			try:
+				sock, _ = self.sock.accept()
+			except socket.error as error:
+				if error.args[0] in (errno.EAGAIN, errno.EWOULDBLOCK):
+					return
+				if error.args[0] in (errno.EMFILE, errno.ENFILE):
+					self.reactor.remove_handler(self)
+					self._resume_timer = self.reactor.call_later(ACCEPT_BACKOFF, self._resume)
+					return
+				raise
+			self.connection_factory(self.reactor, sock)
+
+	def handle_write(self):
+		pass
+
+	def close(self):
+		if self._resume_timer is not None:
+			self._resume_timer.cancel()
+			self._resume_timer = None
+		self.reactor.remove_handler(self)
+		self.sock.close()
+
+	###################################
+	# PROTECTED METHODS ###############
+	###################################
+	def _resume(self):
+		self._resume_timer = None
+		self.reactor.add_handler(self, _POLLIN)
+
+def encode_message(message):
+	return json.dumps(message, separators = (",", ":")) + "\n"
+
+class JsonConnection:
+	'''
+	A non-blocking socket exchanging JSON objects, one per line. Sending
+	tries to write straight away and keeps whatever the socket won't take;
+	while too much is waiting the connection stops reading, which pushes
+	back on a peer that sends faster than it reads. Subclasses implement
+	on_message() and may implement on_drain() and on_close()
+	'''
+	def __init__(self, reactor, sock):
+		self.reactor = reactor
+		self.sock = sock
+		self.sock.setblocking(False)
+		self.sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+		self.closed = False
+		self.connected = True
+		self.inbuf = ""
+		self.outbuf = []
+		self.outbuf_size = 0
+		self._fd = sock.fileno()
+		reactor.add_handler(self, _POLLIN)
+
+	def fileno(self):
+		return self._fd
+
+	def send(self, message):
+		self.send_encoded(encode_message(message))
+
+	def send_encoded(self, data):
+		'''
+		Sends a line made by encode_message(), so a message going to many
+		connections is only encoded once
+		'''
+		if self.closed:
+			return
+		if not self.outbuf and self.connected:
+			try:
+				sent = self.sock.send(data)
+			except socket.error as error:
+				if error.args[0] not in (errno.EAGAIN, errno.EWOULDBLOCK):
+					self.close()
+					return
+				sent = 0
+			data = data[sent:]
+			if not data:
+				return
+		self.outbuf.append(data)
+		self.outbuf_size += len(data)
+		self._update_interest()
+
+	def is_congested(self):
+		return self.outbuf_size > HIGH_WATER
+
+	def handle_read(self):
+		try:
+			data = self.sock.recv(READ_SIZE)
+		except socket.error as error:
+			if error.args[0] in (errno.EAGAIN, errno.EWOULDBLOCK):
+				return
+			self.close()
+			return
+		if not data:
+			self.close()
+			return
+		received = clock()
+		lines = (self.inbuf + data).split("\n")
+		self.inbuf = lines.pop()
+		if len(self.inbuf) > MAX_LINE_LENGTH:
+			self.close()
+			return
+		for line in lines:
+			if self.closed:
+				return
+			if not line.strip():
+				continue
+			try:
+				message = json.loads(line)
+			except ValueError:
+				self.send({"type": "error", "message": "messages must be JSON objects"})
+				continue
+			if not isinstance(message, dict):
+				self.send({"type": "error", "message": "messages must be JSON objects"})
+				continue
+			self.on_message(message, received)
+
+	def handle_write(self):
+		if not self.connected:
+			error = self.sock.getsockopt(socket.SOL_SOCKET, socket.SO_ERROR)
+			if error:
+				self.close()
+				return
+			self.connected = True
+		while self.outbuf:
+			try:
+				sent = self.sock.send(self.outbuf[0])
+			except socket.error as error:
+				if error.args[0] not in (errno.EAGAIN, errno.EWOULDBLOCK):
+					self.close()
+					return
+				break
+			self.outbuf_size -= sent
+			if sent < len(self.outbuf[0]):
+				self.outbuf[0] = self.outbuf[0][sent:]
+				break
+			self.outbuf.pop(0)
+		was_congested = self.reactor.masks.get(self._fd) == _POLLOUT
+		self._update_interest()
+		if was_congested and self.outbuf_size <= LOW_WATER:
+			self.on_drain()
+
+	def close(self):
+		if self.closed:
+			return
+		self.closed = True
+		self.reactor.remove_handler(self)
+		self.sock.close()
+		self.on_close()
+
+	def on_message(self, message, received):
+		raise NotImplementedError()
+
+	def on_drain(self):
+		pass
+
+	def on_close(self):
+		pass
+
+	###################################
+	# PROTECTED METHODS ###############
+	###################################
+	def _update_interest(self):
+		if self.closed:
+			return
+		if not self.connected:
+			mask = _POLLOUT
+		elif self.outbuf_size > HIGH_WATER or (self.outbuf_size > LOW_WATER and \
+				self.reactor.masks.get(self._fd) == _POLLOUT):
+			mask = _POLLOUT
+		elif self.outbuf:
+			mask = _POLLIN | _POLLOUT
+		else:
+			mask = _POLLIN
+		self.reactor.update_handler(self, mask)
+
+def connect(reactor, connection_class, address, *args):
+	'''
+	Starts a non-blocking connection to address and wraps it in
+	connection_class(reactor, sock, *args); messages sent before the
+	connection completes are queued
+	'''
+	sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+	sock.setblocking(False)
+	error = sock.connect_ex(address)
+	if error not in (0, errno.EINPROGRESS, errno.EWOULDBLOCK):
+		sock.close()
+		raise socket.error(error, "Can't connect to %s:%d" % address)
+	connection = connection_class(reactor, sock, *args)
+	if error != 0:
+		connection.connected = False
+		connection._update_interest()
+	return connection
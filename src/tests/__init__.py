@@ -0,0 +1,57 @@
+'''
+Tests for the card engine and games. From the src directory:
+
+	python -m unittest discover tests
+
+Most of them check that some way of getting to a game (reusing, restoring,
+cloning, replaying) plays it out exactly like the original; the helpers
+below play and describe the games they share
+'''
+import games
+from games.oldmaid import OldMaidGameLogic
+from games.uno import UnoGameLogic
+
+# (game logic class, number of players)
+GAMES = [(UnoGameLogic, 4), (UnoGameLogic, 2), (OldMaidGameLogic, 3)]
+NUM_SEEDS = 100
+MID_GAME_STEPS = 12
+
+def get_names(num_players):
+	return ["seat %d" % (seat + 1) for seat in range(num_players)]
+
+def get_outcome(logic, result):
+	'''
+	Everything a finished game ends up with that should be reproducible
+	'''
+	hands = [[card.card_id for card in player.hand.card_list] for player in logic.players]
+	return (result.winner_index, result.num_turns, result.num_draws, result.num_reshuffles, hands)
+
+def describe(logic):
+	'''
+	The state of a game in progress, as plain lists and ints
+	'''
+	state = [[[card.card_id for card in player.hand.card_list] for player in logic.players],
+		[card.card_id for card in logic.draw_pile.card_list],
+		logic.num_turns, logic.player_index, logic.finished]
+	discard_pile = getattr(logic, "discard_pile", None)
+	if discard_pile is not None:
+		state.append([card.card_id for card in discard_pile.card_list])
+	return state
+
+def play_out(logic):
+	while not logic.finished:
+		logic.step()
+	return get_outcome(logic, logic.get_result())
+
+def begin_mid_game(logic_class, num_players, seed):
+	'''
+	A headless game with MID_GAME_STEPS turns played, or None if it is
+	already over by then
+	'''
+	logic = logic_class(seed, True)
+	logic.begin(get_names(num_players))
+	for _ in range(MID_GAME_STEPS):
+		if logic.finished:
+			return None
+		logic.step()
+	return None if logic.finished else logic
@@ -0,0 +1,68 @@
+'''
+Checks the decision cache, and that a policy plays the same games with
+and without one
+'''
+import unittest
+
+from common.cache import DecisionCache
+from games.uno import UnoCardFactory, UnoGameLogic, UnoPlayer, get_match_table
+from tests import NUM_SEEDS, get_outcome
+
+class LowestCardPlayer(UnoPlayer):
+	'''
+	Deterministic policy: plays the matching card of the lowest card type
+	and names the suit it holds most of (the first suit if it holds none)
+	'''
+	def determine_best_match(self, card, active_suit):
+		matches = self.hand.get_matches(card, active_suit)
+		if not matches:
+			return None
+		card_types = get_match_table().card_types
+		return min(matches, key = lambda match: card_types[match.card_id])
+
+	def _get_choice_in_list(self, selection_list):
+		counts = [len(self.hand.cards_by_suit.get(suit, [])) for suit in UnoCardFactory.SUITS]
+		return UnoCardFactory.SUITS[counts.index(max(counts))]
+
+class CachedLowestCardPlayer(LowestCardPlayer):
+	pass
+
+def play_games(player_class, num_players):
+	outcomes = []
+	for seed in range(NUM_SEEDS):
+		logic = UnoGameLogic(seed, True)
+		players = [player_class("seat %d" % (seat + 1)) for seat in range(num_players)]
+		outcomes.append(get_outcome(logic, logic.simulate(players)))
+	return outcomes
+
+class DecisionCacheTest(unittest.TestCase):
+	def test_least_recently_used_is_evicted(self):
+		cache = DecisionCache(2)
+		cache.put("a", 1)
+		cache.put("b", 2)
+		self.assertEqual(cache.get("a"), 1)
+		cache.put("c", 3)
+		self.assertEqual(cache.get("b"), None)
+		self.assertEqual((cache.get("a"), cache.get("c")), (1, 3))
+		self.assertEqual((cache.hits, cache.misses, cache.evictions, len(cache)), (3, 1, 1, 2))
+
+	def test_needs_room(self):
+		self.assertRaises(ValueError, DecisionCache, 0)
+
+class CachedPolicyTest(unittest.TestCase):
+	def tearDown(self):
+		CachedLowestCardPlayer.decision_cache = None
+
+	def test_cached_policy_plays_the_same_games(self):
+		for num_players in (2, 4):
+			expected = play_games(LowestCardPlayer, num_players)
+			# a cache that keeps evicting, and one that never does; exact
+			# situations repeat rarely, but both get some hits
+			for max_size in (1024, 1 << 16):
+				cache = CachedLowestCardPlayer.decision_cache = DecisionCache(max_size)
+				self.assertEqual(play_games(CachedLowestCardPlayer, num_players), expected,
+					"%d players, cache of %d" % (num_players, max_size))
+				self.assertTrue(cache.hits > 0)
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,88 @@
+'''
+Checks the exact Old Maid solver against games played out from the same
+point
+'''
+from random import Random
+import math
+import unittest
+
+from games import oldmaid_solver
+from games.oldmaid_solver import OldMaidSolver, deal_game
+from tests import begin_mid_game
+
+NUM_PLAYOUTS = 2000
+# standard errors a sampled estimate may be off by; the playouts are
+# seeded, so this only has to hold for these samples
+MAX_Z = 4.0
+
+def play_outs(logic):
+	'''
+	(win counts by seat, turns left in each game) over NUM_PLAYOUTS clones
+	of logic played to the end
+	'''
+	wins = [0] * len(logic.players)
+	turns = []
+	for seed in range(NUM_PLAYOUTS):
+		clone = logic.clone(Random(seed))
+		while not clone.finished:
+			clone.step()
+		wins[clone.get_result().winner_index] += 1
+		turns.append(clone.num_turns - logic.num_turns)
+	return wins, turns
+
+class OldMaidSolverTest(unittest.TestCase):
+	def assert_matches_playouts(self, logic):
+		outcome = OldMaidSolver(len(logic.players)).solve_game(logic)
+		self.assertAlmostEqual(sum(outcome.win_probabilities), 1.0)
+		wins, turns = play_outs(logic)
+		for seat, probability in enumerate(outcome.win_probabilities):
+			error = math.sqrt(probability * (1 - probability) / NUM_PLAYOUTS)
+			self.assertTrue(abs(float(wins[seat]) / NUM_PLAYOUTS - probability) < MAX_Z * error,
+				"seat %d: %d wins, expected %.4f" % (seat, wins[seat], probability))
+		mean = float(sum(turns)) / len(turns)
+		deviation = math.sqrt(sum((turn - mean) ** 2 for turn in turns) / (len(turns) - 1))
+		self.assertTrue(abs(mean - outcome.expected_turns) < MAX_Z * deviation / math.sqrt(len(turns)),
+			"%.3f turns, expected %.3f" % (mean, outcome.expected_turns))
+
+	def test_dealt_game_matches_playouts(self):
+		for num_players in (2, 3):
+			self.assert_matches_playouts(deal_game(num_players, 777))
+
+	def test_game_in_progress_matches_playouts(self):
+		for num_players, seed in ((3, 5), (4, 5)):
+			logic = begin_mid_game(oldmaid_solver.OldMaidGameLogic, num_players, seed)
+			self.assertTrue(logic is not None)
+			self.assert_matches_playouts(logic)
+
+	def test_hand_sizes_give_the_same_outcome(self):
+		logic = deal_game(3, 11)
+		expected = OldMaidSolver(3).solve_game(logic)
+		seats_by_value = {}
+		for player in logic.players:
+			for card in player.hand.card_list:
+				seats_by_value.setdefault(card.value, []).append(player.seat)
+		# the odd queen is the only card left without a partner
+		queen_seat = [seats[0] for seats in seats_by_value.itervalues() if len(seats) == 1][0]
+		outcome = OldMaidSolver(3).solve_hand_sizes(
+			[player.num_cards_in_hand() for player in logic.players], queen_seat)
+		for probability, expected_probability in zip(outcome.win_probabilities, expected.win_probabilities):
+			self.assertAlmostEqual(probability, expected_probability)
+		self.assertAlmostEqual(outcome.expected_turns, expected.expected_turns)
+
+	def test_iterative_solve_agrees_with_numpy(self):
+		if oldmaid_solver.np is None:
+			return
+		logic = deal_game(3, 13)
+		expected = OldMaidSolver(3).solve_game(logic)
+		numpy = oldmaid_solver.np
+		oldmaid_solver.np = None
+		try:
+			outcome = OldMaidSolver(3).solve_game(logic)
+		finally:
+			oldmaid_solver.np = numpy
+		for probability, expected_probability in zip(outcome.win_probabilities, expected.win_probabilities):
+			self.assertAlmostEqual(probability, expected_probability, 9)
+		self.assertAlmostEqual(outcome.expected_turns, expected.expected_turns, 7)
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,49 @@
+'''
+Checks that logged games replay into identical logs, including logs
+carried on in append mode
+'''
+from StringIO import StringIO
+import os
+import tempfile
+import unittest
+
+from common.gamelog import GameLogWriter
+from games.replay import verify_log
+from tests import GAMES, NUM_SEEDS, get_names
+
+def log_games(fileobj, seeds):
+	'''
+	Logs a game of each of GAMES for every seed; returns how many
+	'''
+	writer = GameLogWriter(fileobj)
+	num_games = 0
+	for logic_class, num_players in GAMES:
+		for seed in seeds:
+			logic = logic_class(seed, True)
+			writer.attach(logic)
+			logic.simulate(get_names(num_players))
+			num_games += 1
+	writer.close()
+	return num_games
+
+class ReplayTest(unittest.TestCase):
+	def test_fresh_log_verifies(self):
+		output = StringIO()
+		num_games = log_games(output, range(NUM_SEEDS / 4))
+		self.assertEqual(verify_log(StringIO(output.getvalue())), (num_games, 0))
+
+	def test_appended_log_verifies(self):
+		handle, path = tempfile.mkstemp()
+		os.close(handle)
+		try:
+			num_games = 0
+			for seeds in (range(5), range(5, 10)):
+				with open(path, "ab") as output:
+					num_games += log_games(output, seeds)
+			with open(path, "rb") as log:
+				self.assertEqual(verify_log(log), (num_games, 0))
+		finally:
+			os.remove(path)
+
+if __name__ == "__main__":
+	unittest.main()
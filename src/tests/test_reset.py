@@ -0,0 +1,21 @@
+'''
+Checks that reset() gets a game ready to play exactly like a new one
+'''
+import unittest
+
+from tests import GAMES, NUM_SEEDS, get_names, get_outcome
+
+class ResetTest(unittest.TestCase):
+	def test_reset_plays_like_a_new_game(self):
+		for logic_class, num_players in GAMES:
+			reused = logic_class(0, True)
+			reused.simulate(get_names(num_players))
+			for seed in range(1, NUM_SEEDS + 1):
+				fresh = logic_class(seed, True)
+				expected = get_outcome(fresh, fresh.simulate(get_names(num_players)))
+				reused.reset(seed)
+				self.assertEqual(get_outcome(reused, reused.simulate()), expected,
+					"%s with %d players, seed %d" % (logic_class.__name__, num_players, seed))
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,45 @@
+'''
+Checks that snapshot()/restore() and clone() leave a game able to play
+out exactly as it would have
+'''
+from random import Random
+import unittest
+
+from tests import GAMES, NUM_SEEDS, begin_mid_game, describe, play_out
+
+class SnapshotTest(unittest.TestCase):
+	def test_restore_replays_the_rest_of_the_game(self):
+		for logic_class, num_players in GAMES:
+			for seed in range(NUM_SEEDS / 4):
+				logic = begin_mid_game(logic_class, num_players, seed)
+				if logic is None:
+					continue
+				snapshot = logic.snapshot()
+				rng_state = logic.rng.getstate()
+				state = describe(logic)
+				expected = play_out(logic)
+
+				logic.restore(snapshot)
+				# the random source isn't part of a snapshot
+				logic.rng.setstate(rng_state)
+				self.assertEqual(describe(logic), state)
+				self.assertEqual(play_out(logic), expected,
+					"%s with %d players, seed %d" % (logic_class.__name__, num_players, seed))
+
+class CloneTest(unittest.TestCase):
+	def test_playing_a_clone_leaves_the_original_alone(self):
+		for logic_class, num_players in GAMES:
+			for seed in range(NUM_SEEDS / 4):
+				logic = begin_mid_game(logic_class, num_players, seed)
+				if logic is None:
+					continue
+				state = describe(logic)
+				play_out(logic.clone(Random(seed)))
+				self.assertEqual(describe(logic), state)
+
+				untouched = begin_mid_game(logic_class, num_players, seed)
+				self.assertEqual(play_out(logic), play_out(untouched),
+					"%s with %d players, seed %d" % (logic_class.__name__, num_players, seed))
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,35 @@
+'''
+Checks that a seeded tournament comes out the same however it is split
+into chunks and spread over workers
+'''
+import unittest
+
+from games.tournament import TournamentResult, get_game_seed, get_logic_class, run_tournament
+from tests import get_names
+
+NUM_GAMES = 60
+
+def get_totals(result):
+	return (result.num_games, result.num_stalemates, result.wins_by_seat, result.game_lengths,
+		result.reshuffle_counts, result.total_turns, result.total_draws, result.total_reshuffles)
+
+class TournamentTest(unittest.TestCase):
+	def test_workers_and_chunks_give_the_same_result(self):
+		for game, num_players in (("Uno!", 4), ("Old Maid", 3)):
+			expected = get_totals(run_tournament(game, NUM_GAMES, num_players, 7, num_workers = 1))
+			for num_workers, chunk_size in ((1, 7), (3, 7), (3, 250)):
+				result = run_tournament(game, NUM_GAMES, num_players, 7, num_workers, chunk_size)
+				self.assertEqual(get_totals(result), expected,
+					"%s with %d workers, chunks of %d" % (game, num_workers, chunk_size))
+
+	def test_games_are_seeded_from_the_master_seed(self):
+		logic_class = get_logic_class("Uno!")
+		expected = TournamentResult(2)
+		for game_index in range(10):
+			expected.add_result(logic_class(get_game_seed(3, game_index), True).simulate(get_names(2)))
+		result = run_tournament("Uno!", 10, 2, 3, num_workers = 2, chunk_size = 4)
+		self.assertEqual(get_totals(result), get_totals(expected))
+		self.assertNotEqual(get_totals(run_tournament("Uno!", 10, 2, 4, num_workers = 1)), get_totals(expected))
+
+if __name__ == "__main__":
+	unittest.main()